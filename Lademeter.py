@@ -1,105 +1,33 @@
+import startzeit
+startzeit.starten()  # misst nur mit --startzeit oder LADEMETER_STARTZEIT=1
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog
-import urllib.parse
-import urllib.request
-import json
-import ssl
-import openpyxl
-import xlrd
-from xlutils.copy import copy as xl_copy
-import pyperclip
 import os
-
-def get_kilometer_von_orten(start, ziel):
-    """Berechnet die Entfernung zwischen zwei Orten - vereinfachte Luftlinie"""
-    try:
-        # SSL-Context für macOS erstellen
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        
-        # Geocoding mit Nominatim (OpenStreetMap)
-        def get_coords(ort):
-            ort_encoded = urllib.parse.quote(ort)
-            url = f"https://nominatim.openstreetmap.org/search?q={ort_encoded}&format=json&limit=1"
-            req = urllib.request.Request(url, headers={'User-Agent': 'Lademeter-Tool/1.0'})
-            with urllib.request.urlopen(req, timeout=30, context=ssl_context) as response:
-                data = json.loads(response.read().decode())
-                if not data:
-                    raise ValueError(f"Ort '{ort}' nicht gefunden")
-                return [float(data[0]['lat']), float(data[0]['lon'])]
-        
-        start_coords = get_coords(start)
-        ziel_coords = get_coords(ziel)
-        
-        # Berechne Luftlinie mit Haversine-Formel (genauer als API bei Timeout-Problemen)
-        import math
-        lat1, lon1 = math.radians(start_coords[0]), math.radians(start_coords[1])
-        lat2, lon2 = math.radians(ziel_coords[0]), math.radians(ziel_coords[1])
-        
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        
-        # Erdradius in km
-        r = 6371
-        luftlinie = r * c
-        
-        # Faktor für Straßenentfernung (ca. 1.3x Luftlinie)
-        strassen_km = luftlinie * 1.3
-        
-        return round(strassen_km, 1)
-    except Exception as e:
-        raise Exception(f"Fehler bei der Routenberechnung: {str(e)}")
-
-def berechne_lademeter(palettengroesse: str, menge: int, stapelbarkeit: int) -> float:
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import berechnung
+import instrumentierung
+from berechnung import berechne_preis, verfuegbare_fahrzeuge
+from beladung import beladung_beschreiben
+from excel_bearbeitung import ExcelSitzung, zellen_schreiben
+from geocoding import get_cache, get_coords, get_coords_lokal, strassen_km
+from gazetteer import gazetteer_bereit, gazetteer_vorladen, get_gazetteer
+from live_berechnung import LiveBerechnung, OrtNichtLokal
+from strassennetz import strassennetz_vorladen
+startzeit.marke("Importe")
+
+def berechne_beladung(palettengroesse: str, menge: int, stapelbarkeit: int, fahrzeug: str):
     try:
-        teile = palettengroesse.lower().replace(" ", "").split("x")
-        if len(teile) != 3:
-            raise ValueError("Ungültiges Format. Bitte verwende das Format 'LxBxH' in cm.")
-
-        laenge_cm = float(teile[0])
-        breite_cm = float(teile[1])
-
-        laenge_m = laenge_cm / 100
-        breite_m = breite_cm / 100
-
-        lademeter_pro_palette = (breite_m / 2.4) * laenge_m
-        gesamt_lademeter = lademeter_pro_palette * menge
-
-        # Stapelbarkeit berücksichtigen
-        if stapelbarkeit > 0:
-            gesamt_lademeter = gesamt_lademeter / (2 ** stapelbarkeit)
-        # stapelbarkeit == 0: keine Änderung
-
-        return round(gesamt_lademeter, 2)
-
+        return berechnung.berechne_beladung(palettengroesse, menge, stapelbarkeit, fahrzeug)
     except Exception as e:
         messagebox.showerror("Fehler", f"Fehler: {e}")
-        return 0.0
-
-def berechne_preis(kilometer: float, fahrzeug: str) -> float:
-    grundpreis = 65.0
-    grund_km = 40
-    km_preise = {
-        "Sprinter": 0.35,
-        "Planensprinter": 0.50,
-        "Klein LKW": 0.55,
-        "7,5 Tonnen LKW": 0.65,
-        "Tautliner": 0.75,
-        "Mega": 0.85,
-        "Jumbo": 1.00
-    }
-    km_preis = km_preise.get(fahrzeug, 0.30)
-    if kilometer <= grund_km:
-        preis = grundpreis
-    else:
-        preis = grundpreis + (kilometer - grund_km) * km_preis
-    return round(preis, 2)
+        return None
 
 def berechnen():
+    if var_live.get():
+        live_sofort_berechnen()
+        return
+    berechnung_abbrechen()
     palettengroesse = entry_groesse.get()
     try:
         menge = int(entry_menge.get())
@@ -112,16 +40,7 @@ def berechnen():
         km_manuell = entry_km.get().strip()
         
         if startort and zielort:
-            # Berechne Kilometer automatisch (kostenlos, kein API-Key nötig)
-            try:
-                label_ergebnis.config(text="🔄 Berechne Route...")
-                root.update()
-                kilometer = get_kilometer_von_orten(startort, zielort)
-                label_ergebnis.config(text=f"📍 Entfernung berechnet: {kilometer} km")
-                root.update()
-            except Exception as e:
-                messagebox.showerror("Fehler", f"Fehler bei der Routenberechnung: {e}\n\nBitte trage die Kilometer manuell ein.")
-                return
+            kilometer = None
         elif km_manuell:
             # Verwende manuelle Kilometereingabe
             kilometer = float(km_manuell)
@@ -136,8 +55,27 @@ def berechnen():
         label_ergebnis.config(text="❌ Fehlerhafte Eingabe!")
         return
 
-    lademeter = berechne_lademeter(palettengroesse, menge, stapelbarkeit)
-    preis = berechne_preis(kilometer, fahrzeug)
+    if kilometer is None:
+        # Berechne Kilometer automatisch im Hintergrund (kostenlos, kein API-Key nötig)
+        route_berechnen(startort, zielort,
+                        lambda km: ergebnis_anzeigen(palettengroesse, menge, stapelbarkeit, km, fahrzeug))
+    else:
+        ergebnis_anzeigen(palettengroesse, menge, stapelbarkeit, kilometer, fahrzeug)
+
+def ergebnis_anzeigen(palettengroesse, menge, stapelbarkeit, kilometer, fahrzeug):
+    beladung = berechne_beladung(palettengroesse, menge, stapelbarkeit, fahrzeug)
+    lademeter = beladung.lademeter if beladung else 0.0
+    beschreibung = f"\n🚛 Beladung: {beladung_beschreiben(beladung, fahrzeug)}" if beladung else ""
+    try:
+        preis = berechne_preis(kilometer, fahrzeug, beladung.lademeter if beladung else None)
+    except ValueError as e:
+        # z.B. Fahrzeugtyp ohne Preis im geltenden Tarif - angezeigt wie im Live-Modus
+        label_ergebnis.config(
+            text=f"✅ Die berechneten Lademeter betragen: {lademeter} m\n📏 Entfernung: {kilometer} km\n❌ {e}"
+                 + beschreibung
+        )
+        cache_status_aktualisieren()
+        return
     
     # Speichere Werte global für Tab 2
     global current_lademeter, current_kilometer, current_preis
@@ -147,46 +85,297 @@ def berechnen():
     
     label_ergebnis.config(
         text=f"✅ Die berechneten Lademeter betragen: {lademeter} m\n📏 Entfernung: {kilometer} km\n💶 Ungefährer Preis: {preis} €"
+             + beschreibung
+    )
+    cache_status_aktualisieren()
+
+# Routenberechnung im Hintergrund
+route_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="Geocoding")
+route_auftrag = 0        # Nummer der aktuellen Routenberechnung
+route_futures = []       # Laufende Geocoding-Abfragen (Start, Ziel)
+
+def route_berechnen(startort, zielort, weiter, fehler=None, online=True):
+    """Geokodiert Start und Ziel parallel in Worker-Threads; das Ergebnis wird per
+    root.after im Tk-Hauptthread abgeholt und an `weiter(kilometer)` übergeben.
+    Mit `fehler` gehen Fehler an fehler(Ausnahme) statt in einen Dialog, und die
+    Ergebniszeile bleibt dem Aufrufer überlassen (Live-Modus). Ohne `online` werden
+    die Orte nur lokal aufgelöst (Ortsverzeichnis, Orts-Cache), ein unbekannter Ort
+    ergibt OrtNichtLokal."""
+    global route_auftrag, route_futures
+    route_auftrag += 1
+    auftrag = route_auftrag
+    geokodieren = get_coords if online else get_coords_lokal
+    route_futures = [route_executor.submit(geokodieren, startort), route_executor.submit(geokodieren, zielort)]
+    futures = route_futures
+    fortschritt_anzeigen(True)
+    if fehler is None:
+        label_ergebnis.config(text="🔄 Berechne Route...")
+
+    def abholen():
+        if auftrag != route_auftrag:
+            # Inzwischen abgebrochen oder durch eine neue Berechnung ersetzt
+            return
+        if not all(f.done() for f in futures):
+            root.after(50, abholen)
+            return
+        fortschritt_anzeigen(False)
+        try:
+            start_coords, ziel_coords = futures[0].result(), futures[1].result()
+            if start_coords is None or ziel_coords is None:
+                unbekannt = startort if start_coords is None else zielort
+                raise OrtNichtLokal(f"„{unbekannt}“ ist noch nicht bekannt - „Berechnen“ sucht den Ort online.")
+            kilometer = strassen_km(start_coords, ziel_coords)
+        except Exception as e:
+            if fehler is not None:
+                fehler(e)
+                return
+            label_ergebnis.config(text="❌ Route konnte nicht berechnet werden.")
+            cache_status_aktualisieren()
+            messagebox.showerror("Fehler", f"Fehler bei der Routenberechnung: {e}\n\nBitte trage die Kilometer manuell ein.")
+            return
+        if fehler is None:
+            label_ergebnis.config(text=f"📍 Entfernung berechnet: {kilometer} km")
+        weiter(kilometer)
+
+    root.after(50, abholen)
+
+def berechnung_abbrechen(*_):
+    """Verwirft eine laufende Routenberechnung (z.B. weil sich Eingaben geändert haben)"""
+    global route_auftrag, route_futures
+    if not route_futures or all(f.done() for f in route_futures):
+        return
+    route_auftrag += 1
+    for f in route_futures:
+        # Bereits gestartete Abfragen laufen zu Ende, ihr Ergebnis wird ignoriert
+        f.cancel()
+    route_futures = []
+    fortschritt_anzeigen(False)
+    label_ergebnis.config(text="⏹ Berechnung abgebrochen - Eingaben wurden geändert.")
+
+# ========== Live-Berechnung ==========
+# Das Ergebnis folgt den Eingaben. LiveBerechnung merkt sich Beladung, Routen und Preis,
+# so dass ein Tastendruck nur neu rechnet, was von dem geänderten Feld abhängt; Start-
+# und Zielort werden erst geokodiert, wenn eine Weile nicht mehr getippt wurde - und nur
+# lokal: halb getippte Namen ("Wolfs") dürfen weder an Nominatim gehen (Ratenlimit) noch
+# mit falschen Koordinaten im Orts-Cache landen. Online sucht erst „Berechnen“.
+
+LIVE_ROUTE_VERZOEGERUNG_MS = 600
+live = LiveBerechnung()
+live_geplant = None        # after-ID der nächsten Aktualisierung
+route_geplant = None       # after-ID der nächsten Routenberechnung
+live_route_laeuft = None   # (Start, Ziel, online) der laufenden Routenberechnung
+
+def eingabe_geaendert(route_betroffen=False):
+    """Reaktion auf jede Eingabe in Tab 1"""
+    global live_geplant, route_geplant, live_route_laeuft
+    if not var_live.get():
+        berechnung_abbrechen()
+        return
+    if route_betroffen:
+        berechnung_abbrechen()
+        live_route_laeuft = None
+        if route_geplant is not None:
+            root.after_cancel(route_geplant)
+        route_geplant = root.after(LIVE_ROUTE_VERZOEGERUNG_MS, live_route_starten)
+    if live_geplant is None:
+        # Alle Änderungen bis zum nächsten Leerlauf ergeben eine Aktualisierung
+        live_geplant = root.after_idle(live_aktualisieren)
+
+def live_umgeschaltet():
+    global live_geplant, route_geplant
+    for geplant in (live_geplant, route_geplant):
+        if geplant is not None:
+            root.after_cancel(geplant)
+    live_geplant = route_geplant = None
+    if var_live.get():
+        live_aktualisieren()
+
+def live_route_starten(online=False):
+    """Ermittelt die Route zu Start und Ziel im Hintergrund, falls sie noch nicht bekannt ist;
+    beim Tippen nur aus Ortsverzeichnis und Orts-Cache, mit `online` auch über Nominatim"""
+    global route_geplant, live_route_laeuft
+    route_geplant = None
+    startort, zielort = var_start.get().strip(), var_ziel.get().strip()
+    try:
+        if not startort or not zielort or live.route(startort, zielort) is not None:
+            return
+    except ValueError:
+        return
+    live_route_laeuft = (startort, zielort, online)
+
+    def fertig(kilometer=None, fehler=None):
+        global live_route_laeuft
+        live_route_laeuft = None
+        live.route_merken(startort, zielort, kilometer, str(fehler) if fehler else None,
+                          nur_online=isinstance(fehler, OrtNichtLokal))
+        cache_status_aktualisieren()
+        live_aktualisieren()
+
+    route_berechnen(startort, zielort, fertig, fehler=lambda e: fertig(fehler=e), online=online)
+
+def live_sofort_berechnen():
+    """Knopf "Berechnen" im Live-Modus: Route ohne Verzögerung ermitteln, auch online;
+    Fehlversuche werden wiederholt"""
+    global route_geplant
+    if route_geplant is not None:
+        root.after_cancel(route_geplant)
+        route_geplant = None
+    startort, zielort = var_start.get().strip(), var_ziel.get().strip()
+    try:
+        live.route(startort, zielort)
+    except ValueError:
+        live.route_vergessen(startort, zielort)
+    if live_route_laeuft != (startort, zielort, True):
+        live_route_starten(online=True)
+    live_aktualisieren()
+
+def live_aktualisieren():
+    """Ergebnis aus den aktuellen Eingaben; gerechnet wird nur, was sich geändert hat"""
+    global live_geplant, current_lademeter, current_kilometer, current_preis
+    live_geplant = None
+    if not var_live.get():
+        return
+    fahrzeug = combo_fahrzeug.get()
+    try:
+        menge = int(var_menge.get())
+        stapelbarkeit = int(var_stapel.get())
+    except ValueError:
+        label_ergebnis.config(text="✏️ Bitte Palettengröße, Anzahl und Stapelbarkeit eingeben.")
+        return
+    try:
+        beladung = live.beladung(var_groesse.get(), menge, stapelbarkeit, fahrzeug)
+    except ValueError as e:
+        label_ergebnis.config(text=f"❌ {e}")
+        return
+
+    zeilen = [f"✅ Die berechneten Lademeter betragen: {beladung.lademeter} m"]
+    startort, zielort, km_manuell = var_start.get().strip(), var_ziel.get().strip(), var_km.get().strip()
+    kilometer = None
+    if startort and zielort:
+        try:
+            kilometer = live.route(startort, zielort)
+        except OrtNichtLokal as e:
+            zeilen.append(f"📍 {e}")
+        except ValueError as e:
+            zeilen.append(f"❌ Route konnte nicht berechnet werden ({e}) - Kilometer manuell eingeben oder erneut berechnen.")
+        else:
+            if kilometer is None:
+                zeilen.append("🔄 Entfernung wird berechnet...")
+                if route_geplant is None and (live_route_laeuft or ())[:2] != (startort, zielort):
+                    live_route_starten()
+    elif km_manuell:
+        try:
+            kilometer = float(km_manuell)
+        except ValueError:
+            zeilen.append("❌ Ungültige Kilometerangabe")
+    else:
+        zeilen.append("📏 Start- und Zielort ODER die Kilometer eingeben")
+
+    if kilometer is not None:
+        try:
+            preis = live.preis(kilometer, fahrzeug, beladung.lademeter)
+        except ValueError as e:
+            zeilen.append(f"📏 Entfernung: {kilometer} km\n❌ {e}")
+        else:
+            current_lademeter, current_kilometer, current_preis = beladung.lademeter, kilometer, preis
+            zeilen.append(f"📏 Entfernung: {kilometer} km\n💶 Ungefährer Preis: {preis} €")
+    zeilen.append(f"🚛 Beladung: {beladung_beschreiben(beladung, fahrzeug)}")
+    label_ergebnis.config(text="\n".join(zeilen))
+
+def fortschritt_anzeigen(aktiv):
+    if aktiv:
+        progress_route.grid(row=16, column=0, columnspan=2, pady=5)
+        progress_route.start(10)
+    else:
+        progress_route.stop()
+        progress_route.grid_remove()
+
+def cache_status_aktualisieren():
+    statistik = get_cache().statistik()
+    label_cache.config(
+        text=f"Orts-Cache: {statistik['eintraege']} Orte, {statistik['treffer']} Treffer, {statistik['fehlversuche']} Fehlversuche"
     )
 
+def autovervollstaendigung_einrichten(entry, var):
+    """Zeigt beim Tippen passende Orte aus dem lokalen Gazetteer unter dem Eingabefeld an"""
+    liste = tk.Listbox(entry.master, height=6, font=("Arial", 11), activestyle="dotbox")
+    eingaben = []           # Eingabetexte zu den angezeigten Vorschlägen
+    uebernehmen_aktiv = []  # gesetzt, während ein Vorschlag ins Feld geschrieben wird
+
+    def schliessen(*_):
+        liste.place_forget()
+
+    def aktualisieren(*_):
+        if uebernehmen_aktiv or not gazetteer_bereit() or root.focus_get() is not entry:
+            return
+        vorschlaege = get_gazetteer().vorschlaege(var.get())
+        if not vorschlaege:
+            schliessen()
+            return
+        liste.delete(0, "end")
+        eingaben[:] = [eingabe for _, eingabe in vorschlaege]
+        for anzeige, _ in vorschlaege:
+            liste.insert("end", anzeige)
+        liste.config(height=len(vorschlaege))
+        liste.place(in_=entry, x=0, rely=1.0, relwidth=1.0)
+        liste.lift()
+
+    def uebernehmen(*_):
+        auswahl = liste.curselection()
+        if auswahl:
+            uebernehmen_aktiv.append(True)
+            var.set(eingaben[auswahl[0]])
+            uebernehmen_aktiv.clear()
+            entry.icursor("end")
+        schliessen()
+        entry.focus_set()
+        return "break"
+
+    def in_liste_wechseln(*_):
+        if liste.winfo_ismapped():
+            liste.focus_set()
+            liste.selection_clear(0, "end")
+            liste.selection_set(0)
+            liste.activate(0)
+        return "break"
+
+    def fokus_verloren(*_):
+        # Verzögert, damit ein Klick in die Liste noch ankommt
+        root.after(150, lambda: root.focus_get() is not liste and schliessen())
+
+    var.trace_add("write", aktualisieren)
+    entry.bind("<Down>", in_liste_wechseln)
+    entry.bind("<Escape>", schliessen)
+    entry.bind("<FocusOut>", fokus_verloren)
+    liste.bind("<ButtonRelease-1>", uebernehmen)
+    liste.bind("<Return>", uebernehmen)
+    liste.bind("<Escape>", lambda *_: (schliessen(), entry.focus_set()))
+    liste.bind("<FocusOut>", fokus_verloren)
+
 # Excel-Bearbeitungsfunktionen
 excel_file_path = None
 current_lademeter = None
 current_kilometer = None
 current_preis = None
 is_old_xls = False
+excel_sitzung = None  # Vorgemerkte Änderungen für die ausgewählte Datei
 
 def excel_datei_auswaehlen():
-    global excel_file_path, is_old_xls
+    global excel_file_path, is_old_xls, excel_sitzung
     filepath = filedialog.askopenfilename(
         title="Excel-Datei auswählen",
         filetypes=[("Excel files", "*.xls *.xlsx"), ("All files", "*.*")]
     )
     if filepath:
+        if excel_sitzung and not messagebox.askyesno("Hinweis", f"{len(excel_sitzung)} vorgemerkte Änderung(en) wurden noch nicht gespeichert.\n\nVerwerfen und neue Datei laden?"):
+            return
         excel_file_path = filepath
         is_old_xls = filepath.endswith('.xls')
+        excel_sitzung = ExcelSitzung(filepath)
+        sitzung_status_aktualisieren()
         excel_label_datei.config(text=f"📄 Datei: {os.path.basename(filepath)}", fg="green")
         messagebox.showinfo("Erfolg", f"Datei geladen:\n{os.path.basename(filepath)}")
 
-def cell_to_index(cell_ref):
-    """Konvertiert Excel-Zellreferenz wie 'E14' zu (Zeile, Spalte) für xlrd/xlwt"""
-    import re
-    match = re.match(r'([A-Z]+)(\d+)', cell_ref)
-    if not match:
-        return None
-    col_str, row_str = match.groups()
-    
-    # Spalte berechnen (A=0, B=1, etc.)
-    col = 0
-    for char in col_str:
-        col = col * 26 + (ord(char) - ord('A')) + 1
-    col -= 1
-    
-    # Zeile (1-basiert zu 0-basiert)
-    row = int(row_str) - 1
-    
-    return (row, col)
-
 def wolfsburg_einfuegen():
     if not excel_file_path:
         messagebox.showerror("Fehler", "Bitte zuerst eine Excel-Datei auswählen!")
@@ -202,6 +391,7 @@ KOORDINATES VW 52.436059, 10.750163"""
 def excel_daten_schreiben(zelle, wert, max_zeilen=None):
     """
     Schreibt Daten in Excel. Mehrzeilige Texte werden über mehrere Zeilen verteilt.
+    Im Sammelmodus wird der Wert nur vorgemerkt und erst mit "Alle speichern" geschrieben.
     
     Args:
         zelle: Startzelle (z.B. 'E14')
@@ -213,74 +403,75 @@ def excel_daten_schreiben(zelle, wert, max_zeilen=None):
         return False
     
     try:
-        # Prüfe ob mehrzeiliger Text - split nur bei echten Zeilenumbrüchen
-        zeilen = []
-        if isinstance(wert, str):
-            zeilen = wert.split('\n')
-            # Entferne leere Zeilen am Ende
-            while zeilen and not zeilen[-1].strip():
-                zeilen.pop()
-        else:
-            zeilen = [str(wert)]
-        
-        if not zeilen:
-            zeilen = ['']
-        
-        if is_old_xls:
-            # Alte .xls Datei mit xlrd/xlwt
-            rb = xlrd.open_workbook(excel_file_path, formatting_info=True)
-            wb = xl_copy(rb)
-            
-            # Suche nach Sheet "Rechnung"
-            sheet_idx = None
-            for i in range(rb.nsheets):
-                if rb.sheet_by_index(i).name == "Rechnung":
-                    sheet_idx = i
-                    break
-            
-            if sheet_idx is None:
-                messagebox.showerror("Fehler", "Sheet 'Rechnung' nicht gefunden!")
-                return False
-            
-            ws = wb.get_sheet(sheet_idx)
-            start_row, col = cell_to_index(zelle)
-            
-            # Schreibe jede Zeile in eine separate Zeile
-            zeilen_geschrieben = min(len(zeilen), max_zeilen) if max_zeilen else len(zeilen)
-            for i in range(zeilen_geschrieben):
-                ws.write(start_row + i, col, zeilen[i])
-            
-            wb.save(excel_file_path)
-            messagebox.showinfo("✅ Erfolg", f"Daten wurden ab Zelle {zelle} über {zeilen_geschrieben} Zeile(n) (Sheet: Rechnung) gespeichert!\n\nDatei: {os.path.basename(excel_file_path)}\n\n⚠️ WICHTIG: Bitte schließen Sie die Excel-Datei und öffnen Sie sie neu, um die Änderungen zu sehen!")
-            return True
-        else:
-            # Neue .xlsx Datei mit openpyxl
-            wb = openpyxl.load_workbook(excel_file_path)
-            
-            # Suche nach Sheet "Rechnung"
-            if "Rechnung" not in wb.sheetnames:
-                messagebox.showerror("Fehler", "Sheet 'Rechnung' nicht gefunden!")
-                return False
-            
-            ws = wb["Rechnung"]
-            
-            # Hole Start-Zelle
-            start_cell = ws[zelle]
-            start_row = start_cell.row
-            start_col = start_cell.column
-            
-            # Schreibe jede Zeile in eine separate Zeile
-            zeilen_geschrieben = min(len(zeilen), max_zeilen) if max_zeilen else len(zeilen)
-            for i in range(zeilen_geschrieben):
-                ws.cell(row=start_row + i, column=start_col, value=zeilen[i])
-            
-            wb.save(excel_file_path)
-            messagebox.showinfo("✅ Erfolg", f"Daten wurden ab Zelle {zelle} über {zeilen_geschrieben} Zeile(n) (Sheet: Rechnung) gespeichert!\n\nDatei: {os.path.basename(excel_file_path)}\n\n⚠️ WICHTIG: Bitte schließen Sie die Excel-Datei und öffnen Sie sie neu, um die Änderungen zu sehen!")
+        if var_sammelmodus.get():
+            zeilen_geschrieben = excel_sitzung.vormerken(zelle, wert, max_zeilen)
+            sitzung_status_aktualisieren()
             return True
+        zeilen_geschrieben = zellen_schreiben(excel_file_path, zelle, wert, max_zeilen)
+        messagebox.showinfo("✅ Erfolg", f"Daten wurden ab Zelle {zelle} über {zeilen_geschrieben} Zeile(n) (Sheet: Rechnung) gespeichert!\n\nDatei: {os.path.basename(excel_file_path)}\n\n⚠️ WICHTIG: Bitte schließen Sie die Excel-Datei und öffnen Sie sie neu, um die Änderungen zu sehen!")
+        return True
     except Exception as e:
         messagebox.showerror("Fehler", f"Fehler beim Schreiben in {zelle}: {e}")
         return False
 
+def sitzung_status_aktualisieren():
+    anzahl = len(excel_sitzung) if excel_sitzung else 0
+    excel_label_sitzung.config(
+        text=f"📝 {anzahl} Änderung(en) vorgemerkt" if anzahl else "Keine Änderungen vorgemerkt",
+        fg="#FF9800" if anzahl else "gray"
+    )
+
+def alle_felder_vormerken():
+    """Merkt alle ausgefüllten Felder aus Tab 2 in der Sitzung vor"""
+    texte = [
+        ('E14', excel_entry_e14.get("1.0", "end-1c"), 6),
+        ('E36', excel_entry_e36.get().strip(), None),
+        ('E35', excel_entry_e35.get().strip(), None),
+        ('E40', excel_entry_e40.get().strip(), None),
+        (excel_combo_lade_entlade.get(), excel_entry_e31_e37.get("1.0", "end-1c"), None),
+        ('K42', excel_entry_k42.get("1.0", "end-1c"), None),
+        ('K51', excel_entry_k51.get("1.0", "end-1c"), None),
+        ('D22', excel_entry_d22.get().strip(), None),
+        ('J22', excel_entry_j22.get().strip(), None),
+    ]
+    for zelle, text, max_zeilen in texte:
+        if zelle and text.strip():
+            excel_sitzung.vormerken(zelle, text, max_zeilen)
+
+def sitzung_vorschau():
+    if not excel_sitzung:
+        messagebox.showinfo("Vorschau", "Keine Änderungen vorgemerkt.")
+        return
+    zeilen = []
+    for zelle, texte in excel_sitzung.vorschau():
+        zeilen.append(f"{zelle}: " + " | ".join(t.strip() for t in texte))
+    messagebox.showinfo("Vorschau", "Folgende Werte werden gespeichert (Sheet: Rechnung):\n\n" + "\n".join(zeilen))
+
+def alle_speichern():
+    """Schreibt alle ausgefüllten Felder und vorgemerkten Werte mit einem einzigen Speichervorgang"""
+    if not excel_file_path:
+        messagebox.showerror("Fehler", "Bitte zuerst eine Excel-Datei auswählen!")
+        return False
+    try:
+        alle_felder_vormerken()
+        if not excel_sitzung:
+            messagebox.showwarning("Hinweis", "Es sind keine Felder ausgefüllt.")
+            return False
+        anzahl = len(excel_sitzung)
+        zellen = excel_sitzung.speichern()
+        messagebox.showinfo("✅ Erfolg", f"{anzahl} Eintrag/Einträge ({zellen} Zellen, Sheet: Rechnung) in einem Schritt gespeichert!\n\nDatei: {os.path.basename(excel_file_path)}\n\n⚠️ WICHTIG: Bitte schließen Sie die Excel-Datei und öffnen Sie sie neu, um die Änderungen zu sehen!")
+        return True
+    except Exception as e:
+        messagebox.showerror("Fehler", f"Fehler beim Speichern: {e}")
+        return False
+    finally:
+        sitzung_status_aktualisieren()
+
+def sitzung_verwerfen():
+    if excel_sitzung:
+        excel_sitzung.verwerfen()
+    sitzung_status_aktualisieren()
+
 def partnerdaten_einfuegen():
     text = excel_entry_e14.get("1.0", "end-1c")
     # E14 bis E19 (Firma, Name, Adresse, PLZ, Ust-IdNr = max 6 Zeilen)
@@ -333,157 +524,439 @@ def daten_aus_tab1_uebernehmen():
     else:
         messagebox.showwarning("Hinweis", "Bitte zuerst in Tab 1 eine Berechnung durchführen!")
 
-root = tk.Tk()
-root.title("Lademeter-Berechnungstool")
-
-# Font-Definitionen
-label_font = ("Arial", 12)
-entry_font = ("Arial", 12)
-
-# Tab-Control erstellen
-tab_control = ttk.Notebook(root)
-
-# Tab 1: Lademeter-Berechnung
-tab1 = ttk.Frame(tab_control)
-tab_control.add(tab1, text="📦 Lademeter-Berechnung")
-
-# Tab 2: Excel-Bearbeitung
-tab2 = ttk.Frame(tab_control)
-tab_control.add(tab2, text="📊 Excel-Bearbeitung")
-
-tab_control.pack(expand=1, fill="both")
-
-# ========== TAB 1: Lademeter-Berechnung ==========
-
-tk.Label(tab1, text="Palettengröße (z.B. 120x100x100):", font=label_font).grid(row=0, column=0, sticky="e", padx=10, pady=8)
-entry_groesse = tk.Entry(tab1, width=30, font=entry_font)
-entry_groesse.grid(row=0, column=1, padx=10, pady=8)
-
-tk.Label(tab1, text="Anzahl der Paletten:", font=label_font).grid(row=1, column=0, sticky="e", padx=10, pady=8)
-entry_menge = tk.Entry(tab1, width=30, font=entry_font)
-entry_menge.grid(row=1, column=1, padx=10, pady=8)
-
-tk.Label(tab1, text="Stapelbarkeit (z.B. 1, 2, 3):", font=label_font).grid(row=2, column=0, sticky="e", padx=10, pady=8)
-entry_stapel = tk.Entry(tab1, width=30, font=entry_font)
-entry_stapel.grid(row=2, column=1, padx=10, pady=8)
-
-# Trennlinie für Route/Kilometer Sektion
-tk.Label(tab1, text="━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", font=("Arial", 10)).grid(row=3, column=0, columnspan=2, pady=10)
-
-tk.Label(tab1, text="Startort (z.B. Berlin):", font=label_font).grid(row=4, column=0, sticky="e", padx=10, pady=8)
-entry_start = tk.Entry(tab1, width=30, font=entry_font)
-entry_start.grid(row=4, column=1, padx=10, pady=8)
-
-tk.Label(tab1, text="Zielort (z.B. München):", font=label_font).grid(row=5, column=0, sticky="e", padx=10, pady=8)
-entry_ziel = tk.Entry(tab1, width=30, font=entry_font)
-entry_ziel.grid(row=5, column=1, padx=10, pady=8)
-
-tk.Label(tab1, text="───── ODER ─────", font=("Arial", 10)).grid(row=6, column=0, columnspan=2, pady=8)
+# Auftragsarchiv: frühere Aufträge suchen und ihre Felder in Tab 2 bzw. die Strecke in Tab 1 übernehmen
+archiv_treffer = []          # angezeigte Aufträge (Dicts aus auftragsarchiv)
+archiv_auftrag = None        # zuletzt in Tab 2 übernommener Auftrag
+archiv_suche_geplant = None
+archiv_import_laeuft = False
+
+def archiv_suche_planen(*_):
+    """Sucht kurz nach dem letzten Tastendruck (nicht bei jedem Zeichen einzeln)"""
+    global archiv_suche_geplant
+    if archiv_suche_geplant is not None:
+        root.after_cancel(archiv_suche_geplant)
+    archiv_suche_geplant = root.after(150, archiv_suchen)
+
+def archiv_suchen():
+    from auftragsarchiv import auftragsarchiv_bereit, get_auftragsarchiv, ort_aus_adresse
+
+    global archiv_suche_geplant, archiv_treffer
+    archiv_suche_geplant = None
+    if not auftragsarchiv_bereit():
+        # Wird im Hintergrund geladen (auftragsarchiv_vorladen), bis dahin nachsehen
+        excel_label_archiv.config(text="🔄 Archiv wird geladen...", fg="gray")
+        archiv_suche_geplant = root.after(200, archiv_suchen)
+        return
+    archiv = get_auftragsarchiv()
+    archiv_treffer = archiv.suchen(var_archiv_suche.get())
+    liste_archiv.delete(0, "end")
+    for auftrag in archiv_treffer:
+        partner = auftrag["partner"].split("\n")[0]
+        strecke = f"{ort_aus_adresse(auftrag['ladestelle'])} → {ort_aus_adresse(auftrag['entladestelle'])}"
+        liste_archiv.insert("end", f"{auftrag['datum']} · {auftrag['auftragsnr'] or os.path.basename(auftrag['pfad'])}"
+                                   f" · {partner} · {strecke}")
+    if not len(archiv):
+        excel_label_archiv.config(text="Archiv ist leer - bitte einen Ordner importieren", fg="gray")
+    else:
+        excel_label_archiv.config(text=f"{len(archiv_treffer)} Treffer in {len(archiv)} Aufträgen", fg="gray")
 
-tk.Label(tab1, text="Kilometer (manuell):", font=label_font).grid(row=7, column=0, sticky="e", padx=10, pady=8)
-entry_km = tk.Entry(tab1, width=30, font=entry_font)
-entry_km.grid(row=7, column=1, padx=10, pady=8)
+def archiv_auswahl():
+    auswahl = liste_archiv.curselection()
+    if not auswahl:
+        messagebox.showwarning("Hinweis", "Bitte zuerst einen Auftrag in der Liste auswählen!")
+        return None
+    return archiv_treffer[auswahl[0]]
+
+def archiv_in_tab2(*_):
+    """Füllt die Felder von Tab 2 aus dem gewählten Auftrag; geschrieben wird erst mit den ✅-Buttons.
+    K51 (IDs/Dispo) gehört zum einzelnen Auftrag und bleibt unverändert."""
+    global archiv_auftrag
+    auftrag = archiv_auswahl()
+    if auftrag is None:
+        return
+    archiv_auftrag = auftrag
+    for feld, text in ((excel_entry_e14, auftrag["partner"]), (excel_entry_k42, auftrag["fahrzeug"])):
+        feld.delete("1.0", "end")
+        feld.insert("1.0", text)
+    for feld, text in ((excel_entry_e35, auftrag["e35"]), (excel_entry_e36, auftrag["e36"]),
+                       (excel_entry_e40, auftrag["e40"]), (excel_entry_d22, auftrag["kennzeichen"]),
+                       (excel_entry_j22, auftrag["fahrer"])):
+        feld.delete(0, "end")
+        feld.insert(0, text)
+    lade_entlade_gewechselt()
+
+def lade_entlade_gewechselt(*_):
+    """Zeigt nach einer Übernahme aus dem Archiv die Lade- (E31) bzw. Entladestelle (E37) des Auftrags"""
+    if archiv_auftrag is None:
+        return
+    text = archiv_auftrag["ladestelle" if excel_combo_lade_entlade.get() == "E31" else "entladestelle"]
+    excel_entry_e31_e37.delete("1.0", "end")
+    excel_entry_e31_e37.insert("1.0", text)
 
-tk.Label(tab1, text="Fahrzeugtyp:", font=label_font).grid(row=8, column=0, sticky="e", padx=10, pady=8)
-combo_fahrzeug = ttk.Combobox(tab1, values=[
-    "Sprinter", "Planensprinter", "Klein LKW", "7,5 Tonnen LKW", "Tautliner", "Mega", "Jumbo"
-], width=28, font=entry_font, state="readonly")
-combo_fahrzeug.current(0)
-combo_fahrzeug.grid(row=8, column=1, padx=10, pady=8)
+def archiv_in_tab1():
+    """Übernimmt Lade- und Entladeort des gewählten Auftrags als Start und Ziel in Tab 1"""
+    from auftragsarchiv import ort_aus_adresse
 
-tk.Label(tab1, text="").grid(row=9)  # Leerzeile für Abstand
-tk.Label(tab1, text="💡 Tipp: Einfach Start- und Zielort eingeben - Entfernung wird automatisch berechnet!", font=("Arial", 10)).grid(row=10, column=0, columnspan=2, pady=5)
-tk.Label(tab1, text="Hinweis: Stapelbarkeit 0 bedeutet, dass Paletten nicht stapelbar sind.", font=("Arial", 10)).grid(row=11, column=0, columnspan=2, pady=3)
-tk.Label(tab1, text="Die Berechnung des Preises ist eine Schätzung und kann variieren.", font=("Arial", 10)).grid(row=12, column=0, columnspan=2, pady=3)
+    auftrag = archiv_auswahl()
+    if auftrag is None:
+        return
+    var_start.set(ort_aus_adresse(auftrag["ladestelle"]))
+    var_ziel.set(ort_aus_adresse(auftrag["entladestelle"]))
+    tab_control.select(tab1)
 
-btn_berechnen = tk.Button(tab1, text="Berechnen", command=berechnen, bg="#2196F3", fg="white", font=("Arial", 14, "bold"), padx=40, pady=10, cursor="hand2")
-btn_berechnen.grid(row=13, column=0, columnspan=2, pady=15)
+def archiv_ordner_importieren():
+    """Importiert einen Ordner mit AU-Aufträgen im Hintergrund; der Fortschritt wird per
+    root.after abgeholt"""
+    from auftragsarchiv import archiv_importieren, get_auftragsarchiv
 
-label_ergebnis = tk.Label(tab1, text="Ergebnis wird hier angezeigt.", font=("Arial", 12), wraplength=500)
-label_ergebnis.grid(row=14, column=0, columnspan=2, pady=10)
+    global archiv_import_laeuft
+    if archiv_import_laeuft:
+        return
+    ordner = filedialog.askdirectory(title="Ordner mit AU-Aufträgen auswählen")
+    if not ordner:
+        return
+    archiv_import_laeuft = True
+    stand = {"fortschritt": (0, 0)}
+
+    def fortschritt(gelesen, gesamt):
+        stand["fortschritt"] = (gelesen, gesamt)
+
+    def importieren():
+        try:
+            stand["statistik"] = archiv_importieren(ordner, fortschritt=fortschritt)
+            get_auftragsarchiv()   # neu laden, solange wir noch im Hintergrund sind
+        except Exception as e:
+            stand["fehler"] = e
+
+    def abholen():
+        global archiv_import_laeuft
+        if "statistik" not in stand and "fehler" not in stand:
+            gelesen, gesamt = stand["fortschritt"]
+            excel_label_archiv.config(text=f"🔄 Import läuft... {gelesen} von {gesamt} Dateien" if gesamt
+                                      else "🔄 Import läuft...", fg="gray")
+            root.after(200, abholen)
+            return
+        archiv_import_laeuft = False
+        if "fehler" in stand:
+            excel_label_archiv.config(text="❌ Import fehlgeschlagen", fg="red")
+            messagebox.showerror("Fehler", f"Fehler beim Import: {stand['fehler']}")
+            return
+        statistik = stand["statistik"]
+        archiv_suchen()
+        messagebox.showinfo(
+            "Import abgeschlossen",
+            f"{statistik['gelesen']} Dateien gelesen, {statistik['unveraendert']} unverändert, "
+            f"{statistik['entfernt']} entfernt ({statistik['fehler']} nicht lesbar) in {statistik['sekunden']} s")
+
+    threading.Thread(target=importieren, name="Archivimport", daemon=True).start()
+    root.after(200, abholen)
+
+# Diagnose-Fenster: Laufzeiten der heißen Pfade (p50/p95 der letzten Aufrufe)
+diagnose_fenster = None
+diagnose_tabelle = None
+diagnose_label_zaehler = None
+
+def diagnose_umschalten(*_):
+    global diagnose_fenster, diagnose_tabelle, diagnose_label_zaehler
+    if diagnose_fenster is not None:
+        diagnose_fenster.destroy()
+        diagnose_fenster = None
+        return
+    diagnose_fenster = tk.Toplevel(root)
+    diagnose_fenster.title("Diagnose - Laufzeiten")
+    diagnose_fenster.protocol("WM_DELETE_WINDOW", diagnose_umschalten)
+    spalten = ("anzahl", "fehler", "p50_ms", "p95_ms", "max_ms")
+    diagnose_tabelle = ttk.Treeview(diagnose_fenster, columns=spalten, height=14)
+    diagnose_tabelle.heading("#0", text="Operation")
+    diagnose_tabelle.column("#0", width=220)
+    for spalte, titel in zip(spalten, ("Anzahl", "Fehler", "p50 (ms)", "p95 (ms)", "Max (ms)")):
+        diagnose_tabelle.heading(spalte, text=titel)
+        diagnose_tabelle.column(spalte, width=80, anchor="e")
+    diagnose_tabelle.pack(fill="both", expand=True, padx=5, pady=5)
+    diagnose_label_zaehler = tk.Label(diagnose_fenster, text="", font=("Arial", 9), fg="gray", justify="left", wraplength=600)
+    diagnose_label_zaehler.pack(padx=5, anchor="w")
+    frame = tk.Frame(diagnose_fenster)
+    frame.pack(pady=5)
+    tk.Button(frame, text="💾 Exportieren (JSON/CSV)", command=diagnose_exportieren).pack(side="left", padx=5)
+    tk.Button(frame, text="🗑 Zurücksetzen", command=instrumentierung.zuruecksetzen).pack(side="left", padx=5)
+    diagnose_aktualisieren()
+
+def diagnose_aktualisieren():
+    if diagnose_fenster is None:
+        return
+    daten = instrumentierung.statistik()
+    diagnose_tabelle.delete(*diagnose_tabelle.get_children())
+    for name, werte in daten["operationen"].items():
+        diagnose_tabelle.insert("", "end", text=name, values=(
+            werte["anzahl"], werte["fehler"], f"{werte['p50_ms']:.2f}", f"{werte['p95_ms']:.2f}", f"{werte['max_ms']:.1f}"))
+    diagnose_label_zaehler.config(text="Zähler: " + (", ".join(f"{name} {anzahl}" for name, anzahl in daten["zaehler"].items()) or "-"))
+    diagnose_fenster.after(1000, diagnose_aktualisieren)
+
+def diagnose_exportieren():
+    pfad = filedialog.asksaveasfilename(
+        parent=diagnose_fenster, title="Messwerte exportieren", defaultextension=".json",
+        filetypes=[("JSON", "*.json"), ("CSV", "*.csv")]
+    )
+    if pfad:
+        try:
+            instrumentierung.exportieren(pfad)
+        except OSError as e:
+            messagebox.showerror("Fehler", f"Export fehlgeschlagen: {e}", parent=diagnose_fenster)
+
+def fenster_aufbauen():
+    """Hauptfenster mit Tab 1 (Tab 2 folgt beim ersten Öffnen, siehe tab2_aufbauen)"""
+    global root, label_font, entry_font, tab_control, tab1, tab2
+    global var_groesse, entry_groesse, var_menge, entry_menge, var_stapel, entry_stapel
+    global var_start, entry_start, var_ziel, entry_ziel, var_km, entry_km, combo_fahrzeug
+    global label_ergebnis, label_cache, progress_route, var_live
+    root = tk.Tk()
+    root.title("Lademeter-Berechnungstool")
+
+    # Font-Definitionen
+    label_font = ("Arial", 12)
+    entry_font = ("Arial", 12)
+
+    # Tab-Control erstellen
+    tab_control = ttk.Notebook(root)
+
+    # Tab 1: Lademeter-Berechnung
+    tab1 = ttk.Frame(tab_control)
+    tab_control.add(tab1, text="📦 Lademeter-Berechnung")
+
+    # Tab 2: Excel-Bearbeitung
+    tab2 = ttk.Frame(tab_control)
+    tab_control.add(tab2, text="📊 Excel-Bearbeitung")
+
+    tab_control.pack(expand=1, fill="both")
+
+    # ========== TAB 1: Lademeter-Berechnung ==========
+
+    tk.Label(tab1, text="Palettengröße (z.B. 120x100x100):", font=label_font).grid(row=0, column=0, sticky="e", padx=10, pady=8)
+    var_groesse = tk.StringVar()
+    entry_groesse = tk.Entry(tab1, width=30, font=entry_font, textvariable=var_groesse)
+    entry_groesse.grid(row=0, column=1, padx=10, pady=8)
+
+    tk.Label(tab1, text="Anzahl der Paletten:", font=label_font).grid(row=1, column=0, sticky="e", padx=10, pady=8)
+    var_menge = tk.StringVar()
+    entry_menge = tk.Entry(tab1, width=30, font=entry_font, textvariable=var_menge)
+    entry_menge.grid(row=1, column=1, padx=10, pady=8)
+
+    tk.Label(tab1, text="Stapelbarkeit (z.B. 1, 2, 3):", font=label_font).grid(row=2, column=0, sticky="e", padx=10, pady=8)
+    var_stapel = tk.StringVar()
+    entry_stapel = tk.Entry(tab1, width=30, font=entry_font, textvariable=var_stapel)
+    entry_stapel.grid(row=2, column=1, padx=10, pady=8)
+
+    # Trennlinie für Route/Kilometer Sektion
+    tk.Label(tab1, text="━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", font=("Arial", 10)).grid(row=3, column=0, columnspan=2, pady=10)
+
+    tk.Label(tab1, text="Startort (z.B. Berlin):", font=label_font).grid(row=4, column=0, sticky="e", padx=10, pady=8)
+    var_start = tk.StringVar()
+    entry_start = tk.Entry(tab1, width=30, font=entry_font, textvariable=var_start)
+    entry_start.grid(row=4, column=1, padx=10, pady=8)
+
+    tk.Label(tab1, text="Zielort (z.B. München):", font=label_font).grid(row=5, column=0, sticky="e", padx=10, pady=8)
+    var_ziel = tk.StringVar()
+    entry_ziel = tk.Entry(tab1, width=30, font=entry_font, textvariable=var_ziel)
+    entry_ziel.grid(row=5, column=1, padx=10, pady=8)
+
+    tk.Label(tab1, text="───── ODER ─────", font=("Arial", 10)).grid(row=6, column=0, columnspan=2, pady=8)
+
+    tk.Label(tab1, text="Kilometer (manuell):", font=label_font).grid(row=7, column=0, sticky="e", padx=10, pady=8)
+    var_km = tk.StringVar()
+    entry_km = tk.Entry(tab1, width=30, font=entry_font, textvariable=var_km)
+    entry_km.grid(row=7, column=1, padx=10, pady=8)
+
+    tk.Label(tab1, text="Fahrzeugtyp:", font=label_font).grid(row=8, column=0, sticky="e", padx=10, pady=8)
+    # Die Liste folgt dem geltenden Tarif; beim Aufklappen neu, falls die Tarifdatei geändert wurde
+    combo_fahrzeug = ttk.Combobox(tab1, values=verfuegbare_fahrzeuge(), width=28, font=entry_font, state="readonly",
+                                  postcommand=lambda: combo_fahrzeug.configure(values=verfuegbare_fahrzeuge()))
+    combo_fahrzeug.current(0)
+    combo_fahrzeug.grid(row=8, column=1, padx=10, pady=8)
+
+    var_live = tk.BooleanVar(value=True)
+    tk.Checkbutton(tab1, text="⚡ Live-Berechnung (Ergebnis beim Tippen aktualisieren)", variable=var_live,
+                   command=live_umgeschaltet, font=("Arial", 10)).grid(row=9, column=0, columnspan=2, pady=3)
+    tk.Label(tab1, text="💡 Tipp: Einfach Start- und Zielort eingeben - Entfernung wird automatisch berechnet!", font=("Arial", 10)).grid(row=10, column=0, columnspan=2, pady=5)
+    tk.Label(tab1, text="Hinweis: Stapelbarkeit 0 bedeutet, dass Paletten nicht stapelbar sind.", font=("Arial", 10)).grid(row=11, column=0, columnspan=2, pady=3)
+    tk.Label(tab1, text="Die Berechnung des Preises ist eine Schätzung und kann variieren.", font=("Arial", 10)).grid(row=12, column=0, columnspan=2, pady=3)
+
+    btn_berechnen = tk.Button(tab1, text="Berechnen", command=berechnen, bg="#2196F3", fg="white", font=("Arial", 14, "bold"), padx=40, pady=10, cursor="hand2")
+    btn_berechnen.grid(row=13, column=0, columnspan=2, pady=15)
+
+    label_ergebnis = tk.Label(tab1, text="Ergebnis wird hier angezeigt.", font=("Arial", 12), wraplength=500)
+    label_ergebnis.grid(row=14, column=0, columnspan=2, pady=10)
+
+    label_cache = tk.Label(tab1, text="", font=("Arial", 9), fg="gray")
+    label_cache.grid(row=15, column=0, columnspan=2, pady=2)
+
+    progress_route = ttk.Progressbar(tab1, mode="indeterminate", length=300)
+
+    tk.Button(tab1, text="📊 Diagnose (F12)", command=diagnose_umschalten, font=("Arial", 9)).grid(row=17, column=0, columnspan=2, pady=2)
+    root.bind("<F12>", diagnose_umschalten)
+
+    # Änderungen an den Eingaben aktualisieren das Ergebnis (Live-Modus) bzw. brechen eine
+    # laufende Routenberechnung ab; eine laufende Route bricht nur bei Start/Ziel ab
+    for var in (var_groesse, var_menge, var_stapel, var_km):
+        var.trace_add("write", lambda *_: eingabe_geaendert())
+    for var in (var_start, var_ziel):
+        var.trace_add("write", lambda *_: eingabe_geaendert(route_betroffen=True))
+    combo_fahrzeug.bind("<<ComboboxSelected>>", lambda *_: eingabe_geaendert())
+
+    # Ortsvorschläge aus dem lokalen Gazetteer
+    autovervollstaendigung_einrichten(entry_start, var_start)
+    autovervollstaendigung_einrichten(entry_ziel, var_ziel)
 
 # ========== TAB 2: Excel-Bearbeitung ==========
+# Wird erst beim ersten Öffnen des Tabs aufgebaut (Startzeit)
+
+tab2_aufgebaut = False
 
-# Datei auswählen
-tk.Label(tab2, text="Excel-Datei auswählen:", font=("Arial", 14, "bold")).grid(row=0, column=0, columnspan=3, pady=10)
-btn_excel_auswaehlen = tk.Button(tab2, text="📁 Datei auswählen", command=excel_datei_auswaehlen, bg="#FF9800", fg="white", font=("Arial", 12, "bold"), padx=20, pady=5)
-btn_excel_auswaehlen.grid(row=1, column=0, columnspan=3, pady=5)
-excel_label_datei = tk.Label(tab2, text="Keine Datei ausgewählt", font=("Arial", 10), fg="red")
-excel_label_datei.grid(row=2, column=0, columnspan=3, pady=5)
-
-# Wolfsburg Button
-tk.Label(tab2, text="━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", font=("Arial", 10)).grid(row=3, column=0, columnspan=3, pady=10)
-btn_wolfsburg = tk.Button(tab2, text="🚛 Wolfsburg-Daten einfügen (E37)", command=wolfsburg_einfuegen, bg="#4CAF50", fg="white", font=("Arial", 12, "bold"), padx=20, pady=5)
-btn_wolfsburg.grid(row=4, column=0, columnspan=3, pady=10)
-
-# Partnerdaten E14
-tk.Label(tab2, text="━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", font=("Arial", 10)).grid(row=5, column=0, columnspan=3, pady=10)
-tk.Label(tab2, text="Partnerdaten (E14):", font=label_font).grid(row=6, column=0, sticky="w", padx=10, pady=5)
-excel_entry_e14 = tk.Text(tab2, width=40, height=3, font=entry_font)
-excel_entry_e14.grid(row=7, column=0, columnspan=2, padx=10, pady=5)
-btn_e14 = tk.Button(tab2, text="✅ In E14 einfügen", command=partnerdaten_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
-btn_e14.grid(row=7, column=2, padx=5)
-
-# E36, E40, E35
-tk.Label(tab2, text="E36:", font=label_font).grid(row=8, column=0, sticky="e", padx=10, pady=5)
-excel_entry_e36 = tk.Entry(tab2, width=30, font=entry_font)
-excel_entry_e36.grid(row=8, column=1, padx=5)
-btn_e36 = tk.Button(tab2, text="✅", command=e36_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
-btn_e36.grid(row=8, column=2, padx=5)
-
-tk.Label(tab2, text="E35:", font=label_font).grid(row=9, column=0, sticky="e", padx=10, pady=5)
-excel_entry_e35 = tk.Entry(tab2, width=30, font=entry_font)
-excel_entry_e35.grid(row=9, column=1, padx=5)
-btn_e35 = tk.Button(tab2, text="✅", command=e35_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
-btn_e35.grid(row=9, column=2, padx=5)
-
-tk.Label(tab2, text="E40:", font=label_font).grid(row=10, column=0, sticky="e", padx=10, pady=5)
-excel_entry_e40 = tk.Entry(tab2, width=30, font=entry_font)
-excel_entry_e40.grid(row=10, column=1, padx=5)
-btn_e40 = tk.Button(tab2, text="✅", command=e40_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
-btn_e40.grid(row=10, column=2, padx=5)
-
-# Lade/Entladestelle E31/E37
-tk.Label(tab2, text="━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", font=("Arial", 10)).grid(row=11, column=0, columnspan=3, pady=10)
-tk.Label(tab2, text="Lade-/Entladestelle:", font=label_font).grid(row=12, column=0, sticky="w", padx=10, pady=5)
-excel_combo_lade_entlade = ttk.Combobox(tab2, values=["E31", "E37"], width=10, font=entry_font, state="readonly")
-excel_combo_lade_entlade.current(0)
-excel_combo_lade_entlade.grid(row=12, column=1, sticky="w", padx=5)
-excel_entry_e31_e37 = tk.Text(tab2, width=40, height=3, font=entry_font)
-excel_entry_e31_e37.grid(row=13, column=0, columnspan=2, padx=10, pady=5)
-btn_lade = tk.Button(tab2, text="✅ Einfügen", command=lade_entlade_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
-btn_lade.grid(row=13, column=2, padx=5)
-
-# Fahrzeug/Paletten K42
-tk.Label(tab2, text="━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", font=("Arial", 10)).grid(row=14, column=0, columnspan=3, pady=10)
-tk.Label(tab2, text="Fahrzeug/Paletten/Kilo (K42):", font=label_font).grid(row=15, column=0, sticky="w", padx=10, pady=5)
-btn_tab1_uebernehmen = tk.Button(tab2, text="📦 Aus Tab 1 übernehmen", command=daten_aus_tab1_uebernehmen, bg="#9C27B0", fg="white", font=("Arial", 10, "bold"))
-btn_tab1_uebernehmen.grid(row=15, column=1, columnspan=2, pady=5)
-excel_entry_k42 = tk.Text(tab2, width=40, height=3, font=entry_font)
-excel_entry_k42.grid(row=16, column=0, columnspan=2, padx=10, pady=5)
-btn_k42 = tk.Button(tab2, text="✅ In K42 einfügen", command=fahrzeug_daten_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
-btn_k42.grid(row=16, column=2, padx=5)
-
-# IDs K51
-tk.Label(tab2, text="IDs/Partner Dispo (K51):", font=label_font).grid(row=17, column=0, sticky="w", padx=10, pady=5)
-excel_entry_k51 = tk.Text(tab2, width=40, height=3, font=entry_font)
-excel_entry_k51.grid(row=18, column=0, columnspan=2, padx=10, pady=5)
-btn_k51 = tk.Button(tab2, text="✅ In K51 einfügen", command=ids_daten_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
-btn_k51.grid(row=18, column=2, padx=5)
-
-# Kennzeichen D22
-tk.Label(tab2, text="━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", font=("Arial", 10)).grid(row=19, column=0, columnspan=3, pady=10)
-tk.Label(tab2, text="Kennzeichen (D22):", font=label_font).grid(row=20, column=0, sticky="e", padx=10, pady=5)
-excel_entry_d22 = tk.Entry(tab2, width=30, font=entry_font)
-excel_entry_d22.grid(row=20, column=1, padx=5)
-btn_d22 = tk.Button(tab2, text="✅", command=kennzeichen_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
-btn_d22.grid(row=20, column=2, padx=5)
-
-# Fahrername J22
-tk.Label(tab2, text="Fahrername (J22):", font=label_font).grid(row=21, column=0, sticky="e", padx=10, pady=5)
-excel_entry_j22 = tk.Entry(tab2, width=30, font=entry_font)
-excel_entry_j22.grid(row=21, column=1, padx=5)
-btn_j22 = tk.Button(tab2, text="✅", command=fahrername_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
-btn_j22.grid(row=21, column=2, padx=5)
-
-root.mainloop()
+def tab2_aufbauen():
+    global tab2_aufgebaut, excel_label_datei, excel_entry_e14, excel_entry_e36, excel_entry_e35, excel_entry_e40
+    global excel_combo_lade_entlade, excel_entry_e31_e37, excel_entry_k42, excel_entry_k51
+    global excel_entry_d22, excel_entry_j22, var_sammelmodus, excel_label_sitzung
+    global var_archiv_suche, liste_archiv, excel_label_archiv
+    if tab2_aufgebaut:
+        return
+    tab2_aufgebaut = True
+
+    # Datei auswählen
+    tk.Label(tab2, text="Excel-Datei auswählen:", font=("Arial", 14, "bold")).grid(row=0, column=0, columnspan=3, pady=10)
+    btn_excel_auswaehlen = tk.Button(tab2, text="📁 Datei auswählen", command=excel_datei_auswaehlen, bg="#FF9800", fg="white", font=("Arial", 12, "bold"), padx=20, pady=5)
+    btn_excel_auswaehlen.grid(row=1, column=0, columnspan=3, pady=5)
+    excel_label_datei = tk.Label(tab2, text="Keine Datei ausgewählt", font=("Arial", 10), fg="red")
+    excel_label_datei.grid(row=2, column=0, columnspan=3, pady=5)
+
+    # Wolfsburg Button
+    tk.Label(tab2, text="━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", font=("Arial", 10)).grid(row=3, column=0, columnspan=3, pady=10)
+    btn_wolfsburg = tk.Button(tab2, text="🚛 Wolfsburg-Daten einfügen (E37)", command=wolfsburg_einfuegen, bg="#4CAF50", fg="white", font=("Arial", 12, "bold"), padx=20, pady=5)
+    btn_wolfsburg.grid(row=4, column=0, columnspan=3, pady=10)
+
+    # Partnerdaten E14
+    tk.Label(tab2, text="━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", font=("Arial", 10)).grid(row=5, column=0, columnspan=3, pady=10)
+    tk.Label(tab2, text="Partnerdaten (E14):", font=label_font).grid(row=6, column=0, sticky="w", padx=10, pady=5)
+    excel_entry_e14 = tk.Text(tab2, width=40, height=3, font=entry_font)
+    excel_entry_e14.grid(row=7, column=0, columnspan=2, padx=10, pady=5)
+    btn_e14 = tk.Button(tab2, text="✅ In E14 einfügen", command=partnerdaten_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
+    btn_e14.grid(row=7, column=2, padx=5)
+
+    # E36, E40, E35
+    tk.Label(tab2, text="E36:", font=label_font).grid(row=8, column=0, sticky="e", padx=10, pady=5)
+    excel_entry_e36 = tk.Entry(tab2, width=30, font=entry_font)
+    excel_entry_e36.grid(row=8, column=1, padx=5)
+    btn_e36 = tk.Button(tab2, text="✅", command=e36_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
+    btn_e36.grid(row=8, column=2, padx=5)
+
+    tk.Label(tab2, text="E35:", font=label_font).grid(row=9, column=0, sticky="e", padx=10, pady=5)
+    excel_entry_e35 = tk.Entry(tab2, width=30, font=entry_font)
+    excel_entry_e35.grid(row=9, column=1, padx=5)
+    btn_e35 = tk.Button(tab2, text="✅", command=e35_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
+    btn_e35.grid(row=9, column=2, padx=5)
+
+    tk.Label(tab2, text="E40:", font=label_font).grid(row=10, column=0, sticky="e", padx=10, pady=5)
+    excel_entry_e40 = tk.Entry(tab2, width=30, font=entry_font)
+    excel_entry_e40.grid(row=10, column=1, padx=5)
+    btn_e40 = tk.Button(tab2, text="✅", command=e40_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
+    btn_e40.grid(row=10, column=2, padx=5)
+
+    # Lade/Entladestelle E31/E37
+    tk.Label(tab2, text="━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", font=("Arial", 10)).grid(row=11, column=0, columnspan=3, pady=10)
+    tk.Label(tab2, text="Lade-/Entladestelle:", font=label_font).grid(row=12, column=0, sticky="w", padx=10, pady=5)
+    excel_combo_lade_entlade = ttk.Combobox(tab2, values=["E31", "E37"], width=10, font=entry_font, state="readonly")
+    excel_combo_lade_entlade.current(0)
+    excel_combo_lade_entlade.bind("<<ComboboxSelected>>", lade_entlade_gewechselt)
+    excel_combo_lade_entlade.grid(row=12, column=1, sticky="w", padx=5)
+    excel_entry_e31_e37 = tk.Text(tab2, width=40, height=3, font=entry_font)
+    excel_entry_e31_e37.grid(row=13, column=0, columnspan=2, padx=10, pady=5)
+    btn_lade = tk.Button(tab2, text="✅ Einfügen", command=lade_entlade_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
+    btn_lade.grid(row=13, column=2, padx=5)
+
+    # Fahrzeug/Paletten K42
+    tk.Label(tab2, text="━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", font=("Arial", 10)).grid(row=14, column=0, columnspan=3, pady=10)
+    tk.Label(tab2, text="Fahrzeug/Paletten/Kilo (K42):", font=label_font).grid(row=15, column=0, sticky="w", padx=10, pady=5)
+    btn_tab1_uebernehmen = tk.Button(tab2, text="📦 Aus Tab 1 übernehmen", command=daten_aus_tab1_uebernehmen, bg="#9C27B0", fg="white", font=("Arial", 10, "bold"))
+    btn_tab1_uebernehmen.grid(row=15, column=1, columnspan=2, pady=5)
+    excel_entry_k42 = tk.Text(tab2, width=40, height=3, font=entry_font)
+    excel_entry_k42.grid(row=16, column=0, columnspan=2, padx=10, pady=5)
+    btn_k42 = tk.Button(tab2, text="✅ In K42 einfügen", command=fahrzeug_daten_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
+    btn_k42.grid(row=16, column=2, padx=5)
+
+    # IDs K51
+    tk.Label(tab2, text="IDs/Partner Dispo (K51):", font=label_font).grid(row=17, column=0, sticky="w", padx=10, pady=5)
+    excel_entry_k51 = tk.Text(tab2, width=40, height=3, font=entry_font)
+    excel_entry_k51.grid(row=18, column=0, columnspan=2, padx=10, pady=5)
+    btn_k51 = tk.Button(tab2, text="✅ In K51 einfügen", command=ids_daten_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
+    btn_k51.grid(row=18, column=2, padx=5)
+
+    # Kennzeichen D22
+    tk.Label(tab2, text="━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", font=("Arial", 10)).grid(row=19, column=0, columnspan=3, pady=10)
+    tk.Label(tab2, text="Kennzeichen (D22):", font=label_font).grid(row=20, column=0, sticky="e", padx=10, pady=5)
+    excel_entry_d22 = tk.Entry(tab2, width=30, font=entry_font)
+    excel_entry_d22.grid(row=20, column=1, padx=5)
+    btn_d22 = tk.Button(tab2, text="✅", command=kennzeichen_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
+    btn_d22.grid(row=20, column=2, padx=5)
+
+    # Fahrername J22
+    tk.Label(tab2, text="Fahrername (J22):", font=label_font).grid(row=21, column=0, sticky="e", padx=10, pady=5)
+    excel_entry_j22 = tk.Entry(tab2, width=30, font=entry_font)
+    excel_entry_j22.grid(row=21, column=1, padx=5)
+    btn_j22 = tk.Button(tab2, text="✅", command=fahrername_einfuegen, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
+    btn_j22.grid(row=21, column=2, padx=5)
+
+    # Sammelmodus: alle Felder vormerken und mit einem Speichervorgang schreiben
+    tk.Label(tab2, text="━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━", font=("Arial", 10)).grid(row=22, column=0, columnspan=3, pady=10)
+    var_sammelmodus = tk.BooleanVar(value=False)
+    tk.Checkbutton(tab2, text="Sammelmodus (✅-Buttons nur vormerken)", variable=var_sammelmodus, font=("Arial", 10)).grid(row=23, column=0, sticky="w", padx=10)
+    excel_label_sitzung = tk.Label(tab2, text="Keine Änderungen vorgemerkt", font=("Arial", 10), fg="gray")
+    excel_label_sitzung.grid(row=23, column=1, columnspan=2, sticky="w", padx=5)
+    frame_sitzung = tk.Frame(tab2)
+    frame_sitzung.grid(row=24, column=0, columnspan=3, pady=10)
+    tk.Button(frame_sitzung, text="👁 Vorschau", command=sitzung_vorschau, font=("Arial", 11)).pack(side="left", padx=5)
+    tk.Button(frame_sitzung, text="💾 Alle Felder speichern", command=alle_speichern, bg="#4CAF50", fg="white", font=("Arial", 12, "bold"), padx=20, pady=5).pack(side="left", padx=5)
+    tk.Button(frame_sitzung, text="🗑 Verwerfen", command=sitzung_verwerfen, font=("Arial", 11)).pack(side="left", padx=5)
+
+    # Auftragsarchiv: frühere Aufträge durchsuchen (rechts neben den Feldern)
+    frame_archiv = tk.Frame(tab2)
+    frame_archiv.grid(row=0, column=3, rowspan=25, sticky="n", padx=10)
+    tk.Label(frame_archiv, text="📚 Auftragsarchiv", font=("Arial", 14, "bold")).pack(pady=10)
+    var_archiv_suche = tk.StringVar()
+    tk.Entry(frame_archiv, textvariable=var_archiv_suche, width=40, font=entry_font).pack(fill="x")
+    liste_archiv = tk.Listbox(frame_archiv, width=60, height=25, font=("Arial", 10), activestyle="dotbox")
+    liste_archiv.pack(fill="both", pady=5)
+    excel_label_archiv = tk.Label(frame_archiv, text="", font=("Arial", 10), fg="gray")
+    excel_label_archiv.pack()
+    frame_archiv_knoepfe = tk.Frame(frame_archiv)
+    frame_archiv_knoepfe.pack(pady=5)
+    tk.Button(frame_archiv_knoepfe, text="⬅ In Tab 2 übernehmen", command=archiv_in_tab2, bg="#2196F3", fg="white", font=("Arial", 11, "bold")).pack(side="left", padx=5)
+    tk.Button(frame_archiv_knoepfe, text="➡ Strecke in Tab 1", command=archiv_in_tab1, bg="#9C27B0", fg="white", font=("Arial", 11, "bold")).pack(side="left", padx=5)
+    tk.Button(frame_archiv, text="📂 Ordner importieren...", command=archiv_ordner_importieren, font=("Arial", 11)).pack(pady=5)
+    var_archiv_suche.trace_add("write", archiv_suche_planen)
+    liste_archiv.bind("<Double-Button-1>", archiv_in_tab2)
+    # Erst hier: das Archiv (sqlite3, Prozess-Pool) gehört nicht zum Programmstart
+    from auftragsarchiv import auftragsarchiv_vorladen
+    auftragsarchiv_vorladen()
+    archiv_suchen()
+
+def tab_gewechselt(event):
+    if tab_control.select() == str(tab2):
+        tab2_aufbauen()
+
+def main():
+    fenster_aufbauen()
+    tab_control.bind("<<NotebookTabChanged>>", tab_gewechselt)
+    startzeit.marke("Fenster und Tab 1")
+
+    # Orts-Cache und Gazetteer von der Platte laden, sobald das Fenster steht
+    root.after_idle(startzeit.fenster_sichtbar, root)
+    root.after_idle(cache_status_aktualisieren)
+    root.after_idle(gazetteer_vorladen)
+    root.after_idle(strassennetz_vorladen)
+
+    root.mainloop()
+
+if __name__ == "__main__":
+    # Der Archiv-Import startet Worker-Prozesse; in der gepackten .exe müssen diese
+    # hier aussteigen, statt ein weiteres Fenster zu öffnen
+    import multiprocessing
+    multiprocessing.freeze_support()
+    main()
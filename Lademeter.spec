@@ -10,7 +10,9 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # openpyxl nutzt numpy/pandas nur optional; die Oberfläche braucht sie nicht
+    # (kleinere Exe = schnelleres Entpacken beim Start)
+    excludes=['numpy', 'pandas'],
     noarchive=False,
     optimize=0,
 )
@@ -26,7 +28,8 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # Ohne UPX: das Entpacken bei jedem Start ist schneller als der Platzgewinn
+    upx=False,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,
@@ -0,0 +1,91 @@
+"""Angebot für eine Sendung: Lademeter, Entfernung und Preis in einem Aufruf.
+
+Der gemeinsame Rechenkern für alles, was ohne Oberfläche rechnet (Angebotsdienst,
+Skripte, Anbindung an das TMS). Die Entfernung wird entweder direkt als
+`kilometer` übergeben oder aus Start- und Zielort ermittelt (lokaler
+Gazetteer, Orts-Cache, Nominatim - siehe geocoding.get_coords).
+"""
+import math
+from typing import NamedTuple
+
+from beladung import MAX_MENGE, beladung_beschreiben
+from berechnung import berechne_beladung, berechne_preis, verfuegbare_fahrzeuge
+from tarif import get_tarif
+
+
+class Angebot(NamedTuple):
+    lademeter: float
+    kilometer: float
+    preis: float
+    fahrzeug: str
+    beladung: str      # Anordnung als Text (siehe beladung_beschreiben)
+    passt: bool        # False, wenn die Sendung nicht auf ein Fahrzeug passt
+
+
+def entfernung_km(startort, zielort):
+    """Straßen-km zwischen zwei Orten (Standard für angebot_berechnen)"""
+    from geocoding import get_coords, strassen_km
+    return strassen_km(get_coords(startort), get_coords(zielort))
+
+
+def angebot_berechnen(palettengroesse: str, menge: int, stapelbarkeit: int, fahrzeug: str = None,
+                      kilometer: float = None, startort: str = None, zielort: str = None,
+                      entfernung=entfernung_km, kunde: str = None) -> Angebot:
+    """Berechnet ein Angebot; wirft ValueError bei ungültigen Angaben.
+
+    Ohne `kilometer` werden Start- und Zielort benötigt; die Entfernung liefert
+    dann `entfernung(startort, zielort)`. Der Preis folgt dem geltenden Tarif
+    (Lademeter-Staffel, Kundenkondition für `kunde`).
+    """
+    fahrzeug = fahrzeug or verfuegbare_fahrzeuge()[0]
+    if kilometer is None:
+        if not startort or not zielort:
+            raise ValueError("Bitte entweder Start- und Zielort oder die Kilometer angeben.")
+        kilometer = entfernung(startort, zielort)
+    if kilometer < 0:
+        raise ValueError("Die Kilometer dürfen nicht negativ sein.")
+    beladung = berechne_beladung(palettengroesse, menge, stapelbarkeit, fahrzeug)
+    preis = berechne_preis(kilometer, fahrzeug, beladung.lademeter, kunde)
+    return Angebot(beladung.lademeter, kilometer, preis, fahrzeug,
+                   beladung_beschreiben(beladung, fahrzeug), beladung.passt)
+
+
+def anfrage_lesen(daten):
+    """Prüft eine Anfrage (z.B. aus JSON) und liefert die Argumente für angebot_berechnen.
+
+    Erwartet palettengroesse, menge, stapelbarkeit und entweder kilometer oder
+    startort/zielort; fahrzeug und kunde sind optional.
+    """
+    if not isinstance(daten, dict):
+        raise ValueError("Eine Anfrage muss ein Objekt sein.")
+    try:
+        argumente = {
+            "palettengroesse": str(daten["palettengroesse"]),
+            "menge": int(daten["menge"]),
+            "stapelbarkeit": int(daten.get("stapelbarkeit", 0)),
+        }
+    except KeyError as e:
+        raise ValueError(f"Angabe fehlt: {e.args[0]}")
+    except (TypeError, ValueError, OverflowError):   # OverflowError: int(Infinity)
+        raise ValueError("menge und stapelbarkeit müssen ganze Zahlen sein.")
+    if not 0 <= argumente["menge"] <= MAX_MENGE:
+        raise ValueError(f"menge muss zwischen 0 und {MAX_MENGE} liegen.")
+    fahrzeug = daten.get("fahrzeug")
+    if fahrzeug is not None and (not isinstance(fahrzeug, str) or not get_tarif().kennt(fahrzeug)):
+        raise ValueError(f"Unbekannter Fahrzeugtyp: {fahrzeug}")
+    argumente["fahrzeug"] = fahrzeug
+    if daten.get("kunde") not in (None, ""):
+        argumente["kunde"] = str(daten["kunde"])
+    if daten.get("kilometer") not in (None, ""):
+        try:
+            argumente["kilometer"] = float(daten["kilometer"])
+        except (TypeError, ValueError):
+            raise ValueError("kilometer muss eine Zahl sein.")
+        if not math.isfinite(argumente["kilometer"]):
+            raise ValueError("kilometer muss eine endliche Zahl sein.")
+    else:
+        argumente["startort"] = str(daten.get("startort") or "").strip()
+        argumente["zielort"] = str(daten.get("zielort") or "").strip()
+        if not argumente["startort"] or not argumente["zielort"]:
+            raise ValueError("Bitte entweder Start- und Zielort oder die Kilometer angeben.")
+    return argumente
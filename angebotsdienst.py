@@ -0,0 +1,286 @@
+"""Lokaler Angebotsdienst: HTTP/JSON-Schnittstelle auf asyncio-Basis.
+
+    python cli.py dienst [--host 127.0.0.1] [--port 8765]
+
+    POST /angebot    {"palettengroesse": "120x80x100", "menge": 10, "stapelbarkeit": 1,
+                      "fahrzeug": "Tautliner", "kilometer": 420}
+                     (statt "kilometer" auch "startort" und "zielort")
+    POST /angebote   [Anfrage, Anfrage, ...] -> {"angebote": [Angebot oder {"fehler": ...}, ...]}
+    GET  /status     Anfragen, Auslastung, Orts-Cache
+
+Anfragen mit bekannter Entfernung werden direkt in der Ereignisschleife
+berechnet (einige tausend je Sekunde). Geokodiert wird in einem Thread-Pool;
+alle Anfragen teilen sich Gazetteer und Orts-Cache, und gleichzeitige
+Anfragen nach demselben Ort lösen nur eine Abfrage aus. Jede Anfrage hat ein
+Zeitlimit (504). Sind bereits MAX_PARALLEL Anfragen in Arbeit und
+MAX_WARTEND weitere in der Warteschlange, wird sofort mit 503 abgelehnt.
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from angebot import anfrage_lesen, angebot_berechnen
+from geocoding import get_cache, get_coords_lokal, get_coords_online, normalisiere_ort, strassen_km
+from instrumentierung import messen, zaehlen
+from tarif import tarif_status
+
+MAX_PARALLEL = 256          # gleichzeitig bearbeitete Anfragen
+MAX_WARTEND = 1024          # darüber hinaus: 503
+ANFRAGE_TIMEOUT = 15.0      # Sekunden je Anfrage (inkl. Geokodierung)
+LESE_TIMEOUT = 30.0         # Sekunden für Kopf und Körper einer Anfrage (Keep-Alive)
+MAX_KOERPER = 4 * 1024 * 1024
+MAX_STAPEL = 10_000         # Anfragen je POST /angebote
+GEOCODING_THREADS = 8
+
+
+def _keine_konstante(name):
+    # json lässt sonst NaN/Infinity durch; die Antwort wäre dann kein gültiges JSON mehr
+    raise ValueError(f"Nicht erlaubt: {name}")
+
+
+def _interner_fehler(e):
+    zaehlen("dienst.interner_fehler")
+    return {"fehler": f"Interner Fehler: {type(e).__name__}: {e}"}
+
+
+class Angebotsdienst:
+    def __init__(self, max_parallel=MAX_PARALLEL, max_wartend=MAX_WARTEND, timeout=ANFRAGE_TIMEOUT,
+                 geocoding_threads=GEOCODING_THREADS):
+        self.max_wartend = max_wartend
+        self.timeout = timeout
+        self.anfragen = 0
+        self.abgelehnt = 0
+        self._max_parallel = max_parallel
+        self._plaetze = None         # asyncio.Semaphore, wird in der Ereignisschleife angelegt
+        self._wartend = 0
+        self._laufend = 0
+        self._geokodierung = {}      # normalisierter Ort -> laufende Abfrage (Future)
+        self._executor = ThreadPoolExecutor(max_workers=geocoding_threads, thread_name_prefix="Angebotsdienst")
+
+    # ---------- Berechnung ----------
+
+    async def _koordinaten(self, ort):
+        # Gazetteer und Cache liegen im Speicher (der Cache schreibt seine Datei außerhalb der
+        # Sperre, die get() nimmt); nur Nominatim muss in einen Thread
+        coords = get_coords_lokal(ort)
+        if coords is not None:
+            return coords
+        schluessel = normalisiere_ort(ort)
+        laufend = self._geokodierung.get(schluessel)
+        if laufend is None:
+            laufend = asyncio.get_running_loop().run_in_executor(self._executor, get_coords_online, ort)
+            self._geokodierung[schluessel] = laufend
+            laufend.add_done_callback(lambda _: self._geokodierung.pop(schluessel, None))
+        else:
+            zaehlen("dienst.geocoding_zusammengelegt")
+        return await asyncio.shield(laufend)
+
+    async def _entfernung(self, startort, zielort):
+        start, ziel = await asyncio.gather(self._koordinaten(startort), self._koordinaten(zielort))
+        return strassen_km(start, ziel)
+
+    async def angebot(self, daten):
+        """Ein Angebot als Dict; ValueError bei ungültigen Angaben"""
+        argumente = anfrage_lesen(daten)
+        if "kilometer" not in argumente:
+            argumente["kilometer"] = await self._entfernung(argumente.pop("startort"), argumente.pop("zielort"))
+        return angebot_berechnen(**argumente)._asdict()
+
+    async def _ein_angebot(self, daten):
+        try:
+            return await self.angebot(daten)
+        except ValueError as e:
+            return {"fehler": str(e)}
+        except OSError as e:
+            return {"fehler": f"Entfernung nicht ermittelbar: {e}"}
+        except Exception as e:
+            return _interner_fehler(e)
+
+    async def angebote(self, liste):
+        """Mehrere Angebote; Fehler einzelner Anfragen stehen als {"fehler": ...} in der Liste"""
+        ergebnisse = [None] * len(liste)
+        offen = []
+        for nummer, daten in enumerate(liste):
+            if isinstance(daten, dict) and daten.get("kilometer") not in (None, ""):
+                # Bekannte Entfernung: sofort rechnen, ohne Task
+                try:
+                    ergebnisse[nummer] = angebot_berechnen(**anfrage_lesen(daten))._asdict()
+                except ValueError as e:
+                    ergebnisse[nummer] = {"fehler": str(e)}
+                except Exception as e:
+                    ergebnisse[nummer] = _interner_fehler(e)
+                if nummer % 500 == 499:
+                    await asyncio.sleep(0)   # andere Verbindungen nicht aushungern
+            else:
+                offen.append(nummer)
+        if offen:
+            for nummer, ergebnis in zip(offen, await asyncio.gather(*(self._ein_angebot(liste[n]) for n in offen))):
+                ergebnisse[nummer] = ergebnis
+        return ergebnisse
+
+    def status(self):
+        return {
+            "anfragen": self.anfragen,
+            "abgelehnt": self.abgelehnt,
+            "laufend": self._laufend,
+            "wartend": self._wartend,
+            "max_parallel": self._max_parallel,
+            "orts_cache": get_cache().statistik(),
+            "tarif": tarif_status(),
+        }
+
+    # ---------- HTTP ----------
+
+    async def bearbeiten(self, methode, pfad, koerper):
+        """Liefert (HTTPStatus, Antwort-Objekt) für eine Anfrage"""
+        pfad = pfad.split("?", 1)[0].rstrip("/") or "/"
+        if pfad == "/status":
+            if methode != "GET":
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"fehler": "Nur GET"}
+            return HTTPStatus.OK, self.status()
+        if pfad not in ("/angebot", "/angebote"):
+            return HTTPStatus.NOT_FOUND, {"fehler": f"Unbekannter Pfad: {pfad}"}
+        if methode != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"fehler": "Nur POST"}
+        try:
+            daten = json.loads(koerper or b"null", parse_constant=_keine_konstante)
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {"fehler": f"Ungültiges JSON: {e}"}
+
+        # Gegendruck: volle Warteschlange sofort ablehnen statt Speicher und Zeit zu binden
+        if self._wartend >= self.max_wartend:
+            self.abgelehnt += 1
+            zaehlen("dienst.abgelehnt")
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"fehler": "Dienst ausgelastet, bitte später erneut versuchen"}
+        self._wartend += 1
+        try:
+            await self._plaetze.acquire()
+        finally:
+            self._wartend -= 1
+        self._laufend += 1
+        self.anfragen += 1
+        try:
+            with messen("dienst" + pfad):
+                if pfad == "/angebot":
+                    arbeit = self.angebot(daten)
+                else:
+                    if isinstance(daten, dict):
+                        daten = daten.get("anfragen")
+                    if not isinstance(daten, list):
+                        return HTTPStatus.BAD_REQUEST, {"fehler": "Erwartet wird eine Liste von Anfragen"}
+                    if len(daten) > MAX_STAPEL:
+                        return HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"fehler": f"Höchstens {MAX_STAPEL} Anfragen je Aufruf"}
+                    arbeit = self._stapel(daten)
+                return HTTPStatus.OK, await asyncio.wait_for(arbeit, self.timeout)
+        except asyncio.TimeoutError:
+            zaehlen("dienst.zeitueberschreitung")
+            return HTTPStatus.GATEWAY_TIMEOUT, {"fehler": f"Keine Antwort innerhalb von {self.timeout:g} s"}
+        except ValueError as e:
+            return HTTPStatus.UNPROCESSABLE_ENTITY, {"fehler": str(e)}
+        except OSError as e:
+            return HTTPStatus.BAD_GATEWAY, {"fehler": f"Entfernung nicht ermittelbar: {e}"}
+        finally:
+            self._laufend -= 1
+            self._plaetze.release()
+
+    async def _stapel(self, liste):
+        return {"angebote": await self.angebote(liste)}
+
+    async def _verbindung(self, reader, writer):
+        """Eine TCP-Verbindung; mehrere Anfragen nacheinander (HTTP/1.1 Keep-Alive)"""
+        try:
+            while True:
+                try:
+                    kopf = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), LESE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._antworten(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, {"fehler": "Kopf zu groß"}, False)
+                    return
+                zeilen = kopf.decode("latin-1").split("\r\n")
+                try:
+                    methode, pfad, version = zeilen[0].split(" ", 2)
+                except ValueError:
+                    await self._antworten(writer, HTTPStatus.BAD_REQUEST, {"fehler": "Ungültige Anfragezeile"}, False)
+                    return
+                felder = {}
+                for zeile in zeilen[1:]:
+                    name, _, wert = zeile.partition(":")
+                    if name:
+                        felder[name.strip().lower()] = wert.strip()
+                try:
+                    laenge = int(felder.get("content-length", 0))
+                except ValueError:
+                    laenge = -1
+                if laenge < 0 or laenge > MAX_KOERPER:
+                    await self._antworten(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"fehler": "Anfrage zu groß"}, False)
+                    return
+                try:
+                    koerper = await asyncio.wait_for(reader.readexactly(laenge), LESE_TIMEOUT) if laenge else b""
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                offen_halten = (felder.get("connection", "").lower() != "close"
+                                and (version.upper() != "HTTP/1.0" or felder.get("connection", "").lower() == "keep-alive"))
+                try:
+                    status, antwort = await self.bearbeiten(methode.upper(), pfad, koerper)
+                except Exception as e:
+                    # Unerwartet (z.B. eine unvollständige Geocoder-Antwort): 500 statt Verbindungsabbruch
+                    status, antwort = HTTPStatus.INTERNAL_SERVER_ERROR, _interner_fehler(e)
+                await self._antworten(writer, status, antwort, offen_halten)
+                if not offen_halten:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _antworten(self, writer, status, antwort, offen_halten):
+        try:
+            # NaN/Infinity sind kein JSON: lieber ein 500 als eine Antwort, die der Client nicht lesen kann
+            inhalt = json.dumps(antwort, ensure_ascii=False, allow_nan=False).encode("utf-8")
+        except ValueError as e:
+            status = HTTPStatus.INTERNAL_SERVER_ERROR
+            inhalt = json.dumps(_interner_fehler(e), ensure_ascii=False).encode("utf-8")
+        kopf = [f"HTTP/1.1 {status.value} {status.phrase}",
+                "Content-Type: application/json; charset=utf-8",
+                f"Content-Length: {len(inhalt)}",
+                f"Connection: {'keep-alive' if offen_halten else 'close'}"]
+        if status == HTTPStatus.SERVICE_UNAVAILABLE:
+            kopf.append("Retry-After: 1")
+        writer.write(("\r\n".join(kopf) + "\r\n\r\n").encode("latin-1") + inhalt)
+        # Gegendruck zum Client: nicht weiterlesen, solange er seine Antworten nicht abholt
+        await writer.drain()
+
+    async def starten(self, host="127.0.0.1", port=8765):
+        """Startet den Server (asyncio.Server); Gazetteer und Orts-Cache werden vorab geladen"""
+        self._plaetze = asyncio.Semaphore(self._max_parallel)
+        from gazetteer import get_gazetteer
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(loop.run_in_executor(self._executor, get_gazetteer),
+                             loop.run_in_executor(self._executor, get_cache))
+        return await asyncio.start_server(self._verbindung, host, port, limit=64 * 1024)
+
+    def beenden(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def dienst_starten(host="127.0.0.1", port=8765, **optionen):
+    """Startet den Dienst und läuft bis Strg+C"""
+    dienst = Angebotsdienst(**optionen)
+
+    async def laufen():
+        server = await dienst.starten(host, port)
+        adressen = ", ".join(f"http://{adresse[0]}:{adresse[1]}" for adresse in
+                             (sock.getsockname() for sock in server.sockets))
+        print(f"Angebotsdienst läuft auf {adressen} (Strg+C beendet)", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(laufen())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dienst.beenden()
+    return 0
@@ -0,0 +1,172 @@
+"""Massenerzeugung von AU-Transportaufträgen aus einer Vorlage und einer Auftragsliste.
+
+Jeder Auftrag der Liste (CSV oder JSON) wird in eine eigene Kopie der
+Vorlage geschrieben - in dieselben Zellen des Sheets "Rechnung", die auch
+Tab 2 der Oberfläche befüllt. Die Arbeit wird auf einen Prozess-Pool
+verteilt; jeder Worker liest die Vorlage nur einmal ein.
+"""
+import csv
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from excel_bearbeitung import AU_FELDER, SHEET_NAME, ExcelSitzung
+
+
+def manifest_lesen(pfad):
+    """Liest die Auftragsliste als Liste von Dicts (CSV mit Kopfzeile oder JSON-Liste)"""
+    if pfad.lower().endswith(".json"):
+        with open(pfad, encoding="utf-8") as datei:
+            auftraege = json.load(datei)
+        if not isinstance(auftraege, list):
+            raise ValueError("Die JSON-Auftragsliste muss eine Liste von Objekten sein")
+        return auftraege
+    with open(pfad, newline="", encoding="utf-8-sig") as datei:
+        erste_zeile = datei.readline()
+        datei.seek(0)
+        trennzeichen = max(";,\t", key=erste_zeile.count)
+        return list(csv.DictReader(datei, delimiter=trennzeichen))
+
+
+def auftrag_zellen(auftrag):
+    """Übersetzt einen Auftrag (Feldnamen oder Zellbezüge als Schlüssel) in {(Zeile, Spalte): Text}"""
+    sitzung = ExcelSitzung(None)
+    for schluessel, wert in auftrag.items():
+        if schluessel is None or wert is None or str(wert).strip() == "":
+            continue
+        schluessel = str(schluessel).strip()
+        if schluessel.lower() in AU_FELDER:
+            zelle, max_zeilen = AU_FELDER[schluessel.lower()]
+        elif re.fullmatch(r"[A-Z]+\d+", schluessel.upper()):
+            zelle, max_zeilen = schluessel.upper(), None
+        else:
+            continue  # z.B. die Spalte "datei"
+        # Zeilenumbrüche dürfen in CSV-Dateien auch als "\n" geschrieben werden
+        sitzung.vormerken(zelle, str(wert).replace("\\n", "\n"), max_zeilen)
+    return sitzung.zellen()
+
+
+def _dateiname(auftrag, nummer, endung):
+    name = str(auftrag.get("datei") or "").strip() or f"AU_{nummer:04d}"
+    name = re.sub(r'[<>:"/\\|?*]', "_", name)
+    if not name.lower().endswith(endung):
+        name += endung
+    return name
+
+
+# Zustand je Worker-Prozess: die einmal eingelesene Vorlage
+_vorlage = None
+_vorlage_xlrd = None   # nur bei Bedarf: (xlrd-Buch, Sheet-Index) für den xlutils-Weg
+
+
+def _worker_starten(vorlage_pfad):
+    global _vorlage, _vorlage_xlrd
+    _vorlage_xlrd = None   # gehört zur vorigen Vorlage (Aufruf ohne Worker-Prozesse)
+    if vorlage_pfad.lower().endswith(".xls"):
+        from xls_zellen import NichtPatchbar, XlsDatei
+        try:
+            buch = XlsDatei.lesen(vorlage_pfad)
+        except NichtPatchbar:
+            buch = None
+        if buch is not None:
+            if SHEET_NAME not in buch.blattnamen():
+                raise ValueError(f"Sheet '{SHEET_NAME}' nicht gefunden!")
+            _vorlage = ("biff", buch, vorlage_pfad)
+        else:
+            _vorlage = ("xls",) + _xlrd_vorlage(vorlage_pfad)
+    else:
+        import openpyxl
+        wb = openpyxl.load_workbook(vorlage_pfad)
+        if SHEET_NAME not in wb.sheetnames:
+            raise ValueError(f"Sheet '{SHEET_NAME}' nicht gefunden!")
+        _vorlage = ("xlsx", wb, SHEET_NAME)
+
+
+def _xlrd_vorlage(vorlage_pfad):
+    """(xlrd-Buch, Sheet-Index) der Vorlage für das Neuschreiben über xlutils"""
+    import xlrd
+    rb = xlrd.open_workbook(vorlage_pfad, formatting_info=True)
+    namen = [rb.sheet_by_index(i).name for i in range(rb.nsheets)]
+    if SHEET_NAME not in namen:
+        raise ValueError(f"Sheet '{SHEET_NAME}' nicht gefunden!")
+    return rb, namen.index(SHEET_NAME)
+
+
+def _auftrag_schreiben(aufgabe):
+    """Schreibt einen Auftrag in eine Kopie der Vorlage; liefert (Zielpfad, Fehlertext oder None)"""
+    global _vorlage_xlrd
+    zielpfad, zellen = aufgabe
+    art, buch, sheet = _vorlage
+    try:
+        if art == "biff":
+            from xls_zellen import NichtPatchbar
+            # Kopie der Vorlagen-Bytes, nur die Zell-Records werden ersetzt
+            kopie = buch.kopie()
+            try:
+                kopie.zellen_setzen(SHEET_NAME, zellen)
+            except NichtPatchbar:
+                # z.B. Formelzellen oder lange Texte: wie früher über xlutils
+                if _vorlage_xlrd is None:
+                    _vorlage_xlrd = _xlrd_vorlage(_vorlage[2])   # bei "biff": Pfad der Vorlage
+                art, (buch, sheet) = "xls", _vorlage_xlrd
+            else:
+                kopie.speichern(zielpfad, nur_aenderungen=False)
+                return zielpfad, None
+        if art == "xls":
+            from xlutils.copy import copy as xl_copy
+            # Kopie aus dem bereits geparsten Buch - die Vorlage wird nicht erneut gelesen
+            wb = xl_copy(buch)
+            ws = wb.get_sheet(sheet)
+            for (row, col), text in zellen.items():
+                ws.write(row, col, text)
+            wb.save(zielpfad)
+        else:
+            ws = buch[sheet]
+            original = {}
+            try:
+                for (row, col), text in zellen.items():
+                    zelle = ws.cell(row=row + 1, column=col + 1)
+                    original[(row, col)] = zelle.value
+                    zelle.value = text
+                buch.save(zielpfad)
+            finally:
+                # Vorlage im Speicher für den nächsten Auftrag wiederherstellen
+                for (row, col), wert in original.items():
+                    ws.cell(row=row + 1, column=col + 1).value = wert
+        return zielpfad, None
+    except Exception as e:
+        return zielpfad, str(e)
+
+
+def au_auftraege_erzeugen(vorlage, auftraege, ausgabe_ordner, prozesse=None, ueberschreiben=False):
+    """Erzeugt eine ausgefüllte Kopie der Vorlage je Auftrag.
+
+    Liefert eine Liste von (Zielpfad, Fehlertext oder None) in der
+    Reihenfolge der Auftragsliste.
+    """
+    endung = os.path.splitext(vorlage)[1].lower() or ".xls"
+    os.makedirs(ausgabe_ordner, exist_ok=True)
+
+    aufgaben = []
+    vergeben = set()
+    for nummer, auftrag in enumerate(auftraege, start=1):
+        name = _dateiname(auftrag, nummer, endung)
+        if name.lower() in vergeben:
+            raise ValueError(f"Dateiname '{name}' kommt in der Auftragsliste mehrfach vor")
+        vergeben.add(name.lower())
+        zielpfad = os.path.join(ausgabe_ordner, name)
+        if not ueberschreiben and os.path.exists(zielpfad):
+            raise ValueError(f"Datei existiert bereits: {zielpfad}")
+        aufgaben.append((zielpfad, auftrag_zellen(auftrag)))
+
+    if not aufgaben:
+        return []
+    prozesse = min(prozesse or os.cpu_count() or 1, len(aufgaben))
+    if prozesse == 1:
+        # Ein einzelner Worker lohnt keinen eigenen Prozess
+        _worker_starten(vorlage)
+        return [_auftrag_schreiben(aufgabe) for aufgabe in aufgaben]
+    with ProcessPoolExecutor(max_workers=prozesse, initializer=_worker_starten, initargs=(vorlage,)) as pool:
+        chunks = max(1, len(aufgaben) // (prozesse * 4))
+        return list(pool.map(_auftrag_schreiben, aufgaben, chunksize=chunks))
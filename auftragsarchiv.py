@@ -0,0 +1,463 @@
+"""Auftragsarchiv: frühere AU-Aufträge (.xls/.xlsx) durchsuchen und wiederverwenden.
+
+archiv_importieren liest aus jeder Arbeitsmappe eines Ordners das Sheet
+"Rechnung" - die Felder, die Tab 2 schreibt (Partner, Kennzeichen, Fahrer,
+Lade- und Entladestelle, Fahrzeug K42, IDs K51) sowie Auftragsnummer und
+Datum - und legt sie in einer SQLite-Datei ab. Gelesen wird nur dieses eine
+Sheet - bei .xls direkt aus dem BIFF-Stream (xls_zellen, sonst xlrd), bei
+.xlsx mit openpyxl im read_only-Modus -, verteilt auf einen Prozess-Pool.
+Ein erneuter Import liest nur neue und geänderte Dateien (Änderungszeit und
+Größe); gelöschte Dateien verschwinden aus dem Archiv.
+
+Für die Suche baut Auftragsarchiv beim Laden einen sortierten Wort-Index im
+Speicher auf (wie der Gazetteer): jedes Suchwort ist eine binäre Suche nach
+Präfixen, mehrere Wörter müssen alle passen.
+"""
+import os
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+import xls_zellen
+from excel_bearbeitung import SHEET_NAME, cell_to_index
+from gazetteer import falten
+from geocoding import standard_cache_pfad
+
+# Gelesene Felder: Name -> (Startzelle, Anzahl Zeilen). Die Namen entsprechen AU_FELDER
+# (Tab 2, au_auftraege); mehrzeilige Felder reichen bis vor das nächste Feld.
+LESEBEREICHE = {
+    "auftragsnr": ("M15", 1),
+    "datum": ("M14", 1),
+    "partner": ("E14", 7),        # Firma, Name, Adresse, PLZ, Ust-IdNr (E14 bis E20)
+    "kennzeichen": ("D22", 1),
+    "fahrer": ("J22", 1),
+    "ladestelle": ("E31", 4),
+    "e35": ("E35", 1),
+    "e36": ("E36", 1),
+    "entladestelle": ("E37", 3),
+    "e40": ("E40", 1),
+    "fahrzeug": ("K42", 8),
+    "ids": ("K51", 5),
+}
+FELDER = list(LESEBEREICHE)
+ENDUNGEN = (".xls", ".xlsx")
+
+_BEREICHE = {name: (cell_to_index(zelle), zeilen) for name, (zelle, zeilen) in LESEBEREICHE.items()}
+_ERSTE_ZEILE = min(row for (row, _), _ in _BEREICHE.values())
+_LETZTE_ZEILE = max(row + zeilen - 1 for (row, _), zeilen in _BEREICHE.values())
+_ERSTE_SPALTE = min(col for (_, col), _ in _BEREICHE.values())
+_LETZTE_SPALTE = max(col for (_, col), _ in _BEREICHE.values())
+_ZELLEN = {(row + i, col) for (row, col), zeilen in _BEREICHE.values() for i in range(zeilen)}
+
+# BIFF8-Records, die xls_zellen nicht braucht
+DATEMODE = 0x0022
+CONTINUE = 0x003C
+
+_PLZ_ZEILE = re.compile(r"(?:^|\s)(?:[A-Z]{1,2}[ -]+)?\d{2}-?\d{3}\s+\S|(?:^|\s)\d{4,5}\s+\S")
+
+
+def standard_archiv_pfad():
+    """Pfad der Archiv-Datei (überschreibbar über LADEMETER_ARCHIV)"""
+    return os.environ.get("LADEMETER_ARCHIV") or os.path.join(
+        os.path.dirname(standard_cache_pfad()), "auftragsarchiv.sqlite")
+
+
+def _text(wert):
+    if wert is None:
+        return ""
+    if isinstance(wert, float) and wert.is_integer():
+        return str(int(wert))
+    return str(wert).strip()
+
+
+def _datum(wert, datemode=0):
+    """Zellwert des Auftragsdatums -> 'JJJJ-MM-TT' (Excel speichert Tage seit 1900 bzw. 1904)"""
+    if isinstance(wert, datetime):
+        return wert.date().isoformat()
+    if isinstance(wert, date):
+        return wert.isoformat()
+    if isinstance(wert, (int, float)) and 0 < wert < 200000:
+        beginn = datetime(1904, 1, 1) if datemode else datetime(1899, 12, 30)
+        return (beginn + timedelta(days=int(wert))).date().isoformat()
+    return _text(wert)
+
+
+def _felder(zelle, datemode=0):
+    """Felder aus einer Zugriffsfunktion zelle(Zeile, Spalte) -> Rohwert"""
+    felder = {}
+    for name, ((row, col), zeilen) in _BEREICHE.items():
+        if name == "datum":
+            felder[name] = _datum(zelle(row, col), datemode)
+            continue
+        texte = [_text(zelle(row + i, col)) for i in range(zeilen)]
+        while texte and not texte[-1]:
+            texte.pop()
+        felder[name] = "\n".join(texte)
+    return felder
+
+
+def _rk_wert(rk):
+    """RK-Zahl (BIFF8): 30 Bit Ganzzahl oder die oberen 30 Bit eines Doubles, ggf. durch 100"""
+    if rk & 2:
+        wert = float(rk >> 2 if rk < 0x80000000 else (rk >> 2) - (1 << 30))
+    else:
+        wert = struct.unpack("<d", struct.pack("<Q", (rk & 0xFFFFFFFC) << 32))[0]
+    return wert / 100 if rk & 1 else wert
+
+
+def _sst_texte(stream, start, bis_index):
+    """Texte 0..bis_index der gemeinsamen String-Tabelle. Das SST ist auf CONTINUE-Records
+    verteilt; ein dort fortgesetzter Text beginnt mit einem neuen Optionsbyte."""
+    daten, grenzen = [], []
+    laenge = 0
+    for pos, typ, groesse in xls_zellen._records(stream, start):
+        if daten and typ != CONTINUE:
+            break
+        daten.append(stream[pos + 4:pos + 4 + groesse])
+        laenge += groesse
+        grenzen.append(laenge)
+    daten = b"".join(daten)
+    texte = []
+    pos = 8
+    while len(texte) <= bis_index:
+        if pos + 3 > len(daten):
+            raise xls_zellen.NichtPatchbar("SST ist kürzer als angegeben")
+        zeichen, optionen = struct.unpack_from("<HB", daten, pos)
+        pos += 3
+        laufe = erweiterung = 0
+        if optionen & 0x08:
+            laufe, = struct.unpack_from("<H", daten, pos)
+            pos += 2
+        if optionen & 0x04:
+            erweiterung, = struct.unpack_from("<I", daten, pos)
+            pos += 4
+        teile = []
+        while zeichen:
+            grenze = grenzen[bisect_right(grenzen, pos)] if pos < grenzen[-1] else len(daten)
+            breite = 2 if optionen & 1 else 1
+            anzahl = min(zeichen, (grenze - pos) // breite)
+            teile.append(daten[pos:pos + anzahl * breite].decode("utf-16-le" if breite == 2 else "latin-1"))
+            pos += anzahl * breite
+            zeichen -= anzahl
+            if zeichen:
+                # Fortsetzung im nächsten CONTINUE-Record, mit eigenem Optionsbyte
+                optionen = daten[pos]
+                pos += 1
+        texte.append("".join(teile))
+        pos += 4 * laufe + erweiterung
+    return texte
+
+
+def _xls_direkt_lesen(pfad):
+    """Liest die Zellen direkt aus dem BIFF-Stream (xls_zellen): nur das Blatt und die
+    benötigten Texte des SST. xlrd dagegen wertet beim Öffnen alle Formate und Namen der
+    Mappe aus, was je Datei ein Vielfaches kostet. NichtPatchbar bei allem, was hier nicht
+    sicher gelesen wird (z.B. Formeln) - dann liest xlrd."""
+    datei = xls_zellen.XlsDatei.lesen(pfad)
+    stream = datei._stream
+    blaetter = {name: start for name, _, start in datei._blaetter()}
+    if SHEET_NAME not in blaetter:
+        raise ValueError(f"Sheet '{SHEET_NAME}' nicht gefunden!")
+    datemode, sst = 0, None
+    for pos, typ, _ in xls_zellen._records(stream, 0):   # Globals bis zum ersten EOF
+        if typ == DATEMODE:
+            datemode, = struct.unpack_from("<H", stream, pos + 4)
+        elif typ == xls_zellen.SST:
+            sst = pos
+
+    werte = {}
+    labelsst = {}
+    for pos, typ, laenge in xls_zellen._records(stream, blaetter[SHEET_NAME]):
+        if typ not in xls_zellen.ZELLEN:
+            continue
+        row, col = struct.unpack_from("<HH", stream, pos + 4)
+        if typ == xls_zellen.MULRK:
+            letzte, = struct.unpack_from("<H", stream, pos + 4 + laenge - 2)
+            for i in range(letzte - col + 1):
+                if (row, col + i) in _ZELLEN:
+                    werte[(row, col + i)] = _rk_wert(struct.unpack_from("<I", stream, pos + 10 + i * 6)[0])
+            continue
+        if (row, col) not in _ZELLEN:
+            continue
+        if typ == xls_zellen.LABELSST:
+            labelsst[(row, col)], = struct.unpack_from("<I", stream, pos + 10)
+        elif typ == xls_zellen.NUMBER:
+            werte[(row, col)], = struct.unpack_from("<d", stream, pos + 10)
+        elif typ == xls_zellen.RK:
+            werte[(row, col)] = _rk_wert(struct.unpack_from("<I", stream, pos + 10)[0])
+        elif typ in (xls_zellen.LABEL, xls_zellen.RSTRING):
+            zeichen, hoch = struct.unpack_from("<HB", stream, pos + 10)
+            roh = stream[pos + 13:pos + 13 + zeichen * (2 if hoch & 1 else 1)]
+            werte[(row, col)] = roh.decode("utf-16-le" if hoch & 1 else "latin-1")
+        elif typ not in (xls_zellen.BLANK, xls_zellen.MULBLANK):
+            raise xls_zellen.NichtPatchbar(f"Zelle {row + 1}/{col + 1}: Record {typ:#06x}")
+    if labelsst:
+        if sst is None:
+            raise xls_zellen.NichtPatchbar("SST fehlt")
+        texte = _sst_texte(stream, sst, max(labelsst.values()))
+        for zelle, index in labelsst.items():
+            werte[zelle] = texte[index]
+    return _felder(lambda row, col: werte.get((row, col)), datemode)
+
+
+def _xls_lesen(pfad):
+    try:
+        return _xls_direkt_lesen(pfad)
+    except xls_zellen.NichtPatchbar:
+        pass
+
+    import xlrd
+
+    # on_demand: nur das Sheet "Rechnung" wird geparst, nicht die ganze Mappe
+    buch = xlrd.open_workbook(pfad, on_demand=True)
+    try:
+        if SHEET_NAME not in buch.sheet_names():
+            raise ValueError(f"Sheet '{SHEET_NAME}' nicht gefunden!")
+        sheet = buch.sheet_by_name(SHEET_NAME)
+
+        def zelle(row, col):
+            if row >= sheet.nrows or col >= sheet.ncols:
+                return None
+            return sheet.cell_value(row, col)
+
+        return _felder(zelle, buch.datemode)
+    finally:
+        buch.release_resources()
+
+
+def _xlsx_lesen(pfad):
+    import openpyxl
+
+    # read_only: die Zeilen werden beim Lesen aus dem XML gestreamt
+    buch = openpyxl.load_workbook(pfad, read_only=True, data_only=True)
+    try:
+        if SHEET_NAME not in buch.sheetnames:
+            raise ValueError(f"Sheet '{SHEET_NAME}' nicht gefunden!")
+        werte = {}
+        zeilen = buch[SHEET_NAME].iter_rows(min_row=_ERSTE_ZEILE + 1, max_row=_LETZTE_ZEILE + 1,
+                                             min_col=_ERSTE_SPALTE + 1, max_col=_LETZTE_SPALTE + 1,
+                                             values_only=True)
+        for row, zeile in enumerate(zeilen, start=_ERSTE_ZEILE):
+            for col, wert in enumerate(zeile, start=_ERSTE_SPALTE):
+                if wert is not None:
+                    werte[(row, col)] = wert
+        return _felder(lambda row, col: werte.get((row, col)), 1 if buch.epoch.year == 1904 else 0)
+    finally:
+        buch.close()
+
+
+def auftrag_lesen(pfad):
+    """Felder eines AU-Auftrags als {Name: Text}; ValueError, wenn das Sheet fehlt"""
+    if pfad.lower().endswith(".xls"):
+        return _xls_lesen(pfad)
+    return _xlsx_lesen(pfad)
+
+
+def _datei_lesen(aufgabe):
+    """Worker: (Pfad, mtime_ns, Größe) -> Zeile für die Datenbank; Fehler landen in der Spalte fehler"""
+    pfad, mtime_ns, groesse = aufgabe
+    try:
+        felder = auftrag_lesen(pfad)
+        fehler = None
+    except Exception as e:
+        felder = dict.fromkeys(FELDER, "")
+        fehler = str(e) or type(e).__name__
+    return (pfad, mtime_ns, groesse, *(felder[name] for name in FELDER), fehler)
+
+
+def dateien_suchen(ordner):
+    """Alle Arbeitsmappen unter `ordner` (rekursiv): [(Pfad, mtime_ns, Größe)]"""
+    dateien = []
+    offen = [os.path.abspath(ordner)]
+    while offen:
+        with os.scandir(offen.pop()) as eintraege:
+            for eintrag in eintraege:
+                if eintrag.is_dir(follow_symlinks=False):
+                    offen.append(eintrag.path)
+                elif (eintrag.name.lower().endswith(ENDUNGEN) and not eintrag.name.startswith("~$")
+                      and eintrag.is_file()):
+                    stat = eintrag.stat()
+                    dateien.append((eintrag.path, stat.st_mtime_ns, stat.st_size))
+    return dateien
+
+
+def _verbinden(pfad):
+    os.makedirs(os.path.dirname(os.path.abspath(pfad)), exist_ok=True)
+    db = sqlite3.connect(pfad)
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS auftraege ("
+        "pfad TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, groesse INTEGER NOT NULL, "
+        + "".join(f"{name} TEXT NOT NULL, " for name in FELDER) + "fehler TEXT)"
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS auftraege_datum ON auftraege (datum)")
+    db.execute("CREATE INDEX IF NOT EXISTS auftraege_kennzeichen ON auftraege (kennzeichen)")
+    return db
+
+
+def archiv_importieren(ordner, pfad=None, prozesse=None, fortschritt=None):
+    """Importiert alle neuen und geänderten Arbeitsmappen unter `ordner`.
+
+    `fortschritt(gelesen, gesamt)` wird regelmäßig und zum Schluss noch einmal
+    mit gelesen == gesamt aufgerufen. Liefert eine Statistik (dateien, gelesen,
+    unveraendert, entfernt, fehler, sekunden).
+    """
+    beginn = time.perf_counter()
+    pfad = pfad or standard_archiv_pfad()
+    ordner = os.path.abspath(ordner)
+    dateien = dateien_suchen(ordner)
+    db = _verbinden(pfad)
+    try:
+        bekannt = {zeile[0]: (zeile[1], zeile[2]) for zeile in db.execute(
+            "SELECT pfad, mtime_ns, groesse FROM auftraege WHERE pfad >= ? AND pfad < ?",
+            (ordner + os.sep, ordner + chr(ord(os.sep) + 1)))}
+        vorhanden = {datei[0] for datei in dateien}
+        entfernt = [(p,) for p in bekannt if p not in vorhanden]
+        db.executemany("DELETE FROM auftraege WHERE pfad = ?", entfernt)
+        aufgaben = [datei for datei in dateien if bekannt.get(datei[0]) != datei[1:]]
+
+        einfuegen = f"INSERT OR REPLACE INTO auftraege VALUES ({', '.join('?' * (len(FELDER) + 4))})"
+        fehler = 0
+        for gelesen, zeile in enumerate(_lesen(aufgaben, prozesse), start=1):
+            db.execute(einfuegen, zeile)
+            fehler += zeile[-1] is not None
+            if gelesen % 500 == 0:
+                # Zwischenstand sichern: ein abgebrochener Import muss nicht von vorn beginnen
+                db.commit()
+                if fortschritt:
+                    fortschritt(gelesen, len(aufgaben))
+        db.commit()
+        if fortschritt:
+            fortschritt(len(aufgaben), len(aufgaben))
+    finally:
+        db.close()
+    _archiv_geaendert()
+    return {"dateien": len(dateien), "gelesen": len(aufgaben), "unveraendert": len(dateien) - len(aufgaben),
+            "entfernt": len(entfernt), "fehler": fehler, "sekunden": round(time.perf_counter() - beginn, 2)}
+
+
+def _lesen(aufgaben, prozesse=None):
+    """Liest die Dateien im Prozess-Pool; liefert die Zeilen in der Reihenfolge der Aufgaben"""
+    prozesse = min(prozesse or os.cpu_count() or 1, len(aufgaben))
+    if prozesse <= 1:
+        # Ein einzelner Worker lohnt keinen eigenen Prozess
+        yield from map(_datei_lesen, aufgaben)
+        return
+    with ProcessPoolExecutor(max_workers=prozesse) as pool:
+        yield from pool.map(_datei_lesen, aufgaben, chunksize=max(1, min(64, len(aufgaben) // (prozesse * 4))))
+
+
+def ort_aus_adresse(text):
+    """Ort einer Lade-/Entladestelle für die Routenberechnung: die Zeile mit PLZ und Ort
+    ('55-300 Środa Śląska'), sonst die erste Zeile ('VW Wolfsburg')"""
+    zeilen = [zeile.strip() for zeile in text.splitlines() if zeile.strip()]
+    return next((zeile for zeile in reversed(zeilen) if _PLZ_ZEILE.search(zeile)), zeilen[0] if zeilen else "")
+
+
+class Auftragsarchiv:
+    """Alle Aufträge der Archiv-Datei mit Wort-Index für die Suche (im Speicher)"""
+
+    def __init__(self, pfad=None):
+        self.pfad = pfad or standard_archiv_pfad()
+        self._auftraege = []   # Dicts mit pfad und allen FELDER, neueste zuerst
+        self._woerter_je_auftrag = []   # gefaltete Wörter je Auftrag
+        self._woerter = []     # sortierte Wörter (gefaltet, jedes einmal)
+        self._verweise = []    # je Wort die Indizes in _auftraege, aufsteigend
+        if os.path.exists(self.pfad):
+            self._laden()
+
+    def _laden(self):
+        db = sqlite3.connect(self.pfad)
+        try:
+            zeilen = db.execute(f"SELECT pfad, {', '.join(FELDER)} FROM auftraege WHERE fehler IS NULL "
+                                "ORDER BY datum DESC, pfad").fetchall()
+        except sqlite3.Error:
+            zeilen = []
+        finally:
+            db.close()
+        # Viele Aufträge teilen Partner, Orte und Fahrzeug: jeden Feldinhalt nur einmal falten
+        gefaltet = {}
+        index = {}
+        for i, zeile in enumerate(zeilen):
+            self._auftraege.append(dict(zip(["pfad"] + FELDER, zeile)))
+            woerter = set()
+            for text in (os.path.basename(zeile[0]), *zeile[1:]):
+                if text not in gefaltet:
+                    gefaltet[text] = [sys.intern(wort) for wort in re.findall(r"\w+", falten(text))]
+                woerter.update(gefaltet[text])
+            self._woerter_je_auftrag.append(tuple(woerter))
+            for wort in woerter:
+                index.setdefault(wort, []).append(i)
+        self._woerter = sorted(index)
+        self._verweise = [index[wort] for wort in self._woerter]
+
+    def __len__(self):
+        return len(self._auftraege)
+
+    def _bereich(self, praefix):
+        """Position der Wörter mit diesem Anfang in _woerter (von, bis)"""
+        return (bisect_left(self._woerter, praefix),
+                bisect_left(self._woerter, praefix + chr(0x10FFFF)))
+
+    def suchen(self, text, anzahl=50):
+        """Aufträge, in denen jedes Wort von `text` als Wortanfang vorkommt, neueste zuerst;
+        ohne Suchtext die neuesten"""
+        woerter = set(re.findall(r"\w+", falten(text)))
+        if not woerter:
+            return self._auftraege[:anzahl]
+        # Kandidaten aus dem seltensten Wort; die übrigen nur an diesen prüfen, bis `anzahl` erreicht ist
+        bereiche = {wort: self._bereich(wort) for wort in woerter}
+        seltenstes = min(woerter, key=lambda wort: sum(map(len, self._verweise[slice(*bereiche[wort])])))
+        kandidaten = set()
+        for verweise in self._verweise[slice(*bereiche[seltenstes])]:
+            kandidaten.update(verweise)
+        uebrige = [wort for wort in woerter if wort != seltenstes]
+        treffer = []
+        for i in sorted(kandidaten):
+            eigene = self._woerter_je_auftrag[i]
+            if all(any(wort.startswith(praefix) for wort in eigene) for praefix in uebrige):
+                treffer.append(self._auftraege[i])
+                if len(treffer) == anzahl:
+                    break
+        return treffer
+
+
+_archiv = None   # (Kennung der Datei, Auftragsarchiv)
+_archiv_lock = threading.Lock()
+
+
+def _archiv_geaendert():
+    global _archiv
+    with _archiv_lock:
+        _archiv = None
+
+
+def get_auftragsarchiv():
+    """Gemeinsames Archiv des Programms; nach einem Import oder wenn sich die Datei geändert hat,
+    wird es neu geladen"""
+    global _archiv
+    pfad = standard_archiv_pfad()
+    try:
+        stat = os.stat(pfad)
+        kennung = (pfad, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        kennung = (pfad, None, None)
+    with _archiv_lock:
+        if _archiv is None or _archiv[0] != kennung:
+            _archiv = (kennung, Auftragsarchiv(pfad))
+        return _archiv[1]
+
+
+def auftragsarchiv_bereit():
+    """True, sobald das Archiv geladen ist (ohne darauf zu warten)"""
+    return _archiv is not None
+
+
+def auftragsarchiv_vorladen():
+    """Lädt das Archiv im Hintergrund, damit die erste Suche nicht wartet"""
+    threading.Thread(target=get_auftragsarchiv, name="Auftragsarchiv", daemon=True).start()
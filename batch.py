@@ -0,0 +1,322 @@
+"""Stapelberechnung von Lademetern und Preisen für CSV/XLSX-Exporte.
+
+Die Eingabedatei wird blockweise gelesen; jeder Block wird mit NumPy
+spaltenweise berechnet und sofort in die Ausgabedatei geschrieben. Der
+Speicherbedarf hängt damit nur von der Blockgröße ab, nicht von der
+Länge der Datei. Fehlerhafte Zeilen brechen den Lauf nicht ab, sondern
+erhalten einen Text in der Spalte "fehler".
+"""
+import csv
+import itertools
+import time
+
+import numpy as np
+
+from beladung import beladen
+from berechnung import palettengroesse_zerlegen, verfuegbare_fahrzeuge
+from geocoding import get_coords, strassen_km_paare
+from tarif import get_tarif
+
+BLOCKGROESSE = 100_000
+
+# Kanonischer Spaltenname -> akzeptierte Überschriften (kleingeschrieben)
+SPALTEN = {
+    "palettengroesse": ("palettengroesse", "palettengröße", "groesse", "größe", "abmessung"),
+    "menge": ("menge", "anzahl", "paletten"),
+    "stapelbarkeit": ("stapelbarkeit", "stapel"),
+    "kilometer": ("kilometer", "km"),
+    "startort": ("startort", "start"),
+    "zielort": ("zielort", "ziel"),
+    "fahrzeug": ("fahrzeug", "fahrzeugtyp"),
+    "kunde": ("kunde", "kundennummer", "auftraggeber"),
+}
+ERGEBNIS_SPALTEN = ["lademeter", "entfernung_km", "preis", "fehler"]
+
+
+def spalten_zuordnen(kopf):
+    """Ordnet den kanonischen Spaltennamen den Index in der Kopfzeile zu (oder None)"""
+    kopf = [str(k or "").strip().lower() for k in kopf]
+    zuordnung = {}
+    for name, aliase in SPALTEN.items():
+        zuordnung[name] = next((i for i, k in enumerate(kopf) if k in aliase), None)
+    for pflicht in ("palettengroesse", "menge", "stapelbarkeit"):
+        if zuordnung[pflicht] is None:
+            raise ValueError(f"Spalte '{pflicht}' fehlt in der Eingabedatei")
+    return zuordnung
+
+
+def _csv_zeilen(pfad):
+    with open(pfad, newline="", encoding="utf-8-sig") as datei:
+        erste_zeile = datei.readline()
+        datei.seek(0)
+        trennzeichen = max(";,\t", key=erste_zeile.count)
+        yield from csv.reader(datei, delimiter=trennzeichen)
+
+
+def _xlsx_zeilen(pfad):
+    import openpyxl
+    wb = openpyxl.load_workbook(pfad, read_only=True, data_only=True)
+    try:
+        for zeile in wb.worksheets[0].iter_rows(values_only=True):
+            yield ["" if wert is None else wert for wert in zeile]
+    finally:
+        wb.close()
+
+
+def tabelle_lesen(pfad):
+    """Liefert (Kopfzeile, Iterator über Datenzeilen) für eine CSV- oder XLSX-Datei"""
+    if pfad.lower().endswith((".xlsx", ".xlsm")):
+        zeilen = _xlsx_zeilen(pfad)
+    else:
+        zeilen = _csv_zeilen(pfad)
+    kopf = next(zeilen, None)
+    if kopf is None:
+        raise ValueError("Die Eingabedatei ist leer")
+    return list(kopf), zeilen
+
+
+def _spalten(zeilen, breite):
+    """Transponiert einen Block in genau `breite` Spalten (kurze Zeilen werden mit "" aufgefüllt,
+    Zellen rechts der Kopfzeile verworfen - sie hätten keine Spaltenüberschrift)"""
+    spalten = list(itertools.zip_longest(*zeilen, fillvalue=""))[:breite]
+    return spalten + [("",) * len(zeilen)] * (breite - len(spalten))
+
+
+def runden(werte, stellen):
+    """Vektorisiertes Runden mit exakt demselben Ergebnis wie Pythons round().
+
+    np.round rundet den bereits gerundeten Wert werte * 10**stellen; round()
+    dagegen den exakten Binärwert (und bei echtem Gleichstand zur geraden
+    Ziffer). Die exakte Differenz zur Rundungsgrenze wird deshalb über eine
+    Veltkamp-Zerlegung der Werte bestimmt.
+    """
+    faktor = 10.0 ** stellen
+    unten = np.floor(werte * faktor)
+    split = 134217729.0 * werte  # 2**27 + 1
+    hoch = split - (split - werte)
+    tief = werte - hoch
+    differenz = (hoch * faktor - (unten + 0.5)) + tief * faktor
+    aufrunden = (differenz > 0) | ((differenz == 0) & (np.fmod(unten, 2) != 0))
+    return (unten + aufrunden) / faktor
+
+
+def _fehler_setzen(fehler, maske, text):
+    for i in np.flatnonzero(maske):
+        if not fehler[i]:
+            fehler[i] = text
+
+
+def _zahlen(werte, fehler, text, ganzzahl=False, leer_erlaubt=False):
+    """Wandelt eine Spalte in ein float-Array; ungültige Werte werden NaN und als Fehler markiert"""
+    try:
+        # Schneller Weg: die ganze Spalte auf einmal umwandeln
+        zahlen = np.array(werte, dtype=float)
+    except (TypeError, ValueError):
+        zahlen = np.empty(len(werte))
+        for i, wert in enumerate(werte):
+            if isinstance(wert, str):
+                wert = wert.strip().replace(",", ".")
+                if not wert:
+                    zahlen[i] = np.nan
+                    if not leer_erlaubt and not fehler[i]:
+                        fehler[i] = text
+                    continue
+            try:
+                zahlen[i] = float(wert)
+            except (TypeError, ValueError):
+                zahlen[i] = np.nan
+                if not fehler[i]:
+                    fehler[i] = text
+    if ganzzahl:
+        _fehler_setzen(fehler, np.isfinite(zahlen) & (zahlen != np.floor(zahlen)), text)
+    return zahlen
+
+
+def _nach_eindeutigen(werte):
+    """np.unique über eine Textspalte: (eindeutige Werte, Rückabbildung auf die Zeilen)"""
+    eindeutig, rueck = np.unique(np.asarray(werte, dtype=str), return_inverse=True)
+    return [wert.strip() for wert in eindeutig.tolist()], rueck
+
+
+def _routen_km(startorte, zielorte, offen, fehler):
+    """Geokodiert jede vorkommende Relation nur einmal (über den Orts-Cache); die Entfernungen
+    aller Relationen werden danach in einem Aufruf berechnet (siehe strassen_km_paare)"""
+    km = np.full(len(startorte), np.nan)
+    relationen = {}
+    zeilen = []
+    for i in np.flatnonzero(offen):
+        relation = (str(startorte[i]).strip(), str(zielorte[i]).strip())
+        if relation not in relationen:
+            try:
+                relationen[relation] = (get_coords(relation[0]), get_coords(relation[1]))
+            except Exception as e:
+                relationen[relation] = f"Fehler bei der Routenberechnung: {e}"
+        zeilen.append((i, relation))
+    geokodiert = [relation for relation, ergebnis in relationen.items() if not isinstance(ergebnis, str)]
+    for relation, kilometer in zip(geokodiert, strassen_km_paare([relationen[r] for r in geokodiert])):
+        relationen[relation] = kilometer
+    for i, relation in zeilen:
+        ergebnis = relationen[relation]
+        if isinstance(ergebnis, str):
+            fehler[i] = fehler[i] or ergebnis
+        else:
+            km[i] = ergebnis
+    return km
+
+
+def _zeilen_gruppieren(spalten):
+    """Gruppiert Zeilen mit gleichen Werten in allen Spalten: (erste Zeile je Gruppe, Rückabbildung).
+
+    Statt np.unique(axis=0) wird Spalte für Spalte ein ganzzahliger
+    Schlüssel aufgebaut und nach jedem Schritt wieder verdichtet - das
+    bleibt eindimensional und damit schnell.
+    """
+    schluessel = np.zeros(len(spalten[0]), dtype=np.int64)
+    for spalte in spalten:
+        werte, rueck = np.unique(spalte, return_inverse=True)
+        _, schluessel = np.unique(schluessel * len(werte) + rueck.reshape(-1), return_inverse=True)
+        schluessel = schluessel.reshape(-1)
+    _, erste, rueck = np.unique(schluessel, return_index=True, return_inverse=True)
+    return erste, rueck.reshape(-1)
+
+
+def _lademeter(masse, menge, stapel, fahrzeuge, fahrzeug_nr, fehler):
+    """Lademeter je Zeile über beladung.beladen - jede vorkommende Kombination
+    aus Maßen, Menge, Stapelbarkeit und Fahrzeug wird nur einmal beladen"""
+    lademeter = np.full(len(fehler), np.nan)
+    spalten = [masse[:, 0], masse[:, 1], masse[:, 2], menge, stapel, fahrzeug_nr]
+    gueltig = np.array([not f for f in fehler], dtype=bool)
+    for spalte in spalten:
+        gueltig &= np.isfinite(spalte)
+    zeilen = np.flatnonzero(gueltig)
+    if not len(zeilen):
+        return lademeter
+    erste, rueck = _zeilen_gruppieren([spalte[zeilen] for spalte in spalten])
+    lademeter_u = np.full(len(erste), np.nan)
+    fehler_u = {}
+    for j, i in enumerate(zeilen[erste].tolist()):
+        laenge, breite, hoehe = masse[i].tolist()
+        try:
+            lademeter_u[j] = beladen(laenge, breite, hoehe, int(menge[i]), int(stapel[i]),
+                                     fahrzeuge[fahrzeug_nr[i]]).lademeter
+        except ValueError as e:
+            fehler_u[j] = str(e)
+    lademeter[zeilen] = lademeter_u[rueck]
+    for position in np.flatnonzero(np.isnan(lademeter_u)[rueck]).tolist():
+        i = zeilen[position]
+        fehler[i] = fehler[i] or fehler_u[rueck[position]]
+    return lademeter
+
+
+def block_berechnen(spalten, zuordnung, standard_fahrzeug=None):
+    """Berechnet Lademeter, Entfernung und Preis für einen Block (spaltenweise).
+
+    Zeilen ohne Fahrzeug gelten für `standard_fahrzeug`, ohne Angabe für den
+    ersten Fahrzeugtyp des geltenden Tarifs.
+
+    Liefert (lademeter, kilometer, preis, fehler); bei Fehlerzeilen sind die
+    Zahlen NaN und `fehler` enthält die Ursache.
+    """
+    n = len(spalten[0]) if spalten else 0
+    fehler = [""] * n
+    standard_fahrzeug = standard_fahrzeug or verfuegbare_fahrzeuge()[0]
+
+    def _spalte(index):
+        return None if index is None else spalten[index]
+
+    # Palettengröße: jede vorkommende Größe nur einmal zerlegen
+    groessen, rueck = _nach_eindeutigen(_spalte(zuordnung["palettengroesse"]))
+    masse_u = np.full((len(groessen), 3), np.nan)
+    groessen_fehler = {}
+    for j, groesse in enumerate(groessen):
+        try:
+            masse_u[j] = palettengroesse_zerlegen(groesse)
+        except ValueError as e:
+            groessen_fehler[j] = str(e)
+    masse = masse_u[rueck]
+    for j, text in groessen_fehler.items():
+        _fehler_setzen(fehler, rueck == j, text)
+
+    menge = _zahlen(_spalte(zuordnung["menge"]), fehler, "Ungültige Menge", ganzzahl=True)
+    stapel = _zahlen(_spalte(zuordnung["stapelbarkeit"]), fehler, "Ungültige Stapelbarkeit", ganzzahl=True)
+
+    # Kilometer: manuelle Angabe, sonst Start-/Zielort
+    if zuordnung["kilometer"] is not None:
+        km = _zahlen(_spalte(zuordnung["kilometer"]), fehler, "Ungültige Kilometerangabe", leer_erlaubt=True)
+    else:
+        km = np.full(n, np.nan)
+    offen = np.isnan(km)
+    if zuordnung["startort"] is not None and zuordnung["zielort"] is not None:
+        startorte = _spalte(zuordnung["startort"])
+        zielorte = _spalte(zuordnung["zielort"])
+        mit_route = offen & np.array([bool(str(s).strip()) and bool(str(z).strip())
+                                      for s, z in zip(startorte, zielorte)], dtype=bool)
+        mit_route &= np.array([not f for f in fehler], dtype=bool)
+        if mit_route.any():
+            km[mit_route] = _routen_km(startorte, zielorte, mit_route, fehler)[mit_route]
+        offen &= ~mit_route
+    _fehler_setzen(fehler, offen, "Bitte entweder Start- und Zielort ODER die Kilometer angeben")
+
+    # fahrzeug_nr/kunde_nr: Index in `fahrzeuge`/`kunden` je Zeile
+    if zuordnung["fahrzeug"] is not None:
+        fahrzeuge, fahrzeug_nr = _nach_eindeutigen(_spalte(zuordnung["fahrzeug"]))
+        fahrzeuge = [f or standard_fahrzeug for f in fahrzeuge]
+    else:
+        fahrzeuge, fahrzeug_nr = [standard_fahrzeug], np.zeros(n, dtype=int)
+    kunden, kunde_nr = (_nach_eindeutigen(_spalte(zuordnung["kunde"])) if zuordnung["kunde"] is not None
+                        else (None, None))
+
+    lademeter = _lademeter(masse, menge, stapel, fahrzeuge, fahrzeug_nr, fehler)
+
+    tarif = get_tarif()
+    with np.errstate(invalid="ignore", over="ignore"):
+        preis = tarif.preise(km, fahrzeuge, fahrzeug_nr, lademeter, kunden, kunde_nr)
+        preis = runden(preis, 2)
+        km = runden(km, 1)
+    for j, fahrzeug in enumerate(fahrzeuge):
+        if not tarif.kennt(fahrzeug):
+            _fehler_setzen(fehler, fahrzeug_nr == j, f"Kein Tarif für Fahrzeugtyp '{fahrzeug}'")
+
+    ungueltig = np.array([bool(f) for f in fehler], dtype=bool)
+    lademeter[ungueltig] = np.nan
+    preis[ungueltig] = np.nan
+    return lademeter, km, preis, fehler
+
+
+def _ausgabewerte(werte):
+    """Zahlen für den CSV-Writer; NaN (Fehlerzeilen) wird zur leeren Zelle"""
+    objekte = werte.astype(object)
+    objekte[np.isnan(werte)] = None
+    return objekte.tolist()
+
+
+def batch_berechnen(eingabe, ausgabe, standard_fahrzeug=None, blockgroesse=BLOCKGROESSE,
+                    trennzeichen=";", fortschritt=None):
+    """Berechnet eine komplette Datei blockweise und liefert eine kleine Statistik"""
+    beginn = time.perf_counter()
+    kopf, zeilen = tabelle_lesen(eingabe)
+    # Einmal für die ganze Datei, auch wenn sich der Tarif während des Laufs ändert
+    standard_fahrzeug = standard_fahrzeug or verfuegbare_fahrzeuge()[0]
+    zuordnung = spalten_zuordnen(kopf)
+    anzahl = fehlerhaft = 0
+    with open(ausgabe, "w", newline="", encoding="utf-8") as datei:
+        datei.write("\ufeff")  # BOM, damit Excel die Datei als UTF-8 erkennt
+        writer = csv.writer(datei, delimiter=trennzeichen)
+        writer.writerow(kopf + ERGEBNIS_SPALTEN)
+        while True:
+            block = list(itertools.islice(zeilen, blockgroesse))
+            if not block:
+                break
+            spalten = _spalten(block, len(kopf))
+            lademeter, km, preis, fehler = block_berechnen(spalten, zuordnung, standard_fahrzeug)
+            writer.writerows(zip(*spalten, _ausgabewerte(lademeter), _ausgabewerte(km),
+                                 _ausgabewerte(preis), fehler))
+            anzahl += len(block)
+            fehlerhaft += sum(1 for f in fehler if f)
+            if fortschritt:
+                fortschritt(anzahl)
+    return {
+        "zeilen": anzahl,
+        "fehlerhaft": fehlerhaft,
+        "sekunden": round(time.perf_counter() - beginn, 3),
+    }
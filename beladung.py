@@ -0,0 +1,153 @@
+"""Beladung der Ladefläche: wie die Paletten tatsächlich auf das Fahrzeug passen.
+
+Die Paletten stehen in Reihen quer über die Ladefläche - längs (Palettenlänge
+in Fahrtrichtung) oder quer gedreht; längs- und quer gestellte Reihen dürfen
+gemischt werden. Gestapelt wird, so weit Stapelbarkeit und Innenhöhe des
+Laderaums es erlauben. Die Lademeter sind die belegte Länge der Ladefläche;
+eine angebrochene Reihe zählt dabei nur mit der Grundfläche ihrer Stapel
+(bezogen auf 2,40 m Ladebreite), wie früher jede einzelne Palette - eine
+Palette 120x80 sind also 0,4 Lademeter, nicht die ganze Reihentiefe.
+
+Ergebnisse werden mit lru_cache zwischengespeichert: dieselbe Sendung (wie
+beim Tippen in der Oberfläche oder in Stapelläufen üblich) kostet danach nur
+noch einen Dict-Zugriff.
+"""
+import math
+from functools import lru_cache
+from typing import NamedTuple
+
+# Innenmaße des Laderaums in cm: (Länge, Breite, Höhe)
+LADERAEUME = {
+    "Sprinter": (430, 178, 190),
+    "Planensprinter": (480, 210, 220),
+    "Klein LKW": (620, 240, 240),
+    "7,5 Tonnen LKW": (720, 245, 240),
+    "Tautliner": (1360, 248, 270),
+    "Mega": (1360, 248, 300),
+    "Jumbo": (1540, 245, 300),
+}
+# Ohne (bekanntes) Fahrzeug: Sattelauflieger mit der Lademeter-Bezugsbreite von 2,40 m
+STANDARD_LADERAUM = (1360, 240, 270)
+LADEMETER_BREITE = 240   # cm
+# Obergrenze für die Paletten einer Sendung (schützt vor Tippfehlern und unsinnigen Anfragen)
+MAX_MENGE = 10000
+
+LAENGS = "längs"
+QUER = "quer"
+
+
+class Reihen(NamedTuple):
+    """Gleichartige, aufeinander folgende Reihen quer über die Ladefläche"""
+    ausrichtung: str   # LAENGS oder QUER
+    anzahl: int        # Anzahl Reihen
+    stapel: int        # Palettenstapel je Reihe
+    tiefe: float       # Länge einer Reihe in cm
+
+
+class Beladung(NamedTuple):
+    lademeter: float   # belegte Länge in m (auf 0,01 m gerundet), angebrochene Reihen nach Grundfläche
+    stapel: int        # Anzahl Stellplätze (Palettenstapel)
+    lagen: int         # Paletten je Stapel (höchstens)
+    reihen: tuple      # Reihen von vorne nach hinten
+    passt: bool        # True, wenn alles auf ein Fahrzeug passt
+
+
+def laderaum(fahrzeug=None):
+    """Innenmaße (Länge, Breite, Höhe) in cm; unbekannte Fahrzeuge erhalten den Standard-Laderaum"""
+    return LADERAEUME.get(fahrzeug, STANDARD_LADERAUM)
+
+
+def _reihen(ausrichtung, stapel, je_reihe, tiefe):
+    """Verteilt `stapel` auf volle Reihen und eine angebrochene letzte Reihe"""
+    volle, rest = divmod(stapel, je_reihe)
+    reihen = []
+    if volle:
+        reihen.append(Reihen(ausrichtung, volle, je_reihe, tiefe))
+    if rest:
+        reihen.append(Reihen(ausrichtung, 1, rest, tiefe))
+    return reihen
+
+
+@lru_cache(maxsize=65536)
+def beladen(laenge: float, breite: float, hoehe: float, menge: int, stapelbarkeit: int,
+            fahrzeug: str = None) -> Beladung:
+    """Stellt `menge` Paletten (Maße in cm) auf die Ladefläche von `fahrzeug`.
+
+    Stapelbarkeit n heißt: n Paletten dürfen auf einer stehen (n + 1 Lagen),
+    begrenzt durch die Innenhöhe. Wirft ValueError bei ungültigen Angaben und
+    wenn die Palette nicht in den Laderaum passt.
+    """
+    if not (math.isfinite(laenge) and math.isfinite(breite) and math.isfinite(hoehe)):
+        raise ValueError("Die Palettenmaße müssen endliche Zahlen sein.")
+    if laenge <= 0 or breite <= 0 or hoehe <= 0:
+        raise ValueError("Die Palettenmaße müssen größer als 0 sein.")
+    if menge > MAX_MENGE:   # vor isfinite: sehr große Ganzzahlen passen in kein float
+        raise ValueError(f"Die Menge darf höchstens {MAX_MENGE} Paletten betragen.")
+    if not math.isfinite(menge):
+        raise ValueError("Die Menge muss eine endliche Zahl sein.")
+    if menge < 0:
+        raise ValueError("Die Menge darf nicht negativ sein.")
+    if stapelbarkeit < 0:
+        raise ValueError("Die Stapelbarkeit darf nicht negativ sein.")
+    innen_laenge, innen_breite, innen_hoehe = laderaum(fahrzeug)
+
+    max_lagen = int(innen_hoehe // hoehe)
+    if max_lagen == 0:
+        raise ValueError(f"Die Palette ist mit {hoehe:g} cm höher als der Laderaum ({innen_hoehe} cm).")
+    lagen = min(stapelbarkeit + 1, max_lagen)
+    stapel = math.ceil(menge / lagen)
+
+    # Stapel je Reihe und Reihentiefe für beide Ausrichtungen
+    laengs = (LAENGS, int(innen_breite // breite), laenge)
+    quer = (QUER, int(innen_breite // laenge), breite)
+    moeglich = [art for art in (laengs, quer) if art[1] > 0]
+    if not moeglich:
+        raise ValueError(f"Die Palette ist breiter als die Ladefläche ({innen_breite} cm).")
+    # Haupt-Ausrichtung: geringste Tiefe je Stapel; die andere füllt nur das Ende auf
+    moeglich.sort(key=lambda art: art[2] / art[1])
+    haupt = moeglich[0]
+    neben = moeglich[1] if len(moeglich) > 1 else None
+
+    # Mehr als haupt[1] Neben-Reihen lohnen nie: sie ließen sich durch
+    # neben[1] Haupt-Reihen mit gleich vielen Stapeln und weniger Tiefe ersetzen.
+    beste = (math.ceil(stapel / haupt[1]) * haupt[2], 0)
+    if neben is not None:
+        for neben_reihen in range(1, min(haupt[1], math.ceil(stapel / neben[1])) + 1):
+            haupt_reihen = math.ceil(max(0, stapel - neben_reihen * neben[1]) / haupt[1])
+            tiefe = haupt_reihen * haupt[2] + neben_reihen * neben[2]
+            if tiefe < beste[0]:
+                beste = (tiefe, neben_reihen)
+    gesamt_tiefe, neben_reihen = beste
+
+    reihen = []
+    neben_stapel = min(stapel, neben_reihen * neben[1]) if neben_reihen else 0
+    if stapel - neben_stapel:
+        reihen += _reihen(haupt[0], stapel - neben_stapel, haupt[1], haupt[2])
+    if neben_stapel:
+        reihen += _reihen(neben[0], neben_stapel, neben[1], neben[2])
+
+    # Volle Reihen belegen ihre ganze Tiefe; eine angebrochene nur die Grundfläche ihrer Stapel
+    belegt = 0.0
+    for reihe in reihen:
+        je_reihe = haupt[1] if reihe.ausrichtung == haupt[0] else neben[1]
+        if reihe.stapel == je_reihe:
+            belegt += reihe.anzahl * reihe.tiefe
+        else:
+            belegt += min(reihe.tiefe, reihe.stapel * laenge * breite / LADEMETER_BREITE)
+
+    return Beladung(round(belegt / 100, 2), stapel, lagen if menge else 0, tuple(reihen),
+                    gesamt_tiefe <= innen_laenge)
+
+
+def beladung_beschreiben(beladung: Beladung, fahrzeug=None) -> str:
+    """Kurzer Text zur Anordnung, z.B. '11 Reihen längs à 3, 1 Reihe quer à 2 · 2 Lagen'"""
+    if not beladung.reihen:
+        return "keine Paletten"
+    teile = [f"{r.anzahl} {'Reihe' if r.anzahl == 1 else 'Reihen'} {r.ausrichtung} à {r.stapel}"
+             for r in beladung.reihen]
+    text = ", ".join(teile)
+    if beladung.lagen > 1:
+        text += f" · {beladung.lagen} Lagen"
+    if not beladung.passt:
+        text += f" · passt nicht auf einen {fahrzeug or 'Sattelauflieger'} ({laderaum(fahrzeug)[0] / 100:g} m)"
+    return text
@@ -0,0 +1,112 @@
+"""Auftragsarchiv: Import vieler AU-Aufträge, erneuter Import und Suche.
+
+    python benchmarks/bench_archiv.py [--anzahl 2000] [--prozesse 4]
+
+Erzeugt aus der mitgelieferten AU-Datei zufällige Aufträge (9 von 10 als
+.xls, der Rest als .xlsx), importiert sie, ändert und löscht einige und
+prüft, dass der zweite Import nur diese Dateien liest. Rückgabewert 1,
+wenn eine Prüfung fehlschlägt.
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+from au_auftraege import au_auftraege_erzeugen  # noqa: E402
+from auftragsarchiv import Auftragsarchiv, archiv_importieren, auftrag_lesen  # noqa: E402
+from suite import _xlsx_aus_xls  # noqa: E402
+
+FIRMEN = ["Machs-Trans", "Nordfracht", "Oder Logistik", "Spedition Berg", "Trans-Pol", "Elbe Cargo"]
+ORTE = ["55-300 Środa Śląska", "38440 Wolfsburg", "10115 Berlin", "80331 München", "00-001 Warszawa",
+        "20095 Hamburg", "50667 Köln", "61-001 Poznań"]
+
+
+def auftraege_erzeugen(anzahl, rng):
+    auftraege = []
+    for nummer in range(anzahl):
+        firma = rng.choice(FIRMEN)
+        auftraege.append({
+            "datei": f"AU {nummer:05d}",
+            "partner": f"{firma} {nummer % 97}\\nul. Przykładowa {nummer % 50}\\n{rng.choice(ORTE)}",
+            "kennzeichen": f"Kennzeichen: {rng.choice(['DW', 'WE', 'H', 'B'])} {rng.randint(1000, 99999)}",
+            "fahrer": f"Fahrername: Fahrer {nummer % 300}",
+            "ladestelle": f"Lager {nummer % 40}\\n{rng.choice(ORTE)}",
+            "entladestelle": f"Werk {nummer % 25}\\n{rng.choice(ORTE)}",
+            "fahrzeug": f"{rng.choice(['Tautliner', 'Mega', 'Sprinter'])}\\n{rng.randint(1, 33)}x",
+            "ids": f"Dispo {nummer}",
+        })
+    return auftraege
+
+
+def pruefen(name, ok, text):
+    print(f"{'OK ' if ok else 'FEHLER'} {name}: {text}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--anzahl", type=int, default=2000)
+    parser.add_argument("--prozesse", type=int, help="Worker-Prozesse (Standard: Anzahl CPU-Kerne)")
+    args = parser.parse_args()
+    rng = random.Random(42)
+    vorlage = glob.glob(os.path.join(os.path.dirname(BENCHMARKS), "AU*.xls"))[0]
+    ergebnisse = []
+
+    with tempfile.TemporaryDirectory() as ordner:
+        auftraege = auftraege_erzeugen(args.anzahl, rng)
+        xlsx_vorlage = os.path.join(ordner, "vorlage.xlsx")
+        _xlsx_aus_xls(vorlage, xlsx_vorlage)
+        anteil = args.anzahl // 10
+        dateien = os.path.join(ordner, "auftraege")
+        beginn = time.perf_counter()
+        fehler = [f for _, f in au_auftraege_erzeugen(vorlage, auftraege[anteil:], dateien, args.prozesse)
+                  + au_auftraege_erzeugen(xlsx_vorlage, auftraege[:anteil], os.path.join(dateien, "xlsx"),
+                                          args.prozesse) if f]
+        print(f"{args.anzahl:,} Aufträge erzeugt ({time.perf_counter() - beginn:.1f} s, {len(fehler)} Fehler)")
+
+        archiv = os.path.join(ordner, "archiv.sqlite")
+        statistik = archiv_importieren(dateien, archiv, args.prozesse)
+        ergebnisse.append(pruefen(
+            "Import", statistik["gelesen"] == args.anzahl and not statistik["fehler"],
+            f"{statistik['gelesen']:,} Dateien in {statistik['sekunden']} s "
+            f"({statistik['gelesen'] / max(statistik['sekunden'], 1e-9):,.0f} Dateien/s)"))
+
+        geaendert = sorted(glob.glob(os.path.join(dateien, "*.xls")))[:10]
+        for pfad in geaendert:
+            os.utime(pfad, ns=(time.time_ns(), time.time_ns() + 10**9))
+        geloescht = sorted(glob.glob(os.path.join(dateien, "xlsx", "*.xlsx")))[:5]
+        for pfad in geloescht:
+            os.remove(pfad)
+        statistik = archiv_importieren(dateien, archiv, args.prozesse)
+        ergebnisse.append(pruefen(
+            "Erneuter Import", statistik["gelesen"] == len(geaendert) and statistik["entfernt"] == len(geloescht),
+            f"{statistik['gelesen']} gelesen, {statistik['unveraendert']:,} unverändert, "
+            f"{statistik['entfernt']} entfernt in {statistik['sekunden']} s"))
+
+        beginn = time.perf_counter()
+        index = Auftragsarchiv(archiv)
+        laden = time.perf_counter() - beginn
+        suchen = ["nordfracht", "wolfs", "Środa werk 1", "DW 1", "dispo 12", "tautliner berlin"]
+        beginn = time.perf_counter()
+        for _ in range(100):
+            for text in suchen:
+                index.suchen(text)
+        dauer = (time.perf_counter() - beginn) / (100 * len(suchen))
+        erwartet = auftrag_lesen(os.path.join(dateien, "AU 01234.xls"))
+        gefunden = index.suchen("dispo 1234")
+        ergebnisse.append(pruefen(
+            "Suche", len(index) == args.anzahl - len(geloescht) and any(
+                treffer["ids"] == erwartet["ids"] and treffer["partner"] == erwartet["partner"] for treffer in gefunden),
+            f"{len(index):,} Aufträge geladen in {laden * 1000:.0f} ms, {dauer * 1e6:.0f} µs je Suche"))
+    return 0 if all(ergebnisse) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Durchsatz der Beladungsberechnung (Ziel: mindestens 10.000 Sendungen/s).
+
+    python benchmarks/bench_beladung.py [--sendungen 100000]
+
+Gemessen wird einmal ohne Zwischenspeicher (jede Sendung neu beladen) und
+einmal mit typischen Wiederholungen, wie sie in Stapelläufen vorkommen.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from beladung import LADERAEUME, beladen  # noqa: E402
+
+ZIEL_PRO_S = 10_000
+PALETTEN = [(120, 80), (120, 100), (80, 60), (110, 110), (120, 120), (100, 100)]
+
+
+def sendungen(anzahl, rng):
+    fahrzeuge = list(LADERAEUME) + [None]
+    return [(*rng.choice(PALETTEN), rng.randint(50, 200), rng.randint(1, 60), rng.randint(0, 3),
+             rng.choice(fahrzeuge)) for _ in range(anzahl)]
+
+
+def messen(liste, funktion=beladen):
+    beginn = time.perf_counter()
+    for laenge, breite, hoehe, menge, stapelbarkeit, fahrzeug in liste:
+        try:
+            funktion(laenge, breite, hoehe, menge, stapelbarkeit, fahrzeug)
+        except ValueError:
+            pass  # Palette höher als der Laderaum
+    return len(liste) / (time.perf_counter() - beginn)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sendungen", type=int, default=100_000)
+    args = parser.parse_args()
+    rng = random.Random(42)
+    liste = sendungen(args.sendungen, rng)
+
+    beste = max(messen(liste, beladen.__wrapped__) for _ in range(3))
+    # Stapelläufe wiederholen dieselben Sendungen: 2.000 verschiedene, beliebig oft
+    wiederholt = [rng.choice(liste[:2000]) for _ in range(args.sendungen)]
+    beladen.cache_clear()
+    mit_cache = messen(wiederholt)
+
+    print(f"ohne Zwischenspeicher: {beste:,.0f} Sendungen/s ({1e6 / beste:.1f} µs je Sendung)")
+    print(f"mit Zwischenspeicher:  {mit_cache:,.0f} Sendungen/s (2.000 verschiedene Sendungen)")
+    print(f"Ziel {ZIEL_PRO_S:,}/s: {'erreicht' if beste >= ZIEL_PRO_S else 'VERFEHLT'}")
+    return 0 if beste >= ZIEL_PRO_S else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""Laufzeit und Qualität der Disposition (ohne Netzwerk, mit zufälligen Sendungen).
+
+    python benchmarks/bench_disposition.py [--sendungen 1000] [--relationen 20]
+
+Die Qualität der Heuristik wird an kleinen Instanzen gegen die exakte
+Lösung gemessen.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from disposition import Sendung, disponieren  # noqa: E402
+
+
+def sendungen(anzahl, relationen, rng):
+    kilometer = {f"R{nr}": rng.choice([30, 150, 400, 700, 1200]) for nr in range(relationen)}
+    liste = []
+    for nummer in range(anzahl):
+        relation = rng.choice(list(kilometer))
+        liste.append(Sendung(str(nummer), round(rng.uniform(0.4, 7.0), 1), round(rng.uniform(100, 8000)),
+                             relation, kilometer[relation]))
+    return liste
+
+
+def kosten(sendungen_liste, exakt_bis):
+    fahrten, _ = disponieren(sendungen_liste, exakt_bis=exakt_bis)
+    return sum(fahrt.kosten for fahrt in fahrten), len(fahrten)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sendungen", type=int, default=1000)
+    parser.add_argument("--relationen", type=int, default=20)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    for relationen in (args.relationen, 1):
+        liste = sendungen(args.sendungen, relationen, rng)
+        beginn = time.perf_counter()
+        summe, fahrten = kosten(liste, exakt_bis=0)
+        dauer = time.perf_counter() - beginn
+        einzeln = sum(kosten([sendung], exakt_bis=1)[0] for sendung in liste)
+        print(f"{len(liste):,} Sendungen / {relationen} Relation(en): {dauer:.2f} s, {fahrten} Fahrten, "
+              f"{summe:,.2f} € (einzeln gefahren: {einzeln:,.2f} €)")
+
+    # Heuristik gegen exakte Lösung auf kleinen Instanzen
+    heuristisch = exakt = 0.0
+    for _ in range(200):
+        liste = sendungen(rng.randint(2, 9), 1, rng)
+        heuristisch += kosten(liste, exakt_bis=0)[0]
+        exakt += kosten(liste, exakt_bis=len(liste))[0]
+    print(f"Heuristik über exakter Lösung (200 kleine Instanzen): {(heuristisch / exakt - 1) * 100:.2f} %")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
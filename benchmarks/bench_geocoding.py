@@ -0,0 +1,86 @@
+"""Geocoding-Client gegen den lokalen Nominatim-Stub (ohne Netzwerk).
+
+    python benchmarks/bench_geocoding.py [--abfragen 500]
+
+Misst Abfragen je Sekunde über eine Keep-Alive-Verbindung und prüft
+Ratenbegrenzung, Zusammenlegen gleichzeitiger Abfragen und Wiederholung
+nach Serverfehlern. Rückgabewert 1, wenn eine Prüfung fehlschlägt.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocoder import Geocoder  # noqa: E402
+from nominatim_stub import NominatimStub, koordinaten  # noqa: E402
+
+
+def gleich(coords, text):
+    """Vergleich mit den Stub-Koordinaten (der Stub antwortet mit 7 Nachkommastellen)"""
+    return [round(wert, 6) for wert in coords] == [round(wert, 6) for wert in koordinaten(text)]
+
+
+def pruefen(name, ok, text):
+    print(f"{'OK ' if ok else 'FEHLER'} {name}: {text}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--abfragen", type=int, default=500)
+    args = parser.parse_args()
+    ergebnisse = []
+
+    with NominatimStub() as stub:
+        geocoder = Geocoder(stub.url, rate=0)
+        beginn = time.perf_counter()
+        for nummer in range(args.abfragen):
+            coords = geocoder.suchen(f"Ort {nummer}")
+        dauer = time.perf_counter() - beginn
+        ergebnisse.append(pruefen(
+            "Keep-Alive", stub.verbindungen == 1 and gleich(coords, f"Ort {args.abfragen - 1}"),
+            f"{args.abfragen} Abfragen über {stub.verbindungen} Verbindung(en), "
+            f"{args.abfragen / dauer:,.0f} Abfragen/s"))
+
+    with NominatimStub(verzoegerung=0.2) as stub:
+        geocoder = Geocoder(stub.url, rate=0)
+        with ThreadPoolExecutor(20) as pool:
+            liste = list(pool.map(geocoder.suchen, ["Wolfsburg"] * 20))
+        ergebnisse.append(pruefen(
+            "Zusammenlegen", stub.anfragen == 1 and all(coords == liste[0] for coords in liste),
+            f"20 gleichzeitige Abfragen nach demselben Ort -> {stub.anfragen} Anfrage(n) an den Server"))
+
+    with NominatimStub() as stub:
+        geocoder = Geocoder(stub.url, rate=5)
+        beginn = time.perf_counter()
+        with ThreadPoolExecutor(10) as pool:
+            list(pool.map(geocoder.suchen, [f"Rate {nummer}" for nummer in range(11)]))
+        dauer = time.perf_counter() - beginn
+        ergebnisse.append(pruefen(
+            "Ratenbegrenzung", 1.9 <= dauer <= 2.5,
+            f"11 Abfragen bei 5/s in {dauer:.2f} s (erwartet 2,0 s)"))
+
+    with NominatimStub(fehler=2) as stub:
+        geocoder = Geocoder(stub.url, rate=0, wartezeit=0.05)
+        beginn = time.perf_counter()
+        coords = geocoder.suchen("Berlin")
+        dauer = time.perf_counter() - beginn
+        ergebnisse.append(pruefen(
+            "Wiederholung", gleich(coords, "Berlin") and stub.anfragen == 3,
+            f"2x HTTP 503, Erfolg im {stub.anfragen}. Versuch nach {dauer:.2f} s"))
+        try:
+            geocoder.suchen("unbekannt hier")
+            gefunden = True
+        except ValueError:
+            gefunden = False
+        ergebnisse.append(pruefen("Nicht gefunden", not gefunden and stub.anfragen == 4,
+                                  "leere Antwort -> ValueError ohne Wiederholung"))
+
+    return 0 if all(ergebnisse) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
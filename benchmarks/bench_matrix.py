@@ -0,0 +1,56 @@
+"""Durchsatz der Entfernungsmatrix (ohne Netzwerk, mit zufälligen Koordinaten).
+
+    python benchmarks/bench_matrix.py [--depots 500] [--kunden 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entfernungsmatrix import strassen_km_matrix  # noqa: E402
+from geocoding import geschaetzte_km  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--depots", type=int, default=500)
+    parser.add_argument("--kunden", type=int, default=2000)
+    parser.add_argument("--wiederholungen", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    # Koordinaten grob im Raum DE/PL
+    depots = np.column_stack([rng.uniform(47, 55, args.depots), rng.uniform(6, 24, args.depots)])
+    kunden = np.column_stack([rng.uniform(47, 55, args.kunden), rng.uniform(6, 24, args.kunden)])
+    paare = args.depots * args.kunden
+
+    zeiten = []
+    for _ in range(args.wiederholungen):
+        beginn = time.perf_counter()
+        matrix = strassen_km_matrix(depots, kunden)
+        zeiten.append(time.perf_counter() - beginn)
+    beste = min(zeiten)
+    print(f"Matrix {args.depots} x {args.kunden}: {beste * 1000:.1f} ms "
+          f"({paare / beste / 1e6:.1f} Mio. Paare/s)")
+
+    # Vergleich mit der skalaren Berechnung je Paar (Stichprobe)
+    stichprobe = min(paare, 20000)
+    beginn = time.perf_counter()
+    for k in range(stichprobe):
+        i, j = divmod(k, args.kunden)
+        geschaetzte_km(depots[i], kunden[j])
+    skalar = (time.perf_counter() - beginn) / stichprobe * paare
+    print(f"Skalar (hochgerechnet): {skalar * 1000:.1f} ms -> Faktor {skalar / beste:.0f}x")
+
+    # Plausibilität: gleiche Werte wie die skalare Funktion
+    abweichung = max(abs(matrix[i, j] - geschaetzte_km(depots[i], kunden[j]))
+                     for i, j in zip(rng.integers(0, args.depots, 1000), rng.integers(0, args.kunden, 1000)))
+    print(f"Max. Abweichung zur skalaren Funktion: {abweichung:.2f} km")
+
+
+if __name__ == "__main__":
+    main()
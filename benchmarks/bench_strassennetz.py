@@ -0,0 +1,140 @@
+"""Offline-Straßennetz: Korrektheit und Durchsatz auf einem zufälligen Netz.
+
+    python benchmarks/bench_strassennetz.py [--raster 60] [--abfragen 300]
+
+Erzeugt ein rasterförmiges Netz im Raum DE/PL mit Formpunkten und
+Einbahnstraßen, importiert es und vergleicht die Entfernungen mit einem
+einfachen Dijkstra auf dem ungekürzten Graphen. Rückgabewert 1 bei
+Abweichungen.
+"""
+import argparse
+import heapq
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocoding import luftlinie_km  # noqa: E402
+from strassennetz import Strassennetz, strassennetz_importieren  # noqa: E402
+
+
+def netz_erzeugen(raster, rng):
+    """Knoten [(lat, lon)] und Kanten [(von, nach, km, einbahn)] eines Rasters mit Formpunkten"""
+    knoten = [(50.0 + 4.0 * i / raster + rng.uniform(-0.01, 0.01), 7.0 + 15.0 * j / raster + rng.uniform(-0.01, 0.01))
+              for i in range(raster) for j in range(raster)]
+    kanten = []
+    for i in range(raster):
+        for j in range(raster):
+            for di, dj in ((0, 1), (1, 0)):
+                if i + di >= raster or j + dj >= raster or rng.random() < 0.15:
+                    continue
+                kette = [i * raster + j]
+                a, b = knoten[kette[0]], knoten[(i + di) * raster + j + dj]
+                formpunkte = rng.randint(0, 3)
+                for k in range(1, formpunkte + 1):
+                    anteil = k / (formpunkte + 1)
+                    kette.append(len(knoten))
+                    knoten.append((a[0] + (b[0] - a[0]) * anteil + rng.uniform(-0.005, 0.005),
+                                   a[1] + (b[1] - a[1]) * anteil + rng.uniform(-0.005, 0.005)))
+                kette.append((i + di) * raster + j + dj)
+                einbahn = rng.random() < 0.1
+                for u, v in zip(kette, kette[1:]):
+                    kanten.append((u, v, round(luftlinie_km(knoten[u], knoten[v]) * rng.uniform(1.05, 1.5), 3),
+                                   einbahn))
+    return knoten, kanten
+
+
+def dijkstra(kanten_je_knoten, quelle, ziel):
+    abstand = {quelle: 0.0}
+    haufen = [(0.0, quelle)]
+    while haufen:
+        d, u = heapq.heappop(haufen)
+        if u == ziel:
+            return d
+        if d > abstand[u]:
+            continue
+        for v, km in kanten_je_knoten.get(u, ()):
+            if d + km < abstand.get(v, math.inf):
+                abstand[v] = d + km
+                heapq.heappush(haufen, (d + km, v))
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--raster", type=int, default=60)
+    parser.add_argument("--abfragen", type=int, default=300)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    knoten, kanten = netz_erzeugen(args.raster, rng)
+    kanten_je_knoten = {}
+    for u, v, km, einbahn in kanten:
+        kanten_je_knoten.setdefault(u, []).append((v, km))
+        if not einbahn:
+            kanten_je_knoten.setdefault(v, []).append((u, km))
+
+    with tempfile.TemporaryDirectory() as ordner:
+        knoten_pfad = os.path.join(ordner, "knoten.csv")
+        kanten_pfad = os.path.join(ordner, "kanten.csv")
+        with open(knoten_pfad, "w", encoding="utf-8") as datei:
+            datei.write("id;lat;lon\n")
+            datei.writelines(f"n{i};{lat!r};{lon!r}\n" for i, (lat, lon) in enumerate(knoten))
+        with open(kanten_pfad, "w", encoding="utf-8") as datei:
+            datei.write("von;nach;km;einbahn\n")
+            datei.writelines(f"n{u};n{v};{km};{'ja' if einbahn else ''}\n" for u, v, km, einbahn in kanten)
+        beginn = time.perf_counter()
+        anzahl_knoten, anzahl_kanten = strassennetz_importieren(knoten_pfad, kanten_pfad,
+                                                                os.path.join(ordner, "strassennetz.dat"))
+        import_dauer = time.perf_counter() - beginn
+        beginn = time.perf_counter()
+        netz = Strassennetz(os.path.join(ordner, "strassennetz.dat"))
+        lade_dauer = time.perf_counter() - beginn
+    print(f"Netz: {len(knoten):,} Punkte, {len(kanten):,} Abschnitte -> {anzahl_knoten:,} Knoten, "
+          f"{anzahl_kanten:,} Kanten (Import {import_dauer:.2f} s, Laden {lade_dauer * 1000:.0f} ms)")
+
+    # Abfragen genau auf Netzpunkten: keine geschätzte Anbindung, das Ergebnis muss exakt stimmen
+    paare = [tuple(rng.sample(range(len(knoten)), 2)) for _ in range(args.abfragen)]
+    beginn = time.perf_counter()
+    ergebnisse = [netz.entfernung(knoten[u], knoten[v]) for u, v in paare]
+    einzeln = time.perf_counter() - beginn
+    fehler = 0
+    geprueft = 0
+    for (u, v), km in zip(paare, ergebnisse):
+        erwartet = dijkstra(kanten_je_knoten, u, v)
+        if km is None:
+            # Nur zulässig, wenn das Netz nicht weiterhilft (gleicher Straßenzug) oder kein Weg existiert
+            fehler += erwartet is not None and not netz._gleicher_abschnitt(netz.anbinden(knoten[u])[0],
+                                                                              netz.anbinden(knoten[v])[0])
+            continue
+        geprueft += 1
+        if erwartet is None or abs(km - erwartet) > 1e-6:
+            fehler += 1
+            print(f"Abweichung n{u} -> n{v}: {km} statt {erwartet}")
+    print(f"{'OK ' if not fehler else 'FEHLER'} A*: {geprueft} Entfernungen wie Dijkstra, {fehler} Abweichung(en); "
+          f"{einzeln / args.abfragen * 1000:.2f} ms je Abfrage")
+
+    # Stapel: 10 Starts x 100 Ziele als Matrix gegen Einzelabfragen
+    starts = [knoten[i] for i in rng.sample(range(len(knoten)), 10)]
+    ziele = [knoten[i] for i in rng.sample(range(len(knoten)), 100)]
+    netz.vergessen()
+    beginn = time.perf_counter()
+    matrix = netz.matrix(starts, ziele)
+    stapel = time.perf_counter() - beginn
+    netz.vergessen()
+    beginn = time.perf_counter()
+    einzelwerte = [[netz.entfernung(s, z) for z in ziele] for s in starts]
+    einzeln = time.perf_counter() - beginn
+    gleich = all(a == b or (a is not None and b is not None and abs(a - b) < 1e-6)
+                 for zeile_matrix, zeile in zip(matrix, einzelwerte) for a, b in zip(zeile_matrix, zeile))
+    print(f"{'OK ' if gleich else 'FEHLER'} Matrix 10 x 100: {stapel * 1000:.0f} ms "
+          f"(einzeln {einzeln * 1000:.0f} ms, Faktor {einzeln / stapel:.1f}x)")
+    return 0 if not fehler and gleich else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Lokaler Ersatz für den Nominatim-Suchdienst (Benchmarks ohne Netzwerk).
+
+    with NominatimStub(verzoegerung=0.05) as stub:
+        os.environ["LADEMETER_NOMINATIM"] = stub.url
+        ...
+
+Jeder Suchtext erhält reproduzierbare Koordinaten im Raum DE/PL (aus einem
+Hash des Textes); Suchtexte, die mit "unbekannt" beginnen, werden nicht
+gefunden. Mit `verzoegerung` lässt sich die Antwortzeit des echten Dienstes
+nachstellen, mit `fehler` beantwortet der Stub die ersten n Anfragen mit 503.
+Verbindungen bleiben offen (HTTP/1.1 Keep-Alive); `verbindungen` zählt sie.
+
+    python benchmarks/nominatim_stub.py [--port 8089] [--verzoegerung 0.2]
+"""
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def koordinaten(text):
+    """Reproduzierbare [lat, lon] für einen Suchtext"""
+    wert = int.from_bytes(hashlib.md5(text.casefold().encode("utf-8")).digest()[:8], "little")
+    return [47.0 + (wert % 80000) / 10000, 6.0 + (wert // 80000 % 180000) / 10000]
+
+
+class _Anfrage(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True   # Kopf und Inhalt gehen sonst mit 40 ms Verzögerung raus
+
+    def setup(self):
+        super().setup()
+        with self.server.sperre:
+            self.server.verbindungen += 1
+
+    def do_GET(self):
+        adresse = urlparse(self.path)
+        if adresse.path.rstrip("/") != "/search":
+            self.send_error(404)
+            return
+        text = parse_qs(adresse.query).get("q", [""])[0]
+        with self.server.sperre:
+            self.server.anfragen += 1
+            fehler = self.server.anfragen <= self.server.fehler
+        if self.server.verzoegerung:
+            time.sleep(self.server.verzoegerung)
+        if fehler:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if not text or text.casefold().startswith("unbekannt"):
+            antwort = []
+        else:
+            lat, lon = koordinaten(text)
+            antwort = [{"lat": f"{lat:.7f}", "lon": f"{lon:.7f}", "display_name": text}]
+        inhalt = json.dumps(antwort).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(inhalt)))
+        self.end_headers()
+        self.wfile.write(inhalt)
+
+    def log_message(self, *_):
+        pass
+
+
+class NominatimStub:
+    """Stub-Server in einem Hintergrund-Thread; `url` ist der Such-Endpunkt"""
+
+    def __init__(self, port=0, verzoegerung=0.0, fehler=0):
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Anfrage)
+        self._server.daemon_threads = True
+        self._server.verzoegerung = verzoegerung
+        self._server.fehler = fehler
+        self._server.anfragen = 0
+        self._server.verbindungen = 0
+        self._server.sperre = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/search"
+
+    @property
+    def anfragen(self):
+        return self._server.anfragen
+
+    @property
+    def verbindungen(self):
+        return self._server.verbindungen
+
+    def starten(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="NominatimStub", daemon=True)
+        self._thread.start()
+        return self
+
+    def beenden(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.starten()
+
+    def __exit__(self, *_):
+        self.beenden()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--verzoegerung", type=float, default=0.0, help="Antwortzeit in Sekunden")
+    args = parser.parse_args()
+    stub = NominatimStub(args.port, args.verzoegerung)
+    print(f"LADEMETER_NOMINATIM={stub.url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,406 @@
+"""Benchmark-Suite der heißen Pfade mit Baseline und Regressionsschwelle.
+
+    python benchmarks/suite.py                      # gegen baseline.json prüfen
+    python benchmarks/suite.py --baseline-speichern # aktuelle Werte als Baseline ablegen
+    python benchmarks/suite.py --schwelle 0.5 --nur excel
+
+Läuft ohne Anzeige und ohne Netzwerk: Nominatim wird durch den lokalen Stub
+(nominatim_stub.py) ersetzt, Orts-Cache und Gazetteer liegen in einem
+temporären Ordner. Die Excel-Messungen schreiben in Kopien der mitgelieferten
+AU-Datei (.xls) und einer daraus erzeugten gleichwertigen .xlsx.
+
+Gemessen wird je Pfad die beste von mehreren Wiederholungen (Sekunden je
+Aufruf). Ist ein Pfad um mehr als die Schwelle langsamer als in der Baseline,
+endet der Lauf mit Rückgabewert 1. Die Baseline gilt nur für den Rechner,
+auf dem sie gespeichert wurde.
+"""
+import argparse
+import gc
+import glob
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+STANDARD_BASELINE = os.path.join(BENCHMARKS, "baseline.json")
+STANDARD_SCHWELLE = 0.5   # 50 % langsamer als die Baseline gilt als Regression
+WIEDERHOLUNGEN = 5
+MINDESTDAUER = 1.0   # Sekunden je Messung
+
+# Felder eines vollständigen AU-Auftrags wie aus Tab 2
+AU_AUFTRAG = {
+    "partner": "Machs-Trans Magdalena\nul. Przykładowa 12\n55-300 Środa Śląska\nPL1234567890",
+    "kennzeichen": "DW 12345",
+    "fahrer": "Jan Kowalski",
+    "ladestelle": "55-300 Środa Śląska",
+    "e35": "Ladezeit 08:00",
+    "e36": "Entladezeit 14:00",
+    "entladestelle": "38440 Wolfsburg",
+    "e40": "Referenz 7168",
+    "fahrzeug": "Tautliner / 33 Paletten / 12.000 kg",
+    "ids": "Dispo 7168-2025",
+}
+
+
+def beste_zeit(funktion, anzahl, wiederholungen=WIEDERHOLUNGEN, vorbereiten=None):
+    """Beste Zeit je Aufruf aus mindestens `wiederholungen` Läufen zu je `anzahl` Aufrufen.
+
+    Kurze Messungen werden wiederholt, bis MINDESTDAUER erreicht ist - einzelne
+    Läufe von wenigen Millisekunden streuen sonst stark.
+    """
+    beste = float("inf")
+    # Wie timeit: keine Garbage Collection während der Messung
+    gc_aktiv = gc.isenabled()
+    start = time.perf_counter()
+    try:
+        lauf = 0
+        while lauf < wiederholungen or (time.perf_counter() - start < MINDESTDAUER and lauf < 200):
+            lauf += 1
+            if vorbereiten:
+                vorbereiten()
+            gc.collect()
+            gc.disable()
+            beginn = time.perf_counter()
+            funktion()
+            beste = min(beste, (time.perf_counter() - beginn) / anzahl)
+            if gc_aktiv:
+                gc.enable()
+    finally:
+        if gc_aktiv:
+            gc.enable()
+    return beste
+
+
+def bench_berechnung():
+    from beladung import beladen
+    from berechnung import berechne_lademeter, berechne_preis, verfuegbare_fahrzeuge
+    from live_berechnung import LiveBerechnung
+
+    fahrzeuge = verfuegbare_fahrzeuge()
+    rng = random.Random(42)
+    sendungen = [(f"{rng.choice((120, 100, 80))}x{rng.choice((80, 100, 120))}x{rng.randint(50, 150)}",
+                  rng.randint(1, 60), rng.randint(0, 3), rng.choice(fahrzeuge)) for _ in range(5000)]
+    fahrten = [(rng.uniform(0, 1500), rng.choice(fahrzeuge)) for _ in range(20000)]
+
+    def lademeter():
+        for groesse, menge, stapel, fahrzeug in sendungen:
+            berechne_lademeter(groesse, menge, stapel, fahrzeug)
+
+    def preise():
+        for kilometer, fahrzeug in fahrten:
+            berechne_preis(kilometer, fahrzeug)
+
+    # Live-Modus: je Tastendruck ändert sich ein Feld (Anzahl oder Fahrzeug), die Route ist bekannt
+    tastendruecke = [(sendung[1], rng.choice(fahrzeuge) if nummer % 5 == 0 else None)
+                     for nummer, sendung in enumerate(sendungen)]
+
+    def live_tippen():
+        live = LiveBerechnung()
+        fahrzeug = fahrzeuge[0]
+        for menge, neues_fahrzeug in tastendruecke:
+            fahrzeug = neues_fahrzeug or fahrzeug
+            beladung = live.beladung("120x80x100", menge, 1, fahrzeug)
+            live.preis(420.0, fahrzeug, beladung.lademeter)
+
+    return {
+        # Ohne Zwischenspeicher: jede Sendung wird neu beladen
+        "berechne_lademeter": beste_zeit(lademeter, len(sendungen), vorbereiten=beladen.cache_clear),
+        "berechne_lademeter_cache": beste_zeit(lademeter, len(sendungen)),
+        "berechne_preis": beste_zeit(preise, len(fahrten)),
+        "live_tastendruck": beste_zeit(live_tippen, len(tastendruecke), vorbereiten=beladen.cache_clear),
+    }
+
+
+def bench_tarif(ordner):
+    import numpy as np
+
+    from tarif import tarif_laden
+
+    tarif = tarif_laden(os.path.join(os.path.dirname(BENCHMARKS), "daten", "tarif_beispiel.json"))
+    rng = random.Random(42)
+    fahrzeuge = tarif.fahrzeuge
+    kunden = ["", "Muster GmbH", "Beispiel Logistik AG", "Unbekannt KG"]
+    auftraege = [(rng.uniform(0, 1500), rng.choice(fahrzeuge), rng.uniform(0.4, 13.6), rng.choice(kunden))
+                 for _ in range(20000)]
+    kilometer, fahrzeug, lademeter, kunde = (list(spalte) for spalte in zip(*auftraege))
+    kilometer, lademeter = np.array(kilometer), np.array(lademeter)
+
+    def einzeln():
+        for auftrag in auftraege:
+            tarif.preis(*auftrag)
+
+    return {
+        "tarif_preis": beste_zeit(einzeln, len(auftraege)),
+        # Alle Aufträge in einem Aufruf (Stapelberechnung)
+        "tarif_preise_stapel": beste_zeit(lambda: tarif.preise(kilometer, fahrzeug, lademeter=lademeter,
+                                                               kunden=kunde), len(auftraege)),
+    }
+
+
+def bench_zellen():
+    from excel_bearbeitung import cell_to_index, index_to_cell
+
+    zellen = [index_to_cell(row, col) for row in range(0, 2000, 7) for col in range(0, 60, 3)]
+
+    def parsen():
+        for zelle in zellen:
+            cell_to_index(zelle)
+
+    return {"cell_to_index": beste_zeit(parsen, len(zellen))}
+
+
+def bench_entfernung(ordner):
+    from nominatim_stub import NominatimStub
+
+    import geocoding
+
+    orte = [f"Ort {nummer}" for nummer in range(40)]
+    paare = [(orte[i], orte[(i * 7 + 3) % len(orte)]) for i in range(len(orte))]
+
+    def alle():
+        for start, ziel in paare:
+            geocoding.get_kilometer_von_orten(start, ziel)
+
+    def cache_leeren():
+        with geocoding._cache_lock:
+            geocoding._cache = geocoding.GeoCache(os.path.join(ordner, f"geocache_{time.perf_counter_ns()}.sqlite"))
+
+    with NominatimStub() as stub:
+        os.environ["LADEMETER_NOMINATIM"] = stub.url
+        try:
+            # Leerer Cache: jeder neue Ort geht an den (lokalen) Nominatim-Stub
+            kalt = beste_zeit(alle, len(paare), vorbereiten=cache_leeren)
+            warm = beste_zeit(alle, len(paare))
+        finally:
+            del os.environ["LADEMETER_NOMINATIM"]
+    return {"get_kilometer_von_orten_stub": kalt, "get_kilometer_von_orten_cache": warm}
+
+
+def bench_strassennetz(ordner):
+    import csv
+
+    from strassennetz import Strassennetz, strassennetz_importieren
+
+    daten = os.path.join(os.path.dirname(BENCHMARKS), "daten")
+    pfad = os.path.join(ordner, "strassennetz.npz")
+    strassennetz_importieren(os.path.join(daten, "strassennetz_knoten.csv"),
+                             os.path.join(daten, "strassennetz_kanten.csv"), pfad)
+    netz = Strassennetz(pfad)
+    with open(os.path.join(daten, "gazetteer_beispiel.csv"), encoding="utf-8") as datei:
+        orte = [(float(zeile["lat"]), float(zeile["lon"])) for zeile in csv.DictReader(datei, delimiter=";")]
+    paare = [(orte[i], orte[(i * 7 + 3) % len(orte)]) for i in range(len(orte))]
+
+    def einzeln():
+        for start, ziel in paare:
+            netz.entfernung(start, ziel)
+
+    return {
+        # Ohne gemerkte Relationen: jede Abfrage ist eine A*-Suche
+        "strassennetz_entfernung": beste_zeit(einzeln, len(paare), vorbereiten=netz.vergessen),
+        "strassennetz_matrix": beste_zeit(lambda: netz.matrix(orte, orte), 1, vorbereiten=netz.vergessen),
+    }
+
+
+def _xlsx_aus_xls(quelle, ziel):
+    """Gleichwertige .xlsx (alle Blätter, nur Werte) zur mitgelieferten .xls"""
+    import openpyxl
+    import xlrd
+
+    rb = xlrd.open_workbook(quelle)
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for sheet in rb.sheets():
+        ws = wb.create_sheet(sheet.name)
+        for row in range(sheet.nrows):
+            for col, wert in enumerate(sheet.row_values(row)):
+                if wert != "":
+                    ws.cell(row=row + 1, column=col + 1, value=wert)
+    wb.save(ziel)
+
+
+def _zyklus(pfad, zellen, nummer=0):
+    """Ein Speichervorgang wie "Alle Felder speichern" in Tab 2"""
+    from excel_bearbeitung import ExcelSitzung, index_to_cell
+
+    sitzung = ExcelSitzung(pfad)
+    for (row, col), text in zellen.items():
+        sitzung.vormerken(index_to_cell(row, col), f"{text} {nummer}")
+    sitzung.speichern()
+
+
+def bench_excel(ordner):
+    from au_auftraege import auftrag_zellen
+    from excel_bearbeitung import arbeitsmappen_freigeben
+
+    quellen = glob.glob(os.path.join(os.path.dirname(BENCHMARKS), "AU *.xls"))
+    if not quellen:
+        raise FileNotFoundError("Beispieldatei 'AU ... .xls' fehlt")
+    xls = os.path.join(ordner, "auftrag.xls")
+    shutil.copyfile(quellen[0], xls)
+    xlsx = os.path.join(ordner, "auftrag.xlsx")
+    _xlsx_aus_xls(quellen[0], xlsx)
+    zellen = auftrag_zellen(AU_AUFTRAG)
+
+    ergebnisse = {}
+    for name, pfad, anzahl in (("xls", xls, 20), ("xlsx", xlsx, 5)):
+        def zyklen():
+            for nummer in range(anzahl):
+                _zyklus(pfad, zellen, nummer)
+
+        # Erster Speichervorgang mit Laden der Datei, danach mit residenter Arbeitsmappe
+        ergebnisse[f"excel_{name}_erster"] = beste_zeit(lambda: _zyklus(pfad, zellen), 1,
+                                                        vorbereiten=arbeitsmappen_freigeben)
+        ergebnisse[f"excel_{name}_resident"] = beste_zeit(zyklen, anzahl, wiederholungen=3)
+    return ergebnisse
+
+
+def bench_archiv(ordner):
+    from auftragsarchiv import FELDER, Auftragsarchiv, _verbinden, auftrag_lesen
+
+    quellen = glob.glob(os.path.join(os.path.dirname(BENCHMARKS), "AU *.xls"))
+    if not quellen:
+        raise FileNotFoundError("Beispieldatei 'AU ... .xls' fehlt")
+    xlsx = os.path.join(ordner, "archiv.xlsx")
+    _xlsx_aus_xls(quellen[0], xlsx)
+
+    # Archiv mit 10.000 Aufträgen: Felder der Beispieldatei, Partner und Orte variiert
+    felder = auftrag_lesen(quellen[0])
+    rng = random.Random(42)
+    orte = ["38440 Wolfsburg", "55-300 Środa Śląska", "10115 Berlin", "80331 München", "00-001 Warszawa"]
+    pfad = os.path.join(ordner, "archiv.sqlite")
+    db = _verbinden(pfad)
+    zeilen = []
+    for nummer in range(10000):
+        auftrag = dict(felder, auftragsnr=f"AU {nummer}-2025", datum=f"2025-{nummer % 12 + 1:02d}-01",
+                       partner=f"Partner {nummer % 500}\n{rng.choice(orte)}", ids=f"Dispo {nummer}",
+                       ladestelle=f"Lager {nummer % 40}\n{rng.choice(orte)}",
+                       entladestelle=f"Werk {nummer % 25}\n{rng.choice(orte)}")
+        zeilen.append((f"{ordner}/AU {nummer}.xls", 0, 0, *(auftrag[name] for name in FELDER), None))
+    db.executemany(f"INSERT INTO auftraege VALUES ({', '.join('?' * (len(FELDER) + 4))})", zeilen)
+    db.commit()
+    db.close()
+    archiv = Auftragsarchiv(pfad)
+    suchen = ["partner 12", "wolfs", "werk 1 berlin", "dispo 77", "lager 3 środa", "tautliner"]
+
+    def suche():
+        for text in suchen:
+            archiv.suchen(text)
+
+    return {
+        # Eine Datei beim Archiv-Import (nur das Sheet "Rechnung")
+        "archiv_lesen_xls": beste_zeit(lambda: auftrag_lesen(quellen[0]), 1),
+        "archiv_lesen_xlsx": beste_zeit(lambda: auftrag_lesen(xlsx), 1),
+        "archiv_laden": beste_zeit(lambda: Auftragsarchiv(pfad), 1, wiederholungen=3),
+        "archiv_suche": beste_zeit(suche, len(suchen)),
+    }
+
+
+GRUPPEN = {
+    "berechnung": lambda ordner: bench_berechnung(),
+    "tarif": bench_tarif,
+    "zellen": lambda ordner: bench_zellen(),
+    "entfernung": bench_entfernung,
+    "strassennetz": bench_strassennetz,
+    "excel": bench_excel,
+    "archiv": bench_archiv,
+}
+
+
+def ausfuehren(gruppen):
+    ordner = tempfile.mkdtemp(prefix="lademeter_bench_")
+    # Orts-Cache und Gazetteer nicht aus dem Benutzerprofil verwenden
+    os.environ["LADEMETER_CACHE"] = os.path.join(ordner, "geocache.sqlite")
+    os.environ["LADEMETER_GAZETTEER"] = os.path.join(ordner, "gazetteer.sqlite")
+    os.environ["LADEMETER_STRASSENNETZ"] = os.path.join(ordner, "kein_strassennetz.npz")
+    os.environ["LADEMETER_TARIF"] = os.path.join(ordner, "kein_tarif.json")
+    os.environ["LADEMETER_ARCHIV"] = os.path.join(ordner, "auftragsarchiv.sqlite")
+    try:
+        return {gruppe: GRUPPEN[gruppe](ordner) for gruppe in gruppen}
+    finally:
+        shutil.rmtree(ordner, ignore_errors=True)
+
+
+def vergleichen(ergebnisse, baseline, schwelle):
+    """Zeilen für die Ausgabe und die Namen der regressierten Pfade"""
+    zeilen = []
+    regressionen = []
+    for name, sekunden in ergebnisse.items():
+        alt = baseline.get(name)
+        if alt:
+            faktor = sekunden / alt
+            markierung = "REGRESSION" if faktor > 1 + schwelle else ""
+            if markierung:
+                regressionen.append(name)
+            vergleich = f"{alt * 1e6:12.1f} µs  {(faktor - 1) * 100:+7.1f} %  {markierung}"
+        else:
+            vergleich = f"{'-':>15}"
+        zeilen.append(f"{name:<32} {sekunden * 1e6:12.1f} µs  {vergleich}")
+    return zeilen, regressionen
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baseline", default=STANDARD_BASELINE, help="Baseline-Datei (Standard: %(default)s)")
+    parser.add_argument("--baseline-speichern", action="store_true",
+                        help="Ergebnisse als neue Baseline speichern statt zu vergleichen")
+    parser.add_argument("--schwelle", type=float, default=STANDARD_SCHWELLE,
+                        help="Erlaubte Verlangsamung als Anteil (Standard: %(default)s = 50 %%)")
+    parser.add_argument("--nur", nargs="+", choices=list(GRUPPEN), help="Nur diese Gruppen messen")
+    args = parser.parse_args()
+
+    gruppen = ausfuehren(args.nur or list(GRUPPEN))
+    ergebnisse = {name: wert for werte in gruppen.values() for name, wert in werte.items()}
+
+    if args.baseline_speichern:
+        baseline = {}
+        if args.nur and os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as datei:
+                baseline = json.load(datei).get("ergebnisse", {})
+        baseline.update(ergebnisse)
+        with open(args.baseline, "w", encoding="utf-8") as datei:
+            json.dump({
+                "zeitpunkt": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "rechner": platform.platform(),
+                "python": platform.python_version(),
+                "einheit": "Sekunden je Aufruf",
+                "ergebnisse": {name: round(wert, 9) for name, wert in baseline.items()},
+            }, datei, ensure_ascii=False, indent=2)
+        for zeile in vergleichen(ergebnisse, {}, args.schwelle)[0]:
+            print(zeile)
+        print(f"Baseline gespeichert: {args.baseline}")
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as datei:
+            baseline = json.load(datei).get("ergebnisse", {})
+    else:
+        print(f"Keine Baseline unter {args.baseline} - nur Messung", file=sys.stderr)
+    zeilen, regressionen = vergleichen(ergebnisse, baseline, args.schwelle)
+    if regressionen:
+        # Einzelne Ausreißer sind häufig: betroffene Gruppen einmal nachmessen
+        nachmessen = [gruppe for gruppe, werte in gruppen.items() if set(werte) & set(regressionen)]
+        for werte in ausfuehren(nachmessen).values():
+            for name, wert in werte.items():
+                ergebnisse[name] = min(ergebnisse[name], wert)
+        zeilen, regressionen = vergleichen(ergebnisse, baseline, args.schwelle)
+    print(f"{'Pfad':<32} {'aktuell':>15}  {'Baseline':>15}  {'Änderung':>9}")
+    for zeile in zeilen:
+        print(zeile)
+    if regressionen:
+        print(f"{len(regressionen)} Pfad(e) mehr als {args.schwelle:.0%} langsamer als die Baseline: "
+              f"{', '.join(regressionen)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
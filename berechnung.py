@@ -0,0 +1,56 @@
+"""Lademeter- und Preisberechnung ohne GUI.
+
+Wird von der Oberfläche (Lademeter.py) und vom Kommandozeilen-Werkzeug
+(cli.py) gemeinsam verwendet.
+"""
+import math
+
+from beladung import STANDARD_LADERAUM, beladen
+from instrumentierung import gemessen
+from tarif import KM_PREISE, get_tarif
+
+# Ladefläche, auf die sich ein Lademeter bezieht (m)
+LADEBREITE = STANDARD_LADERAUM[1] / 100
+
+
+def verfuegbare_fahrzeuge():
+    """Fahrzeugtypen mit eigenem Preis im geltenden Tarif (Reihenfolge der Tarifdatei, der erste
+    ist der Standard); gilt der Tarif nur über "*" für alle, die bisherigen Fahrzeugtypen.
+    Wird bei jedem Aufruf ermittelt, damit eine geänderte Tarifdatei sofort gilt."""
+    return get_tarif().fahrzeuge or list(KM_PREISE)
+
+
+def palettengroesse_zerlegen(palettengroesse: str):
+    """'120x100x100' -> (120.0, 100.0, 100.0) in cm"""
+    teile = palettengroesse.lower().replace(" ", "").split("x")
+    if len(teile) != 3:
+        raise ValueError("Ungültiges Format. Bitte verwende das Format 'LxBxH' in cm.")
+    try:
+        laenge, breite, hoehe = float(teile[0]), float(teile[1]), float(teile[2])
+    except ValueError:
+        raise ValueError("Ungültiges Format. Bitte verwende das Format 'LxBxH' in cm.") from None
+    # Ausgeschrieben statt all(...): läuft bei jeder Berechnung, auch auf dem Cache-Pfad
+    if not (math.isfinite(laenge) and math.isfinite(breite) and math.isfinite(hoehe)):
+        raise ValueError("Die Palettenmaße müssen endliche Zahlen sein.")
+    return laenge, breite, hoehe
+
+
+@gemessen()
+def berechne_beladung(palettengroesse: str, menge: int, stapelbarkeit: int, fahrzeug: str = None):
+    """Anordnung der Sendung auf der Ladefläche (siehe beladung.beladen)"""
+    laenge_cm, breite_cm, hoehe_cm = palettengroesse_zerlegen(palettengroesse)
+    return beladen(laenge_cm, breite_cm, hoehe_cm, menge, stapelbarkeit, fahrzeug)
+
+
+@gemessen()
+def berechne_lademeter(palettengroesse: str, menge: int, stapelbarkeit: int, fahrzeug: str = None) -> float:
+    """Lademeter einer Sendung; wirft ValueError bei ungültiger Palettengröße
+    oder wenn die Palette nicht in den Laderaum passt"""
+    return berechne_beladung(palettengroesse, menge, stapelbarkeit, fahrzeug).lademeter
+
+
+@gemessen()
+def berechne_preis(kilometer: float, fahrzeug: str, lademeter: float = None, kunde: str = None) -> float:
+    """Preis nach dem geltenden Tarif (siehe tarif.py); ohne Lademeter für das ganze
+    Fahrzeug. Wirft ValueError, wenn der Tarif den Fahrzeugtyp nicht kennt."""
+    return round(get_tarif().preis(kilometer, fahrzeug, lademeter, kunde), 2)
@@ -0,0 +1,274 @@
+"""Kommandozeilen-Werkzeuge zum Lademeter-Tool (ohne Oberfläche).
+
+Beispiele:
+    python cli.py batch sendungen.csv -o ergebnis.csv
+    python cli.py batch export.xlsx --fahrzeug Tautliner
+    python cli.py au "AU Vorlage.xls" auftraege.csv -o ausgabe/
+    python cli.py matrix depots.txt kunden.txt -o matrix.csv
+    python cli.py gazetteer import daten/gazetteer_beispiel.csv
+    python cli.py strassennetz import daten/strassennetz_knoten.csv daten/strassennetz_kanten.csv
+    python cli.py strassennetz route "Środa Śląska" Wolfsburg
+    python cli.py archiv import "P:/Aufträge 2024" "P:/Aufträge 2025"
+    python cli.py archiv suche wolfsburg tautliner
+    python cli.py tarif daten/tarif_beispiel.json --km 100 450 --kunde "Muster GmbH"
+    python cli.py disposition sendungen_heute.csv -o fahrten.csv
+    python cli.py dienst --port 8765
+    python cli.py --messwerte messwerte.json batch sendungen.csv
+"""
+import argparse
+import os
+import sys
+
+from tarif import KM_PREISE
+
+
+def cmd_batch(args):
+    from batch import batch_berechnen
+    from tarif import get_tarif
+
+    if args.fahrzeug and not get_tarif().kennt(args.fahrzeug):
+        raise ValueError(f"Kein Tarif für Fahrzeugtyp '{args.fahrzeug}'")
+
+    ausgabe = args.ausgabe or os.path.splitext(args.eingabe)[0] + "_ergebnis.csv"
+
+    def fortschritt(zeilen):
+        print(f"\r{zeilen:,} Zeilen berechnet...", end="", file=sys.stderr, flush=True)
+
+    statistik = batch_berechnen(args.eingabe, ausgabe, standard_fahrzeug=args.fahrzeug,
+                                blockgroesse=args.blockgroesse, trennzeichen=args.trennzeichen,
+                                fortschritt=fortschritt)
+    zeilen_pro_s = statistik["zeilen"] / statistik["sekunden"] if statistik["sekunden"] else 0
+    print(f"\r{statistik['zeilen']:,} Zeilen in {statistik['sekunden']} s "
+          f"({zeilen_pro_s:,.0f} Zeilen/s), davon {statistik['fehlerhaft']:,} fehlerhaft -> {ausgabe}",
+          file=sys.stderr)
+    return 0
+
+
+def cmd_au(args):
+    import time
+    from au_auftraege import au_auftraege_erzeugen, manifest_lesen
+
+    beginn = time.perf_counter()
+    auftraege = manifest_lesen(args.manifest)
+    ergebnisse = au_auftraege_erzeugen(args.vorlage, auftraege, args.ausgabe, prozesse=args.prozesse,
+                                       ueberschreiben=args.ueberschreiben)
+    fehler = [(pfad, text) for pfad, text in ergebnisse if text]
+    for pfad, text in fehler:
+        print(f"Fehler bei {pfad}: {text}", file=sys.stderr)
+    print(f"{len(ergebnisse) - len(fehler)} von {len(ergebnisse)} Aufträgen in "
+          f"{time.perf_counter() - beginn:.2f} s nach {args.ausgabe} geschrieben", file=sys.stderr)
+    return 1 if fehler else 0
+
+
+def cmd_matrix(args):
+    import time
+    from entfernungsmatrix import entfernungsmatrix, matrix_speichern, orte_lesen
+
+    startorte = orte_lesen(args.startorte)
+    zielorte = orte_lesen(args.zielorte) if args.zielorte else startorte
+    beginn = time.perf_counter()
+    matrix, fehler = entfernungsmatrix(startorte, zielorte)
+    dauer = time.perf_counter() - beginn
+    for ort, text in fehler.items():
+        print(f"Nicht gefunden: {ort} ({text})", file=sys.stderr)
+    matrix_speichern(args.ausgabe, matrix, startorte, zielorte)
+    print(f"{matrix.shape[0]} x {matrix.shape[1]} Entfernungen in {dauer:.2f} s -> {args.ausgabe}", file=sys.stderr)
+    return 1 if fehler else 0
+
+
+def cmd_gazetteer(args):
+    from gazetteer import Gazetteer, gazetteer_importieren, standard_gazetteer_pfad
+
+    pfad = args.datenbank or standard_gazetteer_pfad()
+    if args.aktion == "import":
+        anzahl = gazetteer_importieren(args.werte, pfad, ersetzen=args.ersetzen)
+        print(f"{anzahl:,} Orte in {pfad}", file=sys.stderr)
+        return 0
+    gazetteer = Gazetteer(pfad)
+    text = " ".join(args.werte)
+    for anzeige, _ in gazetteer.vorschlaege(text, anzahl=20):
+        print(anzeige)
+    coords = gazetteer.suchen(text)
+    if coords:
+        print(f"-> {coords[0]:.4f}, {coords[1]:.4f}")
+    return 0
+
+
+def cmd_strassennetz(args):
+    from strassennetz import Strassennetz, standard_strassennetz_pfad, strassennetz_importieren
+
+    pfad = args.datei or standard_strassennetz_pfad()
+    if args.aktion == "import":
+        if len(args.werte) != 2:
+            raise ValueError("Für den Import werden eine Knoten- und eine Kanten-Datei benötigt.")
+        knoten, kanten = strassennetz_importieren(args.werte[0], args.werte[1], pfad)
+        print(f"{knoten:,} Knoten, {kanten:,} Kanten in {pfad}", file=sys.stderr)
+        return 0
+    from geocoding import geschaetzte_km, get_coords
+
+    if len(args.werte) != 2:
+        raise ValueError("Bitte Start- und Zielort angeben.")
+    if not os.path.exists(pfad):
+        raise ValueError(f"Kein Straßennetz unter {pfad} - zuerst importieren.")
+    start, ziel = get_coords(args.werte[0]), get_coords(args.werte[1])
+    km = Strassennetz(pfad).entfernung(start, ziel)
+    schaetzung = geschaetzte_km(start, ziel)
+    if km is None:
+        print(f"Keine Route im Straßennetz, geschätzt {schaetzung} km")
+        return 1
+    print(f"{km:.1f} km (Schätzung Luftlinie x 1,3: {schaetzung} km)")
+    return 0
+
+
+def cmd_archiv(args):
+    from auftragsarchiv import Auftragsarchiv, archiv_importieren, ort_aus_adresse, standard_archiv_pfad
+
+    pfad = args.datenbank or standard_archiv_pfad()
+    if args.aktion == "import":
+        def fortschritt(gelesen, gesamt):
+            print(f"\r{gelesen:,} von {gesamt:,} Dateien gelesen...", end="", file=sys.stderr, flush=True)
+
+        for ordner in args.werte:
+            statistik = archiv_importieren(ordner, pfad, prozesse=args.prozesse, fortschritt=fortschritt)
+            print(f"\r{ordner}: {statistik['gelesen']:,} Dateien gelesen, {statistik['unveraendert']:,} unverändert, "
+                  f"{statistik['entfernt']:,} entfernt, {statistik['fehler']:,} nicht lesbar "
+                  f"({statistik['sekunden']} s) -> {pfad}", file=sys.stderr)
+        return 0
+    archiv = Auftragsarchiv(pfad)
+    for auftrag in archiv.suchen(" ".join(args.werte), anzahl=20):
+        print(";".join([auftrag["datum"], auftrag["auftragsnr"], auftrag["partner"].split("\n")[0],
+                        ort_aus_adresse(auftrag["ladestelle"]), ort_aus_adresse(auftrag["entladestelle"]),
+                        auftrag["pfad"]]))
+    return 0
+
+
+def cmd_tarif(args):
+    from tarif import get_tarif, tarif_laden, tarif_status
+
+    tarif = tarif_laden(args.datei) if args.datei else get_tarif()
+    status = tarif.beschreibung() if args.datei else tarif_status()
+    print(f"{status['name']}: {status['fahrzeuge']} Fahrzeugtypen, {status['kunden']} Kundenkonditionen, "
+          f"Dieselzuschlag {status['dieselzuschlag_prozent']:g} %", file=sys.stderr)
+    if status.get("fehler"):
+        print(f"Tarifdatei ungültig, es gilt der zuvor geladene Tarif: {status['fehler']}", file=sys.stderr)
+    print(";".join(["fahrzeug"] + [f"{km:g} km" for km in args.km]))
+    for fahrzeug in tarif.fahrzeuge or list(KM_PREISE):
+        preise = [round(tarif.preis(km, fahrzeug, args.lademeter, args.kunde), 2) for km in args.km]
+        print(";".join([fahrzeug] + [f"{preis:.2f}" for preis in preise]))
+    return 0
+
+
+def cmd_disposition(args):
+    import time
+    from disposition import disponieren, fahrten_speichern, sendungen_lesen
+
+    sendungen = sendungen_lesen(args.sendungen)
+    beginn = time.perf_counter()
+    fahrten, nicht_disponiert = disponieren(sendungen, exakt_bis=args.exakt_bis)
+    dauer = time.perf_counter() - beginn
+    for sendung, grund in nicht_disponiert:
+        print(f"Nicht disponiert: {sendung.nummer} ({grund})", file=sys.stderr)
+    fahrten_speichern(args.ausgabe, fahrten)
+    print(f"{len(sendungen):,} Sendungen auf {len(fahrten):,} Fahrten, Kosten "
+          f"{sum(fahrt.kosten for fahrt in fahrten):,.2f} € ({dauer:.2f} s) -> {args.ausgabe}", file=sys.stderr)
+    return 1 if nicht_disponiert else 0
+
+
+def cmd_dienst(args):
+    from angebotsdienst import dienst_starten
+
+    return dienst_starten(args.host, args.port, max_parallel=args.parallel, timeout=args.timeout)
+
+
+def parser_erstellen():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Lademeter-Tool ohne Oberfläche")
+    parser.add_argument("--messwerte", help="Laufzeiten der heißen Pfade nach dem Lauf speichern (.json oder .csv)")
+    unter = parser.add_subparsers(dest="befehl", required=True)
+
+    p = unter.add_parser("batch", help="Lademeter und Preise für eine CSV/XLSX-Datei berechnen")
+    p.add_argument("eingabe", help="CSV- oder XLSX-Datei mit den Spalten palettengroesse, menge, "
+                                   "stapelbarkeit und kilometer oder startort/zielort (optional fahrzeug, kunde)")
+    p.add_argument("-o", "--ausgabe", help="Ausgabedatei (CSV), Standard: <eingabe>_ergebnis.csv")
+    p.add_argument("--fahrzeug", help="Fahrzeugtyp für Zeilen ohne Angabe (Standard: der erste Fahrzeugtyp "
+                                      "des geltenden Tarifs)")
+    p.add_argument("--blockgroesse", type=int, default=100_000, help="Zeilen pro Block (Standard: %(default)s)")
+    p.add_argument("--trennzeichen", default=";", help="Trennzeichen der Ausgabedatei (Standard: %(default)s)")
+    p.set_defaults(funktion=cmd_batch)
+
+    p = unter.add_parser("au", help="AU-Aufträge aus einer Vorlage und einer Auftragsliste erzeugen")
+    p.add_argument("vorlage", help="Vorlage (.xls oder .xlsx) mit dem Sheet 'Rechnung'")
+    p.add_argument("manifest", help="Auftragsliste (CSV oder JSON); Spalten: datei, partner, kennzeichen, "
+                                    "fahrer, ladestelle, e35, e36, entladestelle, e40, fahrzeug, ids "
+                                    "oder direkt Zellbezüge wie E14")
+    p.add_argument("-o", "--ausgabe", default="ausgabe", help="Ausgabeordner (Standard: %(default)s)")
+    p.add_argument("-j", "--prozesse", type=int, help="Anzahl Worker-Prozesse (Standard: Anzahl CPU-Kerne)")
+    p.add_argument("--ueberschreiben", action="store_true", help="Vorhandene Dateien überschreiben")
+    p.set_defaults(funktion=cmd_au)
+
+    p = unter.add_parser("matrix", help="Entfernungsmatrix (Straßen-km) zwischen zwei Ortslisten")
+    p.add_argument("startorte", help="Datei mit einem Ort je Zeile (bei CSV: erste Spalte)")
+    p.add_argument("zielorte", nargs="?", help="wie startorte; ohne Angabe jeder mit jedem")
+    p.add_argument("-o", "--ausgabe", default="matrix.csv", help=".csv oder .npy (Standard: %(default)s)")
+    p.set_defaults(funktion=cmd_matrix)
+
+    p = unter.add_parser("gazetteer", help="Lokales Ortsverzeichnis importieren oder durchsuchen")
+    p.add_argument("aktion", choices=["import", "suche"])
+    p.add_argument("werte", nargs="+", help="import: CSV- oder GeoNames-Dateien; suche: Suchtext")
+    p.add_argument("--datenbank", help="Gazetteer-Datei (Standard: neben dem Orts-Cache)")
+    p.add_argument("--ersetzen", action="store_true", help="Vorhandene Orte vor dem Import löschen")
+    p.set_defaults(funktion=cmd_gazetteer)
+
+    p = unter.add_parser("strassennetz", help="Offline-Straßennetz importieren oder eine Route berechnen")
+    p.add_argument("aktion", choices=["import", "route"])
+    p.add_argument("werte", nargs="+", help="import: Knoten- und Kanten-CSV; route: Start- und Zielort")
+    p.add_argument("--datei", help="Netzdatei (Standard: neben dem Orts-Cache)")
+    p.set_defaults(funktion=cmd_strassennetz)
+
+    p = unter.add_parser("archiv", help="Frühere AU-Aufträge ins Auftragsarchiv importieren oder durchsuchen")
+    p.add_argument("aktion", choices=["import", "suche"])
+    p.add_argument("werte", nargs="+", help="import: Ordner mit .xls/.xlsx-Aufträgen; suche: Suchtext")
+    p.add_argument("--datenbank", help="Archiv-Datei (Standard: neben dem Orts-Cache)")
+    p.add_argument("-j", "--prozesse", type=int, help="Anzahl Worker-Prozesse (Standard: Anzahl CPU-Kerne)")
+    p.set_defaults(funktion=cmd_archiv)
+
+    p = unter.add_parser("tarif", help="Tarifdatei prüfen und Preise je Fahrzeugtyp anzeigen")
+    p.add_argument("datei", nargs="?", help="Tarifdatei (Standard: der geltende Tarif, siehe LADEMETER_TARIF)")
+    p.add_argument("--km", type=float, nargs="+", default=[40, 100, 250, 500, 1000],
+                   help="Entfernungen für die Preistabelle (Standard: %(default)s)")
+    p.add_argument("--lademeter", type=float, help="Lademeter der Sendung (Standard: ganzes Fahrzeug)")
+    p.add_argument("--kunde", help="Kunde für Zu-/Abschläge")
+    p.set_defaults(funktion=cmd_tarif)
+
+    p = unter.add_parser("disposition", help="Sendungen eines Tages kostengünstig auf Fahrzeuge verteilen")
+    p.add_argument("sendungen", help="CSV mit den Spalten sendung, lademeter, gewicht, "
+                                     "relation oder startort/zielort und kilometer")
+    p.add_argument("-o", "--ausgabe", default="fahrten.csv", help="Ausgabedatei (Standard: %(default)s)")
+    p.add_argument("--exakt-bis", type=int, default=10,
+                   help="Relationen mit höchstens so vielen Sendungen exakt optimieren (Standard: %(default)s)")
+    p.set_defaults(funktion=cmd_disposition)
+
+    p = unter.add_parser("dienst", help="Lokalen Angebotsdienst (HTTP/JSON) starten")
+    p.add_argument("--host", default="127.0.0.1", help="Adresse (Standard: %(default)s, nur lokal erreichbar)")
+    p.add_argument("--port", type=int, default=8765, help="Port (Standard: %(default)s)")
+    p.add_argument("--parallel", type=int, default=256,
+                   help="Gleichzeitig bearbeitete Anfragen (Standard: %(default)s)")
+    p.add_argument("--timeout", type=float, default=15.0, help="Zeitlimit je Anfrage in s (Standard: %(default)s)")
+    p.set_defaults(funktion=cmd_dienst)
+    return parser
+
+
+def main(argv=None):
+    args = parser_erstellen().parse_args(argv)
+    try:
+        return args.funktion(args)
+    except (OSError, ValueError) as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.messwerte:
+            from instrumentierung import exportieren
+            exportieren(args.messwerte)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""Disposition: Sendungen eines Tages kostengünstig auf Fahrzeuge verteilen.
+
+Sendungen derselben Relation dürfen zusammen auf ein Fahrzeug, solange
+Lademeter und Nutzlast reichen. Eine Fahrt kostet so viel wie ein einzelner
+Auftrag mit diesem Fahrzeug (berechne_preis).
+
+Je Relation wird entweder exakt gerechnet (wenige Sendungen, Teilmengen-DP)
+oder heuristisch: Best-Fit-Decreasing, je Fahrzeugtyp als Größe neuer
+Fahrten einmal durchgerechnet; Fahrten werden zusammengelegt, wo das billiger
+ist, und einzelne Sendungen umgeladen, wenn dadurch ein kleineres Fahrzeug
+reicht. Jede Fahrt bekommt am Ende das günstigste passende Fahrzeug.
+"""
+import csv
+from typing import NamedTuple
+
+from beladung import LADERAEUME
+from berechnung import berechne_preis
+from tarif import get_tarif
+
+# Nutzlast in kg
+NUTZLASTEN = {
+    "Sprinter": 1000,
+    "Planensprinter": 1100,
+    "Klein LKW": 2500,
+    "7,5 Tonnen LKW": 2800,
+    "Tautliner": 24000,
+    "Mega": 24000,
+    "Jumbo": 24000,
+}
+# Bis zu so vielen Sendungen je Relation wird exakt optimiert
+EXAKT_BIS = 10
+_TOLERANZ = 1e-9
+
+
+class Fahrzeugtyp(NamedTuple):
+    name: str
+    lademeter: float   # Kapazität in Lademetern (bezogen auf 2,40 m Breite)
+    nutzlast: float    # kg
+
+
+class Sendung(NamedTuple):
+    nummer: str
+    lademeter: float
+    gewicht: float     # kg
+    relation: str      # z.B. "Wolfsburg - Poznań"
+    kilometer: float
+
+
+class Fahrt(NamedTuple):
+    fahrzeug: str
+    relation: str
+    kilometer: float
+    sendungen: tuple   # Sendungsnummern
+    lademeter: float
+    gewicht: float
+    kosten: float
+
+
+def fahrzeugtypen(nutzlasten=None):
+    """Fahrzeugtypen, für die der geltende Tarif einen Preis hat, mit Kapazitäten aus Laderaum
+    und Nutzlast"""
+    nutzlasten = nutzlasten or NUTZLASTEN
+    tarif = get_tarif()
+    typen = []
+    for name in LADERAEUME:
+        if name not in nutzlasten or not tarif.kennt(name):
+            continue
+        laenge, breite, _ = LADERAEUME[name]
+        # Schmale Laderäume fassen entsprechend weniger Lademeter
+        lademeter = round(laenge / 100 * min(breite, 240) / 240, 2)
+        typen.append(Fahrzeugtyp(name, lademeter, nutzlasten[name]))
+    return typen
+
+
+class _Relation:
+    """Kapazitäten und Preise aller Fahrzeugtypen für eine Relation"""
+
+    def __init__(self, typen, kilometer):
+        preise = {typ.name: berechne_preis(kilometer, typ.name) for typ in typen}
+        # günstigste zuerst, bei Gleichstand das kleinere Fahrzeug
+        self.typen = sorted(typen, key=lambda typ: (preise[typ.name], typ.lademeter, typ.nutzlast))
+        self.preise = preise
+        self.max_lademeter = max(typ.lademeter for typ in typen) + _TOLERANZ
+        self.max_nutzlast = max(typ.nutzlast for typ in typen) + _TOLERANZ
+
+    def guenstigstes(self, lademeter, gewicht):
+        """Günstigstes Fahrzeug für die Ladung oder None, wenn keines reicht"""
+        if lademeter > self.max_lademeter or gewicht > self.max_nutzlast:
+            return None
+        for typ in self.typen:
+            if lademeter <= typ.lademeter + _TOLERANZ and gewicht <= typ.nutzlast + _TOLERANZ:
+                return typ
+        return None
+
+    def kosten(self, lademeter, gewicht):
+        typ = self.guenstigstes(lademeter, gewicht)
+        return float("inf") if typ is None else self.preise[typ.name]
+
+
+def _exakt(sendungen, relation):
+    """Kostenminimale Aufteilung durch DP über alle Teilmengen (O(3^n), nur für kleine n)"""
+    n = len(sendungen)
+    voll = (1 << n) - 1
+    lademeter = [0.0] * (voll + 1)
+    gewicht = [0.0] * (voll + 1)
+    kosten = [0.0] * (voll + 1)
+    for menge in range(1, voll + 1):
+        bit = (menge & -menge).bit_length() - 1
+        rest = menge & (menge - 1)
+        lademeter[menge] = lademeter[rest] + sendungen[bit].lademeter
+        gewicht[menge] = gewicht[rest] + sendungen[bit].gewicht
+        kosten[menge] = relation.kosten(lademeter[menge], gewicht[menge])
+
+    beste = [0.0] + [float("inf")] * voll
+    wahl = [0] * (voll + 1)
+    for menge in range(1, voll + 1):
+        niedrigstes = menge & -menge
+        # Teilmengen, die die niedrigste Sendung enthalten - jede Aufteilung nur einmal
+        rest = menge ^ niedrigstes
+        teil = rest
+        while True:
+            fahrt = teil | niedrigstes
+            summe = kosten[fahrt] + beste[menge ^ fahrt]
+            if summe < beste[menge]:
+                beste[menge] = summe
+                wahl[menge] = fahrt
+            if teil == 0:
+                break
+            teil = (teil - 1) & rest
+
+    gruppen = []
+    menge = voll
+    while menge:
+        fahrt = wahl[menge]
+        gruppen.append([sendungen[i] for i in range(n) if fahrt >> i & 1])
+        menge ^= fahrt
+    return gruppen
+
+
+def _best_fit(reihenfolge, typ_start, relation):
+    """Best-Fit-Decreasing: neue Fahrten bekommen `typ_start` bzw. das größte Fahrzeug,
+    falls die Sendung darauf nicht passt"""
+    nach_groesse = sorted(relation.typen, key=lambda typ: (-typ.lademeter, -typ.nutzlast))
+    gruppen = []   # [frei_ldm, frei_kg, [Sendungen]]
+    for sendung in reihenfolge:
+        beste = None
+        for gruppe in gruppen:
+            if (sendung.lademeter <= gruppe[0] + _TOLERANZ and sendung.gewicht <= gruppe[1] + _TOLERANZ
+                    and (beste is None or gruppe[0] < beste[0])):
+                beste = gruppe
+        if beste is None:
+            typ = next(typ for typ in [typ_start] + nach_groesse
+                       if sendung.lademeter <= typ.lademeter + _TOLERANZ
+                       and sendung.gewicht <= typ.nutzlast + _TOLERANZ)
+            beste = [typ.lademeter, typ.nutzlast, []]
+            gruppen.append(beste)
+        beste[0] -= sendung.lademeter
+        beste[1] -= sendung.gewicht
+        beste[2].append(sendung)
+    return [gruppe[2] for gruppe in gruppen]
+
+
+def _gesamtkosten(gruppen, relation):
+    return sum(relation.kosten(sum(s.lademeter for s in g), sum(s.gewicht for s in g)) for g in gruppen)
+
+
+def _heuristisch(sendungen, relation):
+    """Best-Fit-Decreasing einmal je Fahrzeugtyp als Standardgröße neuer Fahrten;
+    die günstigste Lösung wird anschließend lokal verbessert"""
+    reihenfolge = sorted(sendungen, key=lambda s: -max(s.lademeter / relation.max_lademeter,
+                                                       s.gewicht / relation.max_nutzlast))
+    loesungen = [_zusammenlegen(_best_fit(reihenfolge, typ, relation), relation) for typ in relation.typen]
+    gruppen = min(loesungen, key=lambda gruppen: _gesamtkosten(gruppen, relation))
+    return _verschieben(gruppen, relation)
+
+
+def _zusammenlegen(gruppen, relation):
+    """Legt Fahrten zusammen, solange ein gemeinsames Fahrzeug billiger ist als beide einzeln"""
+    summen = [(sum(s.lademeter for s in g), sum(s.gewicht for s in g)) for g in gruppen]
+    kosten = [relation.kosten(*summe) for summe in summen]
+    verbessert = True
+    while verbessert:
+        verbessert = False
+        i = 0
+        while i < len(gruppen):
+            j = i + 1
+            while j < len(gruppen):
+                summe = (summen[i][0] + summen[j][0], summen[i][1] + summen[j][1])
+                gemeinsam = relation.kosten(*summe)
+                if gemeinsam < kosten[i] + kosten[j] - _TOLERANZ:
+                    gruppen[i] += gruppen.pop(j)
+                    summen[i] = summe
+                    summen.pop(j)
+                    kosten[i] = gemeinsam
+                    kosten.pop(j)
+                    verbessert = True
+                else:
+                    j += 1
+            i += 1
+    return gruppen
+
+
+def _verschieben(gruppen, relation, durchlaeufe=3):
+    """Verschiebt einzelne Sendungen in andere Fahrten, wenn das die Summe der Kosten senkt
+    (z.B. weil die abgebende Fahrt dadurch ein kleineres Fahrzeug braucht)"""
+    summen = [[sum(s.lademeter for s in g), sum(s.gewicht for s in g)] for g in gruppen]
+    kosten = [relation.kosten(*summe) for summe in summen]
+    for _ in range(durchlaeufe):
+        verbessert = False
+        for i, gruppe in enumerate(gruppen):
+            for sendung in list(gruppe):
+                ohne = relation.kosten(summen[i][0] - sendung.lademeter, summen[i][1] - sendung.gewicht) \
+                    if len(gruppe) > 1 else 0.0
+                ersparnis = kosten[i] - ohne
+                for j in range(len(gruppen)):
+                    if j == i or not gruppen[j]:
+                        continue
+                    mit = relation.kosten(summen[j][0] + sendung.lademeter, summen[j][1] + sendung.gewicht)
+                    if mit - kosten[j] < ersparnis - _TOLERANZ:
+                        gruppe.remove(sendung)
+                        gruppen[j].append(sendung)
+                        summen[i][0] -= sendung.lademeter
+                        summen[i][1] -= sendung.gewicht
+                        summen[j][0] += sendung.lademeter
+                        summen[j][1] += sendung.gewicht
+                        kosten[i], kosten[j] = ohne, mit
+                        verbessert = True
+                        break
+        if not verbessert:
+            break
+    return [gruppe for gruppe in gruppen if gruppe]
+
+
+def disponieren(sendungen, fahrzeuge=None, exakt_bis=EXAKT_BIS):
+    """Verteilt die Sendungen kostenminimal auf Fahrten.
+
+    Liefert (Fahrten, nicht disponierbare Sendungen als [(Sendung, Grund)]).
+    Sendungen, die auf kein einzelnes Fahrzeug passen, werden nicht geteilt,
+    sondern als nicht disponierbar gemeldet.
+    """
+    # Typen ohne Preis im geltenden Tarif kommen nicht in Frage
+    tarif = get_tarif()
+    typen = [typ for typ in (fahrzeuge or fahrzeugtypen()) if tarif.kennt(typ.name)]
+    if not typen:
+        raise ValueError("Keine Fahrzeugtypen mit Preis im geltenden Tarif angegeben.")
+    relationen = {}
+    for sendung in sendungen:
+        relationen.setdefault(sendung.relation, []).append(sendung)
+
+    fahrten = []
+    nicht_disponiert = []
+    for name, liste in relationen.items():
+        kilometer = max(s.kilometer for s in liste)
+        relation = _Relation(typen, kilometer)
+        passend = []
+        for sendung in liste:
+            if relation.guenstigstes(sendung.lademeter, sendung.gewicht) is None:
+                nicht_disponiert.append((sendung, "Passt auf kein einzelnes Fahrzeug"))
+            else:
+                passend.append(sendung)
+        if not passend:
+            continue
+        if len(passend) <= exakt_bis:
+            gruppen = _exakt(passend, relation)
+        else:
+            gruppen = _heuristisch(passend, relation)
+        for gruppe in gruppen:
+            lademeter = sum(s.lademeter for s in gruppe)
+            gewicht = sum(s.gewicht for s in gruppe)
+            typ = relation.guenstigstes(lademeter, gewicht)
+            fahrten.append(Fahrt(typ.name, name, kilometer, tuple(s.nummer for s in gruppe),
+                                 round(lademeter, 2), round(gewicht, 1), relation.preise[typ.name]))
+    return fahrten, nicht_disponiert
+
+
+def sendungen_lesen(pfad, entfernung=None):
+    """Liest Sendungen aus einer CSV-Datei.
+
+    Spalten: sendung, lademeter, gewicht sowie relation oder startort/zielort
+    und kilometer. Fehlen die Kilometer, wird `entfernung(start, ziel)` je
+    Relation einmal aufgerufen (Standard: get_kilometer_von_orten).
+    """
+    with open(pfad, newline="", encoding="utf-8-sig") as datei:
+        erste_zeile = datei.readline()
+        datei.seek(0)
+        trennzeichen = max(";,\t", key=erste_zeile.count)
+        zeilen = [{str(k).strip().lower(): (v or "").strip() for k, v in zeile.items() if k}
+                  for zeile in csv.DictReader(datei, delimiter=trennzeichen)]
+
+    kilometer_je_relation = {}
+    sendungen = []
+    for nummer, zeile in enumerate(zeilen, start=1):
+        start, ziel = zeile.get("startort", ""), zeile.get("zielort", "")
+        relation = zeile.get("relation") or f"{start} - {ziel}"
+        try:
+            lademeter = float(zeile.get("lademeter", "").replace(",", "."))
+            gewicht = float((zeile.get("gewicht") or "0").replace(",", "."))
+        except ValueError:
+            raise ValueError(f"Zeile {nummer + 1}: Lademeter oder Gewicht ungültig") from None
+        if zeile.get("kilometer"):
+            kilometer = float(zeile["kilometer"].replace(",", "."))
+        elif start and ziel:
+            if relation not in kilometer_je_relation:
+                if entfernung is None:
+                    from geocoding import get_kilometer_von_orten as entfernung
+                kilometer_je_relation[relation] = entfernung(start, ziel)
+            kilometer = kilometer_je_relation[relation]
+        else:
+            raise ValueError(f"Zeile {nummer + 1}: Bitte kilometer oder startort/zielort angeben")
+        sendungen.append(Sendung(zeile.get("sendung") or str(nummer), lademeter, gewicht, relation, kilometer))
+    return sendungen
+
+
+def fahrten_speichern(pfad, fahrten, trennzeichen=";"):
+    with open(pfad, "w", newline="", encoding="utf-8") as datei:
+        datei.write("\ufeff")  # BOM, damit Excel die Datei als UTF-8 erkennt
+        writer = csv.writer(datei, delimiter=trennzeichen)
+        writer.writerow(["fahrt", "fahrzeug", "relation", "kilometer", "sendungen", "lademeter", "gewicht", "kosten"])
+        for nummer, fahrt in enumerate(fahrten, start=1):
+            writer.writerow([nummer, fahrt.fahrzeug, fahrt.relation, fahrt.kilometer, ", ".join(fahrt.sendungen),
+                             fahrt.lademeter, fahrt.gewicht, fahrt.kosten])
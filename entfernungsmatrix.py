@@ -0,0 +1,97 @@
+"""Entfernungsmatrix Depots x Kunden (geschätzte Straßen-km).
+
+Jeder vorkommende Ort wird genau einmal geokodiert (über den Orts-Cache);
+die Schätzung (Luftlinie x Straßenfaktor) wird mit NumPy-Broadcasting in
+einem Schritt berechnet. Ist ein Straßennetz importiert, gelten wie in
+get_kilometer_von_orten die kürzesten Wege (ein Suchlauf je Startort).
+"""
+import csv
+
+import numpy as np
+
+from batch import runden
+from geocoding import ERDRADIUS_KM, STRASSEN_FAKTOR, get_coords, normalisiere_ort
+from strassennetz import get_strassennetz
+
+
+def haversine_matrix(start_coords, ziel_coords):
+    """Luftlinie in km zwischen allen Paaren; Eingaben sind (n, 2)- bzw. (m, 2)-Arrays [lat, lon]"""
+    start = np.radians(np.asarray(start_coords, dtype=float).reshape(-1, 2))
+    ziel = np.radians(np.asarray(ziel_coords, dtype=float).reshape(-1, 2))
+    lat1, lon1 = start[:, 0:1], start[:, 1:2]
+    lat2, lon2 = ziel[:, 0], ziel[:, 1]
+
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return ERDRADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+
+
+def strassen_km_matrix(start_coords, ziel_coords):
+    """Geschätzte Straßen-km (Luftlinie x Straßenfaktor, auf 0,1 km gerundet wie round() in
+    geocoding.geschaetzte_km - np.round weicht an Rundungsgrenzen ab)"""
+    return runden(haversine_matrix(start_coords, ziel_coords) * STRASSEN_FAKTOR, 1)
+
+
+def orte_geokodieren(orte, geocoder=get_coords):
+    """Geokodiert jeden (normalisierten) Ort nur einmal.
+
+    Liefert ein (n, 2)-Array in der Reihenfolge von `orte` (NaN für nicht
+    gefundene Orte) und ein Dict {Ort: Fehlertext} der Fehlschläge.
+    """
+    bekannt = {}
+    fehler = {}
+    coords = np.full((len(orte), 2), np.nan)
+    for i, ort in enumerate(orte):
+        schluessel = normalisiere_ort(ort)
+        if schluessel not in bekannt:
+            try:
+                bekannt[schluessel] = geocoder(ort)
+            except Exception as e:
+                bekannt[schluessel] = None
+                fehler[ort] = str(e)
+        if bekannt[schluessel] is not None:
+            coords[i] = bekannt[schluessel]
+    return coords, fehler
+
+
+def entfernungsmatrix(startorte, zielorte, geocoder=get_coords):
+    """Straßen-km-Matrix der Form (len(startorte), len(zielorte)) und Dict der nicht gefundenen Orte"""
+    coords, fehler = orte_geokodieren(list(startorte) + list(zielorte), geocoder)
+    n = len(startorte)
+    matrix = strassen_km_matrix(coords[:n], coords[n:])
+    netz = get_strassennetz()
+    if netz is not None:
+        zeilen = np.flatnonzero(~np.isnan(coords[:n, 0]))
+        spalten = np.flatnonzero(~np.isnan(coords[n:, 0]))
+        routen = runden(np.array([[np.nan if km is None else km for km in zeile]
+                                  for zeile in netz.matrix(coords[:n][zeilen].tolist(), coords[n:][spalten].tolist())],
+                                 dtype=float).reshape(len(zeilen), len(spalten)), 1)
+        # Abseits des Netzes bleibt es bei der Schätzung
+        bereich = np.ix_(zeilen, spalten)
+        matrix[bereich] = np.where(np.isnan(routen), matrix[bereich], routen)
+    return matrix, fehler
+
+
+def orte_lesen(pfad):
+    """Ein Ort je Zeile (bei CSV-Dateien die erste Spalte, leere Zeilen werden übersprungen)"""
+    with open(pfad, newline="", encoding="utf-8-sig") as datei:
+        if pfad.lower().endswith(".csv"):
+            erste_zeile = datei.readline()
+            datei.seek(0)
+            trennzeichen = ";" if erste_zeile.count(";") >= erste_zeile.count(",") else ","
+            return [zeile[0].strip() for zeile in csv.reader(datei, delimiter=trennzeichen)
+                    if zeile and zeile[0].strip()]
+        return [zeile.strip() for zeile in datei if zeile.strip()]
+
+
+def matrix_speichern(pfad, matrix, startorte, zielorte, trennzeichen=";"):
+    """Speichert als .npy (nur die Zahlen, Reihenfolge wie die Eingabe) oder als CSV mit Beschriftung"""
+    if pfad.lower().endswith(".npy"):
+        np.save(pfad, matrix)
+        return
+    with open(pfad, "w", newline="", encoding="utf-8") as datei:
+        datei.write("\ufeff")  # BOM, damit Excel die Datei als UTF-8 erkennt
+        writer = csv.writer(datei, delimiter=trennzeichen)
+        writer.writerow([""] + list(zielorte))
+        for ort, zeile in zip(startorte, matrix.tolist()):
+            writer.writerow([ort] + ["" if km != km else km for km in zeile])
@@ -0,0 +1,270 @@
+"""Schreibzugriffe auf Auftrags-Arbeitsmappen (.xls/.xlsx), Sheet "Rechnung".
+
+Eine `ExcelSitzung` sammelt beliebig viele Zellwerte im Speicher und
+schreibt sie anschließend mit genau einem Speichern der Arbeitsmappe zurück.
+
+Geöffnete Arbeitsmappen bleiben im Speicher (`_arbeitsmappen`) und werden
+nur neu eingelesen, wenn sich die Datei auf der Platte geändert hat
+(Änderungszeit oder Größe). Bei .xls-Dateien werden die Zellen direkt im
+BIFF-Stream ersetzt (siehe xls_zellen) - nur wo das nicht geht, wird die
+Mappe wie früher über xlrd/xlutils komplett neu geschrieben.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from instrumentierung import gemessen, messen, zaehlen
+
+# openpyxl, xlrd und xlutils werden erst beim Speichern importiert - sie
+# kosten zusammen einige hundert Millisekunden Startzeit.
+
+SHEET_NAME = "Rechnung"
+
+# Höchstzahl der im Speicher gehaltenen Arbeitsmappen
+MAX_ARBEITSMAPPEN = 4
+
+_arbeitsmappen = OrderedDict()   # Pfad -> ((mtime_ns, Größe), Arbeitsmappe)
+_arbeitsmappen_sperre = threading.Lock()
+
+# Felder eines AU-Auftrags, die Tab 2 befüllt: Name -> (Startzelle, max. Zeilen)
+AU_FELDER = {
+    "partner": ("E14", 6),        # E14 bis E19: Firma, Name, Adresse, PLZ, Ust-IdNr
+    "kennzeichen": ("D22", None),
+    "fahrer": ("J22", None),
+    "ladestelle": ("E31", None),
+    "e35": ("E35", None),
+    "e36": ("E36", None),
+    "entladestelle": ("E37", None),
+    "e40": ("E40", None),
+    "fahrzeug": ("K42", None),    # Fahrzeug/Paletten/Kilo
+    "ids": ("K51", None),         # IDs/Partner Dispo
+}
+
+
+def cell_to_index(cell_ref):
+    """Konvertiert Excel-Zellreferenz wie 'E14' zu (Zeile, Spalte) für xlrd/xlwt"""
+    match = re.match(r'([A-Z]+)(\d+)', cell_ref)
+    if not match:
+        return None
+    col_str, row_str = match.groups()
+
+    # Spalte berechnen (A=0, B=1, etc.)
+    col = 0
+    for char in col_str:
+        col = col * 26 + (ord(char) - ord('A')) + 1
+    col -= 1
+
+    # Zeile (1-basiert zu 0-basiert)
+    row = int(row_str) - 1
+
+    return (row, col)
+
+
+def index_to_cell(row, col):
+    """Gegenstück zu cell_to_index: (13, 4) -> 'E14'"""
+    col_str = ""
+    col += 1
+    while col:
+        col, rest = divmod(col - 1, 26)
+        col_str = chr(ord('A') + rest) + col_str
+    return f"{col_str}{row + 1}"
+
+
+def zeilen_aufteilen(wert, max_zeilen=None):
+    """Zerlegt einen (mehrzeiligen) Wert in die Texte der einzelnen Excel-Zeilen"""
+    # Prüfe ob mehrzeiliger Text - split nur bei echten Zeilenumbrüchen
+    if isinstance(wert, str):
+        zeilen = wert.split('\n')
+        # Entferne leere Zeilen am Ende
+        while zeilen and not zeilen[-1].strip():
+            zeilen.pop()
+    else:
+        zeilen = [str(wert)]
+
+    if not zeilen:
+        zeilen = ['']
+
+    if max_zeilen:
+        zeilen = zeilen[:max_zeilen]
+    return zeilen
+
+
+class ExcelSitzung:
+    """Vorgemerkte Schreibzugriffe auf eine Arbeitsmappe.
+
+    `vormerken()` legt Werte nur im Speicher ab; `speichern()` öffnet die
+    Datei einmal, schreibt alle Zellen und speichert sie einmal.
+    """
+
+    def __init__(self, pfad):
+        self.pfad = pfad
+        self._auftraege = OrderedDict()  # Startzelle -> Liste der Zeilentexte
+
+    def vormerken(self, zelle, wert, max_zeilen=None):
+        """Merkt einen Wert ab `zelle` vor und liefert die Anzahl der betroffenen Zeilen"""
+        if cell_to_index(zelle) is None:
+            raise ValueError(f"Ungültige Zelle: {zelle}")
+        zeilen = zeilen_aufteilen(wert, max_zeilen)
+        # Ein erneutes Vormerken derselben Startzelle ersetzt den alten Wert
+        self._auftraege.pop(zelle, None)
+        self._auftraege[zelle] = zeilen
+        return len(zeilen)
+
+    def verwerfen(self):
+        self._auftraege.clear()
+
+    def __len__(self):
+        return len(self._auftraege)
+
+    def zellen(self):
+        """Alle zu schreibenden Einzelzellen {(Zeile, Spalte): Text}, spätere Vormerkungen gewinnen"""
+        zellen = {}
+        for zelle, zeilen in self._auftraege.items():
+            start_row, col = cell_to_index(zelle)
+            for i, text in enumerate(zeilen):
+                zellen[(start_row + i, col)] = text
+        return zellen
+
+    def vorschau(self):
+        """Liste von (Startzelle, Zeilentexte) in der Reihenfolge des Vormerkens"""
+        return [(zelle, list(zeilen)) for zelle, zeilen in self._auftraege.items()]
+
+    @gemessen("excel.gesamt")
+    def speichern(self):
+        """Schreibt alle vorgemerkten Werte mit einem Laden/Speichern; liefert die Zahl der Zellen"""
+        zellen = self.zellen()
+        if self.pfad.lower().endswith('.xls'):
+            _xls_schreiben(self.pfad, zellen)
+        else:
+            _xlsx_schreiben(self.pfad, zellen)
+        self._auftraege.clear()
+        return len(zellen)
+
+
+def _kennung(pfad):
+    stat = os.stat(pfad)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _arbeitsmappe(pfad, laden):
+    """Die residente Arbeitsmappe zu `pfad`; neu geladen, wenn die Datei sich geändert hat"""
+    schluessel = os.path.abspath(pfad)
+    kennung = _kennung(pfad)
+    eintrag = _arbeitsmappen.get(schluessel)
+    if eintrag is not None and eintrag[0] == kennung:
+        _arbeitsmappen.move_to_end(schluessel)
+        zaehlen("excel.mappe_resident")
+        return eintrag[1]
+    zaehlen("excel.mappe_geladen")
+    mappe = laden(pfad)
+    _arbeitsmappe_merken(pfad, mappe, kennung)
+    return mappe
+
+
+def _arbeitsmappe_merken(pfad, mappe, kennung=None):
+    schluessel = os.path.abspath(pfad)
+    _arbeitsmappen[schluessel] = (kennung or _kennung(pfad), mappe)
+    _arbeitsmappen.move_to_end(schluessel)
+    while len(_arbeitsmappen) > MAX_ARBEITSMAPPEN:
+        _arbeitsmappen.popitem(last=False)
+
+
+def arbeitsmappen_freigeben(pfad=None):
+    """Vergisst die residente Arbeitsmappe zu `pfad` (ohne Pfad: alle)"""
+    with _arbeitsmappen_sperre:
+        if pfad is None:
+            _arbeitsmappen.clear()
+        else:
+            _arbeitsmappen.pop(os.path.abspath(pfad), None)
+
+
+def _xls_schreiben(pfad, zellen):
+    from xls_zellen import NichtPatchbar, XlsDatei
+
+    with _arbeitsmappen_sperre:
+        try:
+            with messen("excel.oeffnen"):
+                mappe = _arbeitsmappe(pfad, XlsDatei.lesen)
+            with messen("excel.blatt"):
+                if SHEET_NAME not in mappe.blattnamen():
+                    raise ValueError(f"Sheet '{SHEET_NAME}' nicht gefunden!")
+            # zellen_setzen ändert die Mappe erst, wenn alles geklappt hat
+            with messen("excel.schreiben"):
+                mappe.zellen_setzen(SHEET_NAME, zellen)
+        except NichtPatchbar:
+            _arbeitsmappen.pop(os.path.abspath(pfad), None)
+            zaehlen("excel.xlutils")
+            _xls_neu_schreiben(pfad, zellen)
+            return
+        try:
+            with messen("excel.speichern"):
+                mappe.speichern(pfad)
+        except BaseException:
+            _arbeitsmappen.pop(os.path.abspath(pfad), None)
+            raise
+        _arbeitsmappe_merken(pfad, mappe)
+
+
+def _xls_neu_schreiben(pfad, zellen):
+    # Alte .xls Datei mit xlrd/xlwt komplett neu schreiben
+    import xlrd
+    from xlutils.copy import copy as xl_copy
+
+    with messen("excel.oeffnen"):
+        rb = xlrd.open_workbook(pfad, formatting_info=True)
+        wb = xl_copy(rb)
+
+    # Suche nach Sheet "Rechnung"
+    with messen("excel.blatt"):
+        sheet_idx = None
+        for i in range(rb.nsheets):
+            if rb.sheet_by_index(i).name == SHEET_NAME:
+                sheet_idx = i
+                break
+
+        if sheet_idx is None:
+            raise ValueError(f"Sheet '{SHEET_NAME}' nicht gefunden!")
+
+    with messen("excel.schreiben"):
+        ws = wb.get_sheet(sheet_idx)
+        for (row, col), text in zellen.items():
+            ws.write(row, col, text)
+
+    with messen("excel.speichern"):
+        wb.save(pfad)
+
+
+def _xlsx_schreiben(pfad, zellen):
+    # Neue .xlsx Datei mit openpyxl; die geladene Mappe bleibt im Speicher
+    import openpyxl
+
+    with _arbeitsmappen_sperre:
+        with messen("excel.oeffnen"):
+            wb = _arbeitsmappe(pfad, openpyxl.load_workbook)
+
+        # Suche nach Sheet "Rechnung"
+        with messen("excel.blatt"):
+            if SHEET_NAME not in wb.sheetnames:
+                raise ValueError(f"Sheet '{SHEET_NAME}' nicht gefunden!")
+            ws = wb[SHEET_NAME]
+
+        try:
+            with messen("excel.schreiben"):
+                for (row, col), text in zellen.items():
+                    ws.cell(row=row + 1, column=col + 1, value=text)
+            with messen("excel.speichern"):
+                wb.save(pfad)
+        except BaseException:
+            # Die Mappe im Speicher kann halb geänderte Zellen enthalten: nicht weiterverwenden
+            _arbeitsmappen.pop(os.path.abspath(pfad), None)
+            raise
+        _arbeitsmappe_merken(pfad, wb)
+
+
+def zellen_schreiben(pfad, zelle, wert, max_zeilen=None):
+    """Schreibt einen einzelnen (mehrzeiligen) Wert sofort; liefert die Anzahl geschriebener Zeilen"""
+    sitzung = ExcelSitzung(pfad)
+    zeilen = sitzung.vormerken(zelle, wert, max_zeilen)
+    sitzung.speichern()
+    return zeilen
@@ -0,0 +1,218 @@
+"""Lokales Ortsverzeichnis (Gazetteer) für Autovervollständigung und Offline-Geocoding.
+
+Orte mit Postleitzahl, Land und Koordinaten werden einmalig in eine
+SQLite-Datei importiert. Beim ersten Zugriff wird daraus ein sortierter
+Präfix-Index im Speicher aufgebaut; Vorschläge sind dann eine binäre Suche
+(bisect) und brauchen nur Mikrosekunden.
+
+Importierbar sind einfache CSV-Dateien (name;plz;land;lat;lon[;einwohner])
+und die Postleitzahl-Dateien von GeoNames (z.B. DE.txt, PL.txt aus
+https://download.geonames.org/export/zip/).
+"""
+import csv
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from geocoding import luftlinie_km, normalisiere_ort, standard_cache_pfad
+
+# Buchstaben, die Unicode nicht in Grundbuchstabe + Akzent zerlegt
+_ERSATZ = str.maketrans({"ł": "l", "ø": "o", "đ": "d", "æ": "ae", "œ": "oe"})
+
+# Gleichnamige Orte weiter auseinander (oder in einem anderen Land) gelten als verschiedene Orte
+MEHRDEUTIG_KM = 30.0
+
+_PLZ_ORT = re.compile(r"^(?:([a-z]{2})[ -]+)?(\d{2}-?\d{3}|\d{3} ?\d{2}|\d{4,5})\s+(.+)$")
+
+
+def falten(text):
+    """Suchschlüssel: normalisiert und ohne Akzente ('Środa Śląska' -> 'sroda slaska')"""
+    text = unicodedata.normalize("NFKD", normalisiere_ort(text).translate(_ERSATZ))
+    return "".join(zeichen for zeichen in text if not unicodedata.combining(zeichen))
+
+
+def plz_normalisieren(plz):
+    return re.sub(r"[\s-]", "", str(plz or ""))
+
+
+def standard_gazetteer_pfad():
+    """Pfad der Gazetteer-Datei (überschreibbar über LADEMETER_GAZETTEER)"""
+    return os.environ.get("LADEMETER_GAZETTEER") or os.path.join(
+        os.path.dirname(standard_cache_pfad()), "gazetteer.sqlite")
+
+
+def _quelle_lesen(pfad):
+    """Liefert Tupel (name, plz, land, lat, lon, einwohner) aus CSV oder GeoNames-Datei"""
+    with open(pfad, newline="", encoding="utf-8-sig") as datei:
+        erste_zeile = datei.readline()
+        datei.seek(0)
+        if erste_zeile.count("\t") >= 9:
+            # GeoNames-Postleitzahlen: Land, PLZ, Ort, 6 Verwaltungsspalten, lat, lon, Genauigkeit
+            for zeile in csv.reader(datei, delimiter="\t", quoting=csv.QUOTE_NONE):
+                if len(zeile) >= 11 and zeile[9] and zeile[10]:
+                    yield zeile[2], zeile[1], zeile[0], float(zeile[9]), float(zeile[10]), 0
+            return
+        trennzeichen = ";" if erste_zeile.count(";") >= erste_zeile.count(",") else ","
+        for zeile in csv.DictReader(datei, delimiter=trennzeichen):
+            zeile = {str(k).strip().lower(): (v or "").strip() for k, v in zeile.items() if k}
+            if not zeile.get("name") or not zeile.get("lat") or not zeile.get("lon"):
+                continue
+            yield (zeile["name"], zeile.get("plz", ""), zeile.get("land", "").upper(),
+                   float(zeile["lat"]), float(zeile["lon"]), int(zeile.get("einwohner") or 0))
+
+
+def gazetteer_importieren(quellen, pfad=None, ersetzen=False):
+    """Importiert eine oder mehrere Quelldateien und liefert die Anzahl der Orte in der Datenbank"""
+    pfad = pfad or standard_gazetteer_pfad()
+    os.makedirs(os.path.dirname(os.path.abspath(pfad)), exist_ok=True)
+    db = sqlite3.connect(pfad)
+    try:
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS orte ("
+            "name TEXT NOT NULL, plz TEXT NOT NULL, land TEXT NOT NULL, "
+            "lat REAL NOT NULL, lon REAL NOT NULL, einwohner INTEGER NOT NULL, "
+            "UNIQUE (name, plz, land))"
+        )
+        if ersetzen:
+            db.execute("DELETE FROM orte")
+        for quelle in quellen:
+            db.executemany("INSERT OR REPLACE INTO orte VALUES (?, ?, ?, ?, ?, ?)", _quelle_lesen(quelle))
+        db.commit()
+        return db.execute("SELECT COUNT(*) FROM orte").fetchone()[0]
+    finally:
+        db.close()
+
+
+class Gazetteer:
+    """Präfix-Index über alle Orte der Gazetteer-Datei (wird komplett im Speicher gehalten)"""
+
+    def __init__(self, pfad=None):
+        self.pfad = pfad or standard_gazetteer_pfad()
+        self._orte = []        # (name, plz, land, lat, lon, einwohner)
+        self._schluessel = []  # sortierte Suchschlüssel
+        self._verweise = []    # Index in _orte je Suchschlüssel
+        self._namen = {}       # gefalteter Name -> [Indizes]
+        self._plz = {}         # normalisierte PLZ -> [Indizes]
+        self._mehrdeutige = {}  # gefalteter Name -> mehrdeutig? (bei der ersten Suche ermittelt)
+        if os.path.exists(self.pfad):
+            self._laden()
+
+    def _laden(self):
+        db = sqlite3.connect(self.pfad)
+        try:
+            self._orte = db.execute("SELECT name, plz, land, lat, lon, einwohner FROM orte").fetchall()
+        except sqlite3.Error:
+            self._orte = []
+        finally:
+            db.close()
+        eintraege = []
+        for i, (name, plz, _, _, _, _) in enumerate(self._orte):
+            name_f = falten(name)
+            plz_n = plz_normalisieren(plz)
+            self._namen.setdefault(name_f, []).append(i)
+            eintraege.append((name_f, i))
+            if plz_n:
+                self._plz.setdefault(plz_n, []).append(i)
+                eintraege.append((f"{plz_n} {name_f}", i))
+        eintraege.sort()
+        self._schluessel = [schluessel for schluessel, _ in eintraege]
+        self._verweise = [i for _, i in eintraege]
+
+    def __len__(self):
+        return len(self._orte)
+
+    def _groesster(self, indizes, land=None, plz=None):
+        kandidaten = [i for i in indizes
+                      if (not land or self._orte[i][2].lower() == land)
+                      and (not plz or plz_normalisieren(self._orte[i][1]) == plz)]
+        if not kandidaten:
+            return None
+        return max(kandidaten, key=lambda i: self._orte[i][5])
+
+    def _mehrdeutig(self, indizes, treffer):
+        """True, wenn es unter dem Namen mehrere Orte gibt (nicht nur mehrere PLZ desselben Ortes)"""
+        _, _, land, lat, lon, _ = self._orte[treffer]
+        return any(self._orte[i][2] != land or luftlinie_km((lat, lon), self._orte[i][3:5]) > MEHRDEUTIG_KM
+                   for i in indizes)
+
+    def suchen(self, text):
+        """Exakte Auflösung eines Ortes ('Wolfsburg', '55-300 Środa Śląska', 'PL 55-300 ...', '38440');
+        liefert [lat, lon] oder None. Ein Name ohne PLZ, den mehrere Orte tragen ('Neustadt'),
+        bleibt unaufgelöst - sonst stünde stillschweigend die Entfernung zum größten davon da."""
+        if not self._orte:
+            return None
+        gefaltet = falten(text)
+        treffer = None
+        if gefaltet in self._namen:
+            treffer = self._groesster(self._namen[gefaltet])
+            if gefaltet not in self._mehrdeutige:
+                self._mehrdeutige[gefaltet] = self._mehrdeutig(self._namen[gefaltet], treffer)
+            if self._mehrdeutige[gefaltet]:
+                return None
+        if treffer is None:
+            passung = _PLZ_ORT.match(gefaltet)
+            if passung:
+                land, plz, name = passung.groups()
+                plz = plz_normalisieren(plz)
+                treffer = self._groesster(self._namen.get(name, []), land, plz)
+                if treffer is None:
+                    treffer = self._groesster(self._plz.get(plz, []), land)
+        if treffer is None and "," in gefaltet:
+            return self.suchen(gefaltet.split(",")[0])
+        if treffer is None and plz_normalisieren(gefaltet).isdigit():
+            treffer = self._groesster(self._plz.get(plz_normalisieren(gefaltet), []))
+        if treffer is None:
+            return None
+        return [self._orte[treffer][3], self._orte[treffer][4]]
+
+    def vorschlaege(self, text, anzahl=8, kandidaten=200):
+        """Orte, deren Name oder PLZ mit `text` beginnt, größte zuerst: [(Anzeige, Eingabetext), ...]"""
+        praefix = falten(text)
+        if not praefix or not self._schluessel:
+            return []
+        # "55-300 sro" -> "55300 sro" wie im Index
+        praefix = re.sub(r"^\d[\d -]*\d", lambda passung: plz_normalisieren(passung.group()), praefix)
+        gefunden = []
+        gesehen = set()
+        i = bisect_left(self._schluessel, praefix)
+        while i < len(self._schluessel) and len(gefunden) < kandidaten:
+            if not self._schluessel[i].startswith(praefix):
+                break
+            ort = self._verweise[i]
+            if ort not in gesehen:
+                gesehen.add(ort)
+                gefunden.append(ort)
+            i += 1
+        gefunden.sort(key=lambda ort: -self._orte[ort][5])
+        ergebnis = []
+        for ort in gefunden[:anzahl]:
+            name, plz, land = self._orte[ort][:3]
+            anzeige = f"{name} ({plz}, {land})" if plz else f"{name} ({land})"
+            ergebnis.append((anzeige, f"{plz} {name}" if plz else name))
+        return ergebnis
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Gemeinsamer Gazetteer des Programms (wird beim ersten Zugriff aufgebaut)"""
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            _gazetteer = Gazetteer()
+        return _gazetteer
+
+
+def gazetteer_bereit():
+    """True, sobald der Index aufgebaut ist (ohne darauf zu warten)"""
+    return _gazetteer is not None
+
+
+def gazetteer_vorladen():
+    """Baut den Index im Hintergrund auf, damit der erste Tastendruck nicht wartet"""
+    threading.Thread(target=get_gazetteer, name="Gazetteer", daemon=True).start()
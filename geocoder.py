@@ -0,0 +1,212 @@
+"""HTTP-Client für den Nominatim-Suchdienst (oder einen kompatiblen eigenen Server).
+
+- hält Keep-Alive-Verbindungen offen und verwendet sie wieder (statt je Abfrage
+  eine neue HTTPS-Verbindung aufzubauen)
+- begrenzt die Abfragerate mit einem Token-Bucket; der öffentliche Server
+  erlaubt laut Nutzungsrichtlinie höchstens eine Abfrage je Sekunde
+- legt gleichzeitige Abfragen nach demselben Ort zu einer zusammen
+- wiederholt Abfragen bei Netzwerkfehlern, 429 und 5xx mit exponentiell
+  wachsender Wartezeit (Retry-After wird beachtet)
+
+Konfiguration über Umgebungsvariablen:
+    LADEMETER_NOMINATIM       Such-Endpunkt, z.B. http://localhost:8080/search
+    LADEMETER_NOMINATIM_RATE  Abfragen je Sekunde (0 = unbegrenzt); Standard:
+                              1 für den öffentlichen Server, sonst unbegrenzt
+"""
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.parse import quote, urlsplit
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+OEFFENTLICHE_RATE = 1.0     # Abfragen je Sekunde beim öffentlichen Server
+TIMEOUT = 10                # Sekunden je Versuch
+VERSUCHE = 4                # erster Versuch + 3 Wiederholungen
+WARTEZEIT = 0.5             # Sekunden vor der ersten Wiederholung, danach verdoppelt
+MAX_VERBINDUNGEN = 4
+USER_AGENT = "Lademeter-Tool/1.0"
+
+_ssl_context = None
+
+
+def _get_ssl_context():
+    global _ssl_context
+    if _ssl_context is None:
+        import ssl
+
+        # SSL-Context für macOS erstellen
+        _ssl_context = ssl.create_default_context()
+        _ssl_context.check_hostname = False
+        _ssl_context.verify_mode = ssl.CERT_NONE
+    return _ssl_context
+
+
+class _Wiederholen(Exception):
+    """Vorübergehender Fehler (429/5xx); `warten` aus Retry-After oder None"""
+
+    def __init__(self, meldung, warten=None):
+        super().__init__(meldung)
+        self.warten = warten
+
+
+class TokenBucket:
+    """Ratenbegrenzung: `rate` Abfragen je Sekunde, höchstens `vorrat` auf einmal"""
+
+    def __init__(self, rate, vorrat=1):
+        self.rate = rate
+        self.vorrat = vorrat
+        self._token = float(vorrat)
+        self._stand = time.monotonic()
+        self._sperre = threading.Lock()
+
+    def nehmen(self):
+        """Wartet, bis ein Token frei ist; liefert die Wartezeit in Sekunden"""
+        if not self.rate:
+            return 0.0
+        with self._sperre:
+            jetzt = time.monotonic()
+            self._token = min(self.vorrat, self._token + (jetzt - self._stand) * self.rate)
+            self._stand = jetzt
+            # Das Token wird sofort reserviert; Wartende reihen sich dahinter ein
+            self._token -= 1
+            warten = -self._token / self.rate if self._token < 0 else 0.0
+        if warten:
+            time.sleep(warten)
+        return warten
+
+
+class Geocoder:
+    """Thread-sicherer Client für einen Nominatim-kompatiblen Such-Endpunkt"""
+
+    def __init__(self, url=None, rate=None, timeout=TIMEOUT, versuche=VERSUCHE, wartezeit=WARTEZEIT,
+                 max_verbindungen=MAX_VERBINDUNGEN):
+        self.url = url or os.environ.get("LADEMETER_NOMINATIM") or NOMINATIM_URL
+        teile = urlsplit(self.url)
+        if teile.scheme not in ("http", "https") or not teile.hostname:
+            raise ValueError(f"Ungültiger Geocoding-Endpunkt: {self.url}")
+        self._https = teile.scheme == "https"
+        self._host = teile.hostname
+        self._port = teile.port
+        self._pfad = teile.path or "/search"
+        if rate is None:
+            umgebung = os.environ.get("LADEMETER_NOMINATIM_RATE")
+            if umgebung:
+                rate = float(umgebung)
+            else:
+                rate = OEFFENTLICHE_RATE if self._host == urlsplit(NOMINATIM_URL).hostname else 0.0
+        self.bucket = TokenBucket(rate)
+        self.timeout = timeout
+        self.versuche = versuche
+        self.wartezeit = wartezeit
+        self.abfragen = 0            # tatsächlich gesendete HTTP-Anfragen
+        self.zusammengelegt = 0      # Abfragen, die auf eine laufende gleiche Abfrage gewartet haben
+        self.verbindungen = 0        # aufgebaute Verbindungen
+        self._frei = []              # ungenutzte Keep-Alive-Verbindungen
+        self._plaetze = threading.BoundedSemaphore(max_verbindungen)
+        self._sperre = threading.Lock()
+        self._laufend = {}           # Suchtext -> Future
+
+    def suchen(self, ort):
+        """[lat, lon] für einen Ort; ValueError, wenn der Ort nicht gefunden wird"""
+        schluessel = " ".join(ort.split()).casefold()
+        with self._sperre:
+            laufend = self._laufend.get(schluessel)
+            eigene = laufend is None
+            if eigene:
+                laufend = self._laufend[schluessel] = Future()
+            else:
+                self.zusammengelegt += 1
+        if not eigene:
+            return list(laufend.result())
+        try:
+            ergebnis = self._mit_wiederholung(ort)
+            laufend.set_result(ergebnis)
+            return list(ergebnis)
+        except BaseException as e:
+            laufend.set_exception(e)
+            raise
+        finally:
+            with self._sperre:
+                del self._laufend[schluessel]
+
+    def _mit_wiederholung(self, ort):
+        for versuch in range(self.versuche):
+            try:
+                return self._abfragen(ort)
+            except (_Wiederholen, OSError, HTTPException) as e:
+                if versuch + 1 >= self.versuche:
+                    if isinstance(e, OSError):
+                        raise
+                    raise OSError(f"Geocoding-Dienst antwortet nicht: {e}") from e
+                warten = getattr(e, "warten", None)
+                if warten is None:
+                    warten = self.wartezeit * 2 ** versuch * random.uniform(0.8, 1.2)
+                time.sleep(warten)
+
+    def _abfragen(self, ort):
+        self.bucket.nehmen()
+        anfrage = f"{self._pfad}?q={quote(ort)}&format=json&limit=1"
+        with self._plaetze:
+            verbindung, wiederverwendet = self._verbindung()
+            try:
+                antwort, inhalt = self._senden(verbindung, anfrage)
+            except (ConnectionError, HTTPException):
+                verbindung.close()
+                if not wiederverwendet:
+                    raise
+                # Der Server hat die ruhende Keep-Alive-Verbindung inzwischen geschlossen
+                verbindung, _ = self._verbindung(neu=True)
+                try:
+                    antwort, inhalt = self._senden(verbindung, anfrage)
+                except BaseException:
+                    verbindung.close()
+                    raise
+            except BaseException:
+                verbindung.close()
+                raise
+            with self._sperre:
+                self.abfragen += 1
+                if antwort.will_close:
+                    verbindung.close()
+                else:
+                    self._frei.append(verbindung)
+        if antwort.status == 429 or antwort.status >= 500:
+            retry_after = antwort.getheader("Retry-After")
+            raise _Wiederholen(f"HTTP {antwort.status}",
+                               float(retry_after) if retry_after and retry_after.isdigit() else None)
+        if antwort.status != 200:
+            raise OSError(f"Geocoding-Dienst meldet HTTP {antwort.status}")
+        daten = json.loads(inhalt.decode("utf-8"))
+        if not daten:
+            raise ValueError(f"Ort '{ort}' nicht gefunden")
+        return float(daten[0]["lat"]), float(daten[0]["lon"])
+
+    @staticmethod
+    def _senden(verbindung, anfrage):
+        verbindung.request("GET", anfrage, headers={"User-Agent": USER_AGENT, "Accept": "application/json"})
+        antwort = verbindung.getresponse()
+        return antwort, antwort.read()
+
+    def _verbindung(self, neu=False):
+        """(Verbindung, wiederverwendet)"""
+        with self._sperre:
+            if self._frei and not neu:
+                return self._frei.pop(), True
+            self.verbindungen += 1
+        if self._https:
+            return HTTPSConnection(self._host, self._port, timeout=self.timeout, context=_get_ssl_context()), False
+        return HTTPConnection(self._host, self._port, timeout=self.timeout), False
+
+    def schliessen(self):
+        with self._sperre:
+            frei, self._frei = self._frei, []
+        for verbindung in frei:
+            verbindung.close()
+
+    def statistik(self):
+        return {"abfragen": self.abfragen, "zusammengelegt": self.zusammengelegt,
+                "verbindungen": self.verbindungen, "rate": self.bucket.rate}
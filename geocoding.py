@@ -0,0 +1,295 @@
+"""Geocoding und Entfernungsberechnung mit persistentem Koordinaten-Cache.
+
+Koordinaten werden unter einem normalisierten Ortsnamen in einer lokalen
+SQLite-Datei gespeichert. Beim Start wird der Cache vollständig in den
+Speicher geladen, sodass bereits bekannte Relationen ohne Netzwerk und in
+Bruchteilen einer Millisekunde aufgelöst werden.
+"""
+import atexit
+import math
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from instrumentierung import gemessen, zaehlen
+
+# Gültigkeit eines Cache-Eintrags (Sekunden) und maximale Anzahl Orte
+CACHE_TTL = 90 * 24 * 3600
+CACHE_MAX_EINTRAEGE = 5000
+
+# Faktor für Straßenentfernung (ca. 1.3x Luftlinie), falls kein Straßennetz importiert ist
+STRASSEN_FAKTOR = 1.3
+
+# Erdradius in km
+ERDRADIUS_KM = 6371
+
+
+def normalisiere_ort(ort):
+    """Erzeugt den Cache-Schlüssel: Unicode-normalisiert, kleingeschrieben, Leerzeichen vereinheitlicht"""
+    ort = unicodedata.normalize("NFKC", ort).casefold()
+    teile = (" ".join(teil.split()) for teil in ort.split(","))
+    return ", ".join(teil for teil in teile if teil)
+
+
+def standard_cache_pfad():
+    """Pfad der Cache-Datei (überschreibbar über die Umgebungsvariable LADEMETER_CACHE)"""
+    pfad = os.environ.get("LADEMETER_CACHE")
+    if pfad:
+        return pfad
+    basis = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(basis, "Lademeter", "geocache.sqlite")
+
+
+class GeoCache:
+    """Persistenter Koordinaten-Cache mit TTL und LRU-Verdrängung.
+
+    Alle Einträge liegen zusätzlich in einem OrderedDict im Speicher; die
+    SQLite-Datei dient nur der Persistenz zwischen zwei Programmstarts.
+    Geschrieben wird sie unter einer eigenen Sperre, nie unter der des
+    Speichers: get() wartet so nie auf die Platte (wichtig für die
+    Ereignisschleife des Angebotsdienstes).
+    """
+
+    def __init__(self, pfad=None, ttl=CACHE_TTL, max_eintraege=CACHE_MAX_EINTRAEGE):
+        self.pfad = pfad or standard_cache_pfad()
+        self.ttl = ttl
+        self.max_eintraege = max_eintraege
+        self.treffer = 0
+        self.fehlversuche = 0
+        self._eintraege = OrderedDict()  # schluessel -> (lat, lon, gespeichert)
+        self._genutzt = {}  # schluessel -> Zeitpunkt der letzten Nutzung, noch nicht gesichert
+        self._lock = threading.Lock()      # Speicher (_eintraege, _genutzt, Zähler)
+        self._db_lock = threading.Lock()   # SQLite-Verbindung
+        self._db = None
+        try:
+            if self.pfad != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.pfad)), exist_ok=True)
+            self._db = sqlite3.connect(self.pfad, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS orte ("
+                "schluessel TEXT PRIMARY KEY, lat REAL NOT NULL, lon REAL NOT NULL, "
+                "gespeichert REAL NOT NULL, zuletzt_genutzt REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._laden()
+        except sqlite3.Error:
+            # Ohne beschreibbare Cache-Datei arbeitet der Cache nur im Speicher
+            self._db = None
+
+    def _laden(self):
+        """Wärmt den Speicher-Cache aus der Datei auf (älteste Nutzung zuerst)"""
+        grenze = time.time() - self.ttl
+        self._db.execute("DELETE FROM orte WHERE gespeichert < ?", (grenze,))
+        zeilen = self._db.execute(
+            "SELECT schluessel, lat, lon, gespeichert FROM orte ORDER BY zuletzt_genutzt"
+        ).fetchall()
+        for schluessel, lat, lon, gespeichert in zeilen:
+            self._eintraege[schluessel] = (lat, lon, gespeichert)
+        self._db.executemany("DELETE FROM orte WHERE schluessel = ?", self._verdraengen())
+        self._db.commit()
+
+    def get(self, ort):
+        """Liefert [lat, lon] oder None, wenn der Ort nicht (mehr) im Cache ist"""
+        schluessel = normalisiere_ort(ort)
+        with self._lock:
+            eintrag = self._eintraege.get(schluessel)
+            jetzt = time.time()
+            if eintrag is None or jetzt - eintrag[2] > self.ttl:
+                if eintrag is not None:
+                    del self._eintraege[schluessel]
+                    self._genutzt.pop(schluessel, None)
+                self.fehlversuche += 1
+                return None
+            self._eintraege.move_to_end(schluessel)
+            self._genutzt[schluessel] = jetzt
+            self.treffer += 1
+            return [eintrag[0], eintrag[1]]
+
+    def put(self, ort, coords):
+        schluessel = normalisiere_ort(ort)
+        jetzt = time.time()
+        with self._lock:
+            self._eintraege[schluessel] = (coords[0], coords[1], jetzt)
+            self._eintraege.move_to_end(schluessel)
+            self._genutzt.pop(schluessel, None)
+            genutzt, self._genutzt = self._genutzt, {}
+            verdraengt = self._verdraengen()
+        self._schreiben([(schluessel, coords[0], coords[1], jetzt, jetzt)], genutzt, verdraengt)
+
+    def _schreiben(self, neu, genutzt, verdraengt):
+        """Neue Einträge, gesammelte Nutzungszeitpunkte (für die LRU-Reihenfolge) und verdrängte
+        Einträge in die Datei - außerhalb von _lock"""
+        if self._db is None:
+            return
+        with self._db_lock:
+            try:
+                self._db.executemany("INSERT OR REPLACE INTO orte VALUES (?, ?, ?, ?, ?)", neu)
+                self._db.executemany(
+                    "UPDATE orte SET zuletzt_genutzt = ? WHERE schluessel = ?",
+                    [(zeit, schluessel) for schluessel, zeit in genutzt.items()],
+                )
+                self._db.executemany("DELETE FROM orte WHERE schluessel = ?", verdraengt)
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+
+    def _verdraengen(self):
+        """Entfernt die am längsten nicht genutzten Einträge über der Maximalgröße aus dem
+        Speicher; liefert sie für das Löschen in der Datei"""
+        verdraengt = []
+        while len(self._eintraege) > self.max_eintraege:
+            schluessel, _ = self._eintraege.popitem(last=False)
+            self._genutzt.pop(schluessel, None)
+            verdraengt.append((schluessel,))
+        return verdraengt
+
+    def sichern(self):
+        with self._lock:
+            genutzt, self._genutzt = self._genutzt, {}
+        self._schreiben([], genutzt, [])
+
+    def leeren(self):
+        with self._lock:
+            self._eintraege.clear()
+            self._genutzt.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM orte")
+                self._db.commit()
+
+    def statistik(self):
+        """Treffer/Fehlversuche seit Programmstart und aktuelle Größe"""
+        with self._lock:
+            return {
+                "treffer": self.treffer,
+                "fehlversuche": self.fehlversuche,
+                "eintraege": len(self._eintraege),
+            }
+
+    def __len__(self):
+        return len(self._eintraege)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_geocoder = None
+
+
+def get_cache():
+    """Gemeinsamer Cache des Programms (wird beim ersten Zugriff von der Platte geladen)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = GeoCache()
+            atexit.register(_cache.sichern)
+        return _cache
+
+
+def get_geocoder():
+    """Gemeinsamer Geocoding-Client (Keep-Alive, Ratenbegrenzung, siehe geocoder.py);
+    wird neu angelegt, wenn sich LADEMETER_NOMINATIM geändert hat"""
+    global _geocoder
+    # Netzwerk-Module erst bei der ersten Abfrage laden (Startzeit)
+    from geocoder import NOMINATIM_URL, Geocoder
+    url = os.environ.get("LADEMETER_NOMINATIM") or NOMINATIM_URL
+    with _cache_lock:
+        if _geocoder is None or _geocoder.url != url:
+            if _geocoder is not None:
+                _geocoder.schliessen()
+            _geocoder = Geocoder(url)
+        return _geocoder
+
+
+@gemessen()
+def get_coords_nominatim(ort):
+    """Geocoding mit Nominatim (OpenStreetMap) bzw. dem konfigurierten Endpunkt, ohne Cache"""
+    return get_geocoder().suchen(ort)
+
+
+def get_coords_lokal(ort):
+    """[lat, lon] aus dem lokalen Gazetteer oder dem Cache, ohne Netzwerk; None, wenn unbekannt"""
+    from gazetteer import get_gazetteer
+    coords = get_gazetteer().suchen(ort)
+    if coords is not None:
+        zaehlen("get_coords.gazetteer")
+        return coords
+    coords = get_cache().get(ort)
+    if coords is not None:
+        zaehlen("get_coords.cache")
+    return coords
+
+
+def get_coords_online(ort):
+    """[lat, lon] von Nominatim; das Ergebnis landet im Cache"""
+    zaehlen("get_coords.nominatim")
+    coords = get_coords_nominatim(ort)
+    get_cache().put(ort, coords)
+    return coords
+
+
+@gemessen()
+def get_coords(ort):
+    """Liefert [lat, lon] für einen Ort - zuerst aus dem lokalen Gazetteer, dann aus dem Cache, sonst von Nominatim"""
+    coords = get_coords_lokal(ort)
+    if coords is None:
+        coords = get_coords_online(ort)
+    return coords
+
+
+def luftlinie_km(start_coords, ziel_coords):
+    """Luftlinie mit Haversine-Formel"""
+    lat1, lon1 = math.radians(start_coords[0]), math.radians(start_coords[1])
+    lat2, lon2 = math.radians(ziel_coords[0]), math.radians(ziel_coords[1])
+
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+    return ERDRADIUS_KM * c
+
+
+def geschaetzte_km(start_coords, ziel_coords):
+    """Geschätzte Straßenentfernung aus zwei Koordinaten (Luftlinie x Straßenfaktor)"""
+    return round(luftlinie_km(start_coords, ziel_coords) * STRASSEN_FAKTOR, 1)
+
+
+def strassen_km(start_coords, ziel_coords):
+    """Straßenentfernung aus zwei Koordinaten - kürzester Weg im lokalen Straßennetz
+    (siehe strassennetz.py), ohne Netz oder abseits davon geschätzt"""
+    from strassennetz import get_strassennetz
+    netz = get_strassennetz()
+    km = netz.entfernung(start_coords, ziel_coords) if netz is not None else None
+    if km is None:
+        return geschaetzte_km(start_coords, ziel_coords)
+    zaehlen("strassen_km.netz")
+    return round(km, 1)
+
+
+def strassen_km_paare(paare):
+    """strassen_km für eine Liste von (Start, Ziel)-Koordinaten; Paare mit gleichem Start teilen sich eine Suche"""
+    from strassennetz import get_strassennetz
+    netz = get_strassennetz()
+    kilometer = netz.entfernungen(paare) if netz is not None else [None] * len(paare)
+    ergebnis = []
+    for (start_coords, ziel_coords), km in zip(paare, kilometer):
+        if km is None:
+            ergebnis.append(geschaetzte_km(start_coords, ziel_coords))
+        else:
+            zaehlen("strassen_km.netz")
+            ergebnis.append(round(km, 1))
+    return ergebnis
+
+
+@gemessen()
+def get_kilometer_von_orten(start, ziel):
+    """Berechnet die Straßenentfernung zwischen zwei Orten (siehe strassen_km)"""
+    try:
+        start_coords = get_coords(start)
+        ziel_coords = get_coords(ziel)
+        return strassen_km(start_coords, ziel_coords)
+    except Exception as e:
+        raise Exception(f"Fehler bei der Routenberechnung: {str(e)}")
@@ -0,0 +1,162 @@
+"""Laufzeitmessung der heißen Pfade (Geocoding, Berechnung, Excel) ohne Profiler.
+
+Je Operation werden Anzahl, Fehler, Gesamt- und Höchstdauer, ein Histogramm
+mit festen Klassen und die letzten FENSTER Einzeldauern (für p50/p95)
+festgehalten; dazu einfache Zähler (z.B. Cache-Treffer). Die Messwerte
+lassen sich als JSON oder CSV exportieren und in der Oberfläche anzeigen
+(Diagnose-Fenster, F12).
+
+Eine Messung kostet etwa eine Mikrosekunde. Mit LADEMETER_MESSUNG=0 wird
+gar nicht gemessen; `gemessen` gibt die Funktion dann unverändert zurück.
+"""
+import bisect
+import csv
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+AKTIV = os.environ.get("LADEMETER_MESSUNG", "1") != "0"
+
+# Anzahl der letzten Einzeldauern je Operation für p50/p95
+FENSTER = 500
+
+# Obergrenzen der Histogrammklassen in ms (die letzte Klasse ist offen)
+KLASSEN_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_sperre = threading.Lock()
+_reihen = {}    # Operation -> _Messreihe
+_zaehler = {}   # Name -> Anzahl
+
+
+class _Messreihe:
+    __slots__ = ("anzahl", "fehler", "summe", "maximum", "letzte", "histogramm")
+
+    def __init__(self):
+        self.anzahl = 0
+        self.fehler = 0
+        self.summe = 0.0
+        self.maximum = 0.0
+        self.letzte = deque(maxlen=FENSTER)
+        self.histogramm = [0] * (len(KLASSEN_MS) + 1)
+
+    def erfassen(self, ms, fehler):
+        self.anzahl += 1
+        self.fehler += fehler
+        self.summe += ms
+        if ms > self.maximum:
+            self.maximum = ms
+        self.letzte.append(ms)
+        self.histogramm[bisect.bisect_left(KLASSEN_MS, ms)] += 1
+
+
+def erfassen(name, sekunden, fehler=False):
+    """Trägt eine gemessene Dauer für die Operation `name` ein"""
+    with _sperre:
+        reihe = _reihen.get(name)
+        if reihe is None:
+            reihe = _reihen[name] = _Messreihe()
+        reihe.erfassen(sekunden * 1000, bool(fehler))
+
+
+def zaehlen(name, anzahl=1):
+    if not AKTIV:
+        return
+    with _sperre:
+        _zaehler[name] = _zaehler.get(name, 0) + anzahl
+
+
+@contextmanager
+def messen(name):
+    """Misst den eingeschlossenen Block als Operation `name`"""
+    if not AKTIV:
+        yield
+        return
+    beginn = time.perf_counter()
+    fehler = True
+    try:
+        yield
+        fehler = False
+    finally:
+        erfassen(name, time.perf_counter() - beginn, fehler)
+
+
+def gemessen(name=None):
+    """Dekorator: misst jeden Aufruf der Funktion (Standardname: Funktionsname)"""
+    def dekorator(funktion):
+        if not AKTIV:
+            return funktion
+        operation = name or funktion.__name__
+
+        @functools.wraps(funktion)
+        def gemessene_funktion(*args, **kwargs):
+            beginn = time.perf_counter()
+            fehler = True
+            try:
+                ergebnis = funktion(*args, **kwargs)
+                fehler = False
+                return ergebnis
+            finally:
+                erfassen(operation, time.perf_counter() - beginn, fehler)
+        return gemessene_funktion
+    return dekorator
+
+
+def _perzentil(sortiert, anteil):
+    if not sortiert:
+        return 0.0
+    return sortiert[min(len(sortiert) - 1, int(anteil * len(sortiert)))]
+
+
+def statistik():
+    """Momentaufnahme aller Messwerte (Dauern in ms; p50/p95 über die letzten FENSTER Aufrufe)"""
+    with _sperre:
+        reihen = {name: (reihe.anzahl, reihe.fehler, reihe.summe, reihe.maximum,
+                         sorted(reihe.letzte), list(reihe.histogramm))
+                  for name, reihe in _reihen.items()}
+        zaehler = dict(_zaehler)
+    operationen = {}
+    for name, (anzahl, fehler, summe, maximum, letzte, histogramm) in sorted(reihen.items()):
+        operationen[name] = {
+            "anzahl": anzahl,
+            "fehler": fehler,
+            "summe_ms": round(summe, 3),
+            "mittel_ms": round(summe / anzahl, 3) if anzahl else 0.0,
+            "p50_ms": round(_perzentil(letzte, 0.50), 3),
+            "p95_ms": round(_perzentil(letzte, 0.95), 3),
+            "max_ms": round(maximum, 3),
+            "histogramm": {(f"<={grenze:g}" if i < len(KLASSEN_MS) else f">{KLASSEN_MS[-1]:g}"): wert
+                           for i, (grenze, wert) in enumerate(zip(KLASSEN_MS + (None,), histogramm)) if wert},
+        }
+    return {
+        "zeitpunkt": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "operationen": operationen,
+        "zaehler": dict(sorted(zaehler.items())),
+    }
+
+
+def zuruecksetzen():
+    with _sperre:
+        _reihen.clear()
+        _zaehler.clear()
+
+
+def exportieren(pfad):
+    """Schreibt die Messwerte nach `pfad` - als CSV bei Endung .csv, sonst als JSON"""
+    daten = statistik()
+    if pfad.lower().endswith(".csv"):
+        felder = ["operation", "anzahl", "fehler", "summe_ms", "mittel_ms", "p50_ms", "p95_ms", "max_ms"]
+        with open(pfad, "w", newline="", encoding="utf-8-sig") as datei:
+            writer = csv.writer(datei, delimiter=";")
+            writer.writerow(felder)
+            for name, werte in daten["operationen"].items():
+                writer.writerow([name] + [werte[feld] for feld in felder[1:]])
+            for name, anzahl in daten["zaehler"].items():
+                writer.writerow([name, anzahl] + [""] * (len(felder) - 2))
+    else:
+        with open(pfad, "w", encoding="utf-8") as datei:
+            json.dump(daten, datei, ensure_ascii=False, indent=2)
+    return daten
@@ -0,0 +1,82 @@
+"""Live-Berechnung: Zwischenergebnisse mit ihren Abhängigkeiten merken.
+
+Im Live-Modus rechnet die Oberfläche bei jeder Eingabe neu. Damit ein
+Tastendruck nicht alles neu berechnet, merkt sich LiveBerechnung je Schritt,
+aus welchen Eingaben das letzte Ergebnis entstand:
+
+    beladung  <- palettengroesse, menge, stapelbarkeit, fahrzeug (Laderaum)
+    route     <- startort, zielort
+    preis     <- kilometer, fahrzeug, lademeter, geltender Tarif
+
+Ein Schritt läuft nur, wenn sich eine seiner Eingaben geändert hat; die
+Zähler live.beladung und live.preis zeigen im Diagnosefenster, wie oft das
+war. Routen werden hier nur gemerkt - ermittelt werden sie von der
+Oberfläche im Hintergrund (Geokodierung), das Ergebnis kommt über
+route_merken zurück. Beim Tippen löst die Oberfläche Orte nur lokal auf
+(Ortsverzeichnis, Orts-Cache); ein dort unbekannter Ort wird als
+OrtNichtLokal gemerkt und erst über „Berechnen“ online gesucht - sonst gingen
+halb getippte Namen an Nominatim und landeten im Orts-Cache.
+"""
+from berechnung import berechne_beladung, berechne_preis
+from geocoding import normalisiere_ort
+from instrumentierung import zaehlen
+from tarif import get_tarif
+
+MAX_ROUTEN = 64   # zuletzt ermittelte Relationen (Hin- und Herwechseln zwischen Orten)
+
+
+class OrtNichtLokal(ValueError):
+    """Start oder Ziel ist weder im Ortsverzeichnis noch im Orts-Cache; nur online auffindbar"""
+
+
+class LiveBerechnung:
+    def __init__(self):
+        self._beladung = (None, None, None)   # (Eingaben, Beladung, Fehlertext)
+        self._preis = (None, None)            # (Eingaben, Preis)
+        self._routen = {}                     # (Start, Ziel) normalisiert -> (km, Fehlertext, nur online)
+
+    def beladung(self, palettengroesse, menge, stapelbarkeit, fahrzeug):
+        """Beladung wie berechnung.berechne_beladung; wirft ValueError auch für gemerkte Fehler"""
+        eingaben = (palettengroesse, menge, stapelbarkeit, fahrzeug)
+        if self._beladung[0] != eingaben:
+            zaehlen("live.beladung")
+            try:
+                self._beladung = (eingaben, berechne_beladung(*eingaben), None)
+            except ValueError as e:
+                self._beladung = (eingaben, None, str(e))
+        _, beladung, fehler = self._beladung
+        if fehler:
+            raise ValueError(fehler)
+        return beladung
+
+    def preis(self, kilometer, fahrzeug, lademeter=None):
+        """Preis wie berechnung.berechne_preis; neu berechnet auch nach einem Tarifwechsel"""
+        eingaben = (get_tarif(), kilometer, fahrzeug, lademeter)
+        if self._preis[0] != eingaben:
+            zaehlen("live.preis")
+            self._preis = (eingaben, berechne_preis(kilometer, fahrzeug, lademeter))
+        return self._preis[1]
+
+    @staticmethod
+    def _relation(startort, zielort):
+        return normalisiere_ort(startort), normalisiere_ort(zielort)
+
+    def route(self, startort, zielort):
+        """Gemerkte Entfernung oder None, wenn die Route noch nicht ermittelt wurde;
+        ValueError, wenn die Ermittlung fehlgeschlagen ist (OrtNichtLokal, wenn ein Ort
+        erst online gesucht werden muss)"""
+        km, fehler, nur_online = self._routen.get(self._relation(startort, zielort), (None, None, False))
+        if fehler:
+            raise OrtNichtLokal(fehler) if nur_online else ValueError(fehler)
+        return km
+
+    def route_merken(self, startort, zielort, kilometer=None, fehler=None, nur_online=False):
+        relation = self._relation(startort, zielort)
+        self._routen.pop(relation, None)
+        if len(self._routen) >= MAX_ROUTEN:
+            del self._routen[next(iter(self._routen))]
+        self._routen[relation] = (kilometer, fehler, nur_online)
+
+    def route_vergessen(self, startort, zielort):
+        """Verwirft die gemerkte Route (z.B. um nach einem Fehler erneut zu suchen)"""
+        self._routen.pop(self._relation(startort, zielort), None)
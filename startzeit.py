@@ -0,0 +1,109 @@
+"""Messung der Startzeit der Oberfläche (Importe und Zeit bis zum ersten Fenster).
+
+Aktiv nur mit `Lademeter.py --startzeit` oder der Umgebungsvariable
+LADEMETER_STARTZEIT=1; sonst kostet das Modul nichts. Gemessen wird ab dem
+ersten Import dieses Moduls (bei der PyInstaller-Exe also nach dem Entpacken
+und dem Start des Interpreters).
+Jeder Start wird als eine JSON-Zeile an startzeit.log neben dem Orts-Cache
+angehängt, damit sich das Startzeit-Budget über die Zeit verfolgen lässt.
+"""
+import builtins
+import json
+import os
+import sys
+import time
+
+# Budget bis zum ersten Fenster (Sekunden)
+STARTZEIT_BUDGET = 1.0
+
+_aktiv = False
+_beginn = time.perf_counter()
+_letzte_marke = _beginn
+_abschnitte = []   # [(Name, Sekunden)]
+_importe = {}      # Modul -> Sekunden (nur direkt importierte, inkl. Untermodule)
+_original_import = builtins.__import__
+
+
+def starten(argv=None):
+    """Schaltet die Messung ein, falls gewünscht; muss vor den übrigen Importen aufgerufen werden"""
+    global _aktiv
+    argv = sys.argv if argv is None else argv
+    if "--startzeit" not in argv and not os.environ.get("LADEMETER_STARTZEIT"):
+        return False
+    _aktiv = True
+    tiefe = [0]
+
+    def messender_import(name, *args, **kwargs):
+        if name in sys.modules:
+            return _original_import(name, *args, **kwargs)
+        beginn = time.perf_counter()
+        tiefe[0] += 1
+        try:
+            return _original_import(name, *args, **kwargs)
+        finally:
+            tiefe[0] -= 1
+            if tiefe[0] == 0:
+                _importe[name] = _importe.get(name, 0.0) + time.perf_counter() - beginn
+
+    builtins.__import__ = messender_import
+    return True
+
+
+def marke(name):
+    """Schließt einen Abschnitt ab (Zeit seit der vorherigen Marke)"""
+    global _letzte_marke
+    if not _aktiv:
+        return
+    jetzt = time.perf_counter()
+    _abschnitte.append((name, jetzt - _letzte_marke))
+    _letzte_marke = jetzt
+
+
+def bericht():
+    """Startzeit-Bericht als Dict (Sekunden)"""
+    return {
+        "zeitpunkt": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "bis_fenster": round(time.perf_counter() - _beginn, 3),
+        "budget": STARTZEIT_BUDGET,
+        "abschnitte": {name: round(sekunden, 4) for name, sekunden in _abschnitte},
+        "importe": {name: round(sekunden, 4)
+                    for name, sekunden in sorted(_importe.items(), key=lambda e: -e[1])},
+    }
+
+
+def bericht_text(daten):
+    zeilen = [f"Bis zum ersten Fenster: {daten['bis_fenster'] * 1000:.0f} ms "
+              f"(Budget {daten['budget'] * 1000:.0f} ms"
+              f"{', ÜBERSCHRITTEN' if daten['bis_fenster'] > daten['budget'] else ''})",
+              "", "Abschnitte:"]
+    zeilen += [f"  {name:<24} {sekunden * 1000:8.1f} ms" for name, sekunden in daten["abschnitte"].items()]
+    zeilen += ["", "Langsamste Importe:"]
+    zeilen += [f"  {name:<24} {sekunden * 1000:8.1f} ms" for name, sekunden in list(daten["importe"].items())[:10]]
+    return "\n".join(zeilen)
+
+
+def fenster_sichtbar(root, anzeigen=True):
+    """Aufruf, sobald das erste Fenster steht: beendet die Messung und protokolliert sie"""
+    global _aktiv
+    if not _aktiv:
+        return None
+    root.update_idletasks()
+    marke("Fenster zeichnen")
+    builtins.__import__ = _original_import
+    _aktiv = False
+    daten = bericht()
+    text = bericht_text(daten)
+    if sys.stderr:
+        print(text, file=sys.stderr)
+    try:
+        from geocoding import standard_cache_pfad
+        pfad = os.path.join(os.path.dirname(standard_cache_pfad()), "startzeit.log")
+        os.makedirs(os.path.dirname(pfad), exist_ok=True)
+        with open(pfad, "a", encoding="utf-8") as datei:
+            datei.write(json.dumps(daten, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+    if anzeigen:
+        from tkinter import messagebox
+        messagebox.showinfo("Startzeit", text)
+    return daten
@@ -0,0 +1,449 @@
+"""Offline-Straßennetz: kürzeste Wege in Straßen-km statt Luftlinie x 1,3.
+
+Ein Straßengraph (z.B. ein aufbereiteter OSM-Auszug mit Autobahnen und
+Bundesstraßen) wird einmalig aus zwei CSV-Dateien importiert:
+
+    Knoten:  id;lat;lon
+    Kanten:  von;nach[;km][;einbahn]   (ohne km gilt die Luftlinie zwischen den Knoten)
+
+Beim Import werden Formpunkte ohne Abzweigung (Knoten mit genau zwei
+Nachbarn) aus dem Graphen herausgezogen und der Graph als CSR-Struktur -
+Kanten-Offsets je Knoten, Zielknoten, Längen - in eine Netzdatei
+geschrieben. Die herausgezogenen Punkte bleiben als Anbindungspunkte
+erhalten, verankert an den Knoten am Ende ihres Straßenzugs. Gesucht wird
+mit A* (Luftlinie als Schätzung) auf kompakten array-Feldern; mehrere Ziele
+desselben Startpunkts beantwortet ein einziger Dijkstra-Lauf.
+
+Orte werden an den nächstgelegenen Anbindungspunkt angebunden (Rasterindex
+mit ZELLE_GRAD Kantenlänge), die Anbindung selbst wird wie bisher geschätzt
+(Luftlinie x Straßenfaktor). Liegt ein Ort weiter als MAX_ANBINDUNG_KM vom
+Netz entfernt oder ist das Ziel nicht erreichbar, liefern die Abfragen None;
+geocoding.strassen_km schätzt dann wie bisher.
+
+Die Netzdatei besteht nur aus array-Feldern (kein NumPy), damit auch die
+Oberfläche ohne NumPy auskommt (siehe Lademeter.spec).
+"""
+import csv
+import heapq
+import json
+import math
+import os
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from geocoding import ERDRADIUS_KM, STRASSEN_FAKTOR, luftlinie_km, standard_cache_pfad
+
+MAX_ANBINDUNG_KM = 30        # weiter vom Netz entfernte Orte werden nur geschätzt
+MAX_GEMERKT = 10000          # zuletzt berechnete Relationen im Speicher
+ZELLE_GRAD = 0.1             # Rasterweite des Anbindungsindex
+
+_KENNUNG = b"LADEMETER-STRASSENNETZ 1\n"
+
+_EINBAHN = {"1", "ja", "j", "true", "yes", "y", "x"}
+
+
+def standard_strassennetz_pfad():
+    """Pfad der Netzdatei (überschreibbar über LADEMETER_STRASSENNETZ)"""
+    return os.environ.get("LADEMETER_STRASSENNETZ") or os.path.join(
+        os.path.dirname(standard_cache_pfad()), "strassennetz.dat")
+
+
+def _csv_lesen(pfad):
+    """Zeilen als Dicts mit kleingeschriebenen Spaltennamen (Trennzeichen ; oder ,)"""
+    with open(pfad, newline="", encoding="utf-8-sig") as datei:
+        erste_zeile = datei.readline()
+        datei.seek(0)
+        trennzeichen = ";" if erste_zeile.count(";") >= erste_zeile.count(",") else ","
+        for zeile in csv.DictReader(datei, delimiter=trennzeichen):
+            yield {str(k).strip().lower(): (v or "").strip() for k, v in zeile.items() if k}
+
+
+def _zusammenziehen(aus, ein):
+    """Entfernt Knoten ohne Abzweigung und verbindet ihre Nachbarn direkt.
+
+    `aus[u]` und `ein[u]` sind Dicts Nachbar -> km. Zusammengezogen werden
+    Knoten mit zwei Nachbarn in beiden Richtungen (a <-> x <-> b) und reine
+    Durchgangsknoten von Einbahnstraßen (a -> x -> b). Liefert die entfernten
+    Knoten in Reihenfolge als (x, {erreichbarer Nachbar: km}, {Nachbar, der x erreicht: km}).
+    """
+    entfernt = []
+    stapel = list(range(len(aus)))
+    while stapel:
+        x = stapel.pop()
+        nach, von = aus[x], ein[x]
+        if len(nach) == 2 and nach.keys() == von.keys():
+            a, b = nach
+            umwege = ((a, b, von[a] + nach[b]), (b, a, von[b] + nach[a]))
+        elif len(nach) == 1 and len(von) == 1 and nach.keys() != von.keys():
+            (a, km_a), = von.items()
+            (b, km_b), = nach.items()
+            umwege = ((a, b, km_a + km_b),)
+        else:
+            continue
+        for nachbar in von:
+            del aus[nachbar][x]
+        for nachbar in nach:
+            del ein[nachbar][x]
+        aus[x], ein[x] = {}, {}
+        for u, v, km in umwege:
+            if km < aus[u].get(v, math.inf):
+                aus[u][v] = ein[v][u] = km
+        stapel.extend({a, b})
+        entfernt.append((x, nach, von))
+    return entfernt
+
+
+def _anker_aufloesen(anker, aufgeloest):
+    """Ersetzt später entfernte Nachbarn durch deren (bereits aufgelöste) Anker"""
+    ergebnis = {}
+    for knoten, km in anker.items():
+        for ziel, weiter in aufgeloest.get(knoten, {knoten: 0.0}).items():
+            if km + weiter < ergebnis.get(ziel, math.inf):
+                ergebnis[ziel] = km + weiter
+    return ergebnis
+
+
+def _csr(listen, nummern):
+    """Dicts Knoten -> km je Eintrag als (Offsets, Knoten, km)-Felder"""
+    start, knoten, laengen = array("i", [0]), array("i"), array("d")
+    for eintraege in listen:
+        for v, km in sorted(eintraege.items()):
+            knoten.append(nummern[v])
+            laengen.append(km)
+        start.append(len(knoten))
+    return start, knoten, laengen
+
+
+def _zelle(lat, lon):
+    """Schlüssel der Rasterzelle (Zeile, Spalte) als eine Zahl"""
+    return (math.floor(lat / ZELLE_GRAD) + 10000) * 100000 + math.floor(lon / ZELLE_GRAD) + 50000
+
+
+def _speichern(pfad, felder, skalierung):
+    kopf = {"byteorder": sys.byteorder, "skalierung": skalierung,
+            "felder": [[name, feld.typecode, len(feld)] for name, feld in felder.items()]}
+    os.makedirs(os.path.dirname(os.path.abspath(pfad)), exist_ok=True)
+    temp = pfad + ".tmp"
+    with open(temp, "wb") as datei:
+        datei.write(_KENNUNG)
+        datei.write(json.dumps(kopf).encode("ascii") + b"\n")
+        for feld in felder.values():
+            feld.tofile(datei)
+    os.replace(temp, pfad)
+
+
+def _laden(pfad):
+    """(Skalierung, {Name: array}) aus einer Netzdatei; ValueError bei fremden oder beschädigten Dateien"""
+    with open(pfad, "rb") as datei:
+        if datei.readline() != _KENNUNG:
+            raise ValueError(f"Keine Straßennetz-Datei: {pfad}")
+        kopf = json.loads(datei.readline())
+        felder = {}
+        for name, typ, anzahl in kopf["felder"]:
+            feld = array(typ)
+            try:
+                feld.fromfile(datei, anzahl)
+            except EOFError:
+                raise ValueError(f"Straßennetz-Datei unvollständig: {pfad}") from None
+            if kopf["byteorder"] != sys.byteorder:
+                feld.byteswap()
+            felder[name] = feld
+    return kopf["skalierung"], felder
+
+
+def strassennetz_importieren(knoten_pfad, kanten_pfad, pfad=None):
+    """Importiert Knoten- und Kanten-CSV in die Netzdatei; liefert (Knoten, Kanten) des verbleibenden Graphen"""
+    pfad = pfad or standard_strassennetz_pfad()
+    nummern = {}
+    lat, lon = [], []
+    for zeile in _csv_lesen(knoten_pfad):
+        if not zeile.get("id") or not zeile.get("lat") or not zeile.get("lon"):
+            continue
+        nummern[zeile["id"]] = len(lat)
+        lat.append(float(zeile["lat"]))
+        lon.append(float(zeile["lon"]))
+
+    aus = [{} for _ in lat]
+    ein = [{} for _ in lat]
+    for nummer, zeile in enumerate(_csv_lesen(kanten_pfad), start=2):
+        try:
+            u, v = nummern[zeile.get("von", "")], nummern[zeile.get("nach", "")]
+        except KeyError as e:
+            raise ValueError(f"{os.path.basename(kanten_pfad)}, Zeile {nummer}: unbekannter Knoten {e.args[0]!r}")
+        if u == v:
+            continue
+        km = zeile.get("km", "").replace(",", ".")
+        km = float(km) if km else luftlinie_km((lat[u], lon[u]), (lat[v], lon[v]))
+        richtungen = ((u, v),) if zeile.get("einbahn", "").lower() in _EINBAHN else ((u, v), (v, u))
+        for a, b in richtungen:
+            if km < aus[a].get(b, math.inf):
+                aus[a][b] = ein[b][a] = km
+
+    entfernt = _zusammenziehen(aus, ein)
+    # Entfernte Knoten bleiben als Anbindungspunkte erhalten, verankert an den
+    # Knoten am Ende ihres Straßenzugs (in umgekehrter Reihenfolge auflösen)
+    anker_aus, anker_ein = {}, {}
+    for x, nach, von in reversed(entfernt):
+        anker_aus[x] = _anker_aufloesen(nach, anker_aus)
+        anker_ein[x] = _anker_aufloesen(von, anker_ein)
+
+    # Zuerst die Knoten des Graphen, danach die entfernten
+    behalten = [u for u in range(len(aus)) if aus[u] or ein[u]]
+    zusaetzlich = [x for x, _, _ in entfernt]
+    neu = {u: i for i, u in enumerate(behalten)}
+    start, nach, laengen = _csr([aus[u] for u in behalten], neu)
+    skalierung = 1.0
+    for i, u in enumerate(behalten):
+        for k in range(start[i], start[i + 1]):
+            v = behalten[nach[k]]
+            luftlinie = luftlinie_km((lat[u], lon[u]), (lat[v], lon[v]))
+            if luftlinie > 0:
+                skalierung = min(skalierung, laengen[k] / luftlinie)
+    aus_start, aus_knoten, aus_km = _csr([anker_aus[x] for x in zusaetzlich], neu)
+    ein_start, ein_knoten, ein_km = _csr([anker_ein[x] for x in zusaetzlich], neu)
+
+    alle = behalten + zusaetzlich
+    zellen = {}
+    for i, u in enumerate(alle):
+        zellen.setdefault(_zelle(lat[u], lon[u]), []).append(i)
+    zellen_schluessel, zellen_start, zellen_punkte = array("q"), array("i", [0]), array("i")
+    for schluessel in sorted(zellen):
+        zellen_schluessel.append(schluessel)
+        zellen_punkte.extend(zellen[schluessel])
+        zellen_start.append(len(zellen_punkte))
+
+    # Einheitsvektoren der Knoten für die A*-Schätzung (Sehne statt Haversine, ohne Winkelfunktionen)
+    x, y, z = array("d"), array("d"), array("d")
+    for u in behalten:
+        lat_rad, lon_rad = math.radians(lat[u]), math.radians(lon[u])
+        x.append(math.cos(lat_rad) * math.cos(lon_rad))
+        y.append(math.cos(lat_rad) * math.sin(lon_rad))
+        z.append(math.sin(lat_rad))
+
+    _speichern(pfad, {
+        "lat": array("d", (lat[u] for u in alle)), "lon": array("d", (lon[u] for u in alle)),
+        "start": start, "nach": nach, "km": laengen, "x": x, "y": y, "z": z,
+        "aus_start": aus_start, "aus_knoten": aus_knoten, "aus_km": aus_km,
+        "ein_start": ein_start, "ein_knoten": ein_knoten, "ein_km": ein_km,
+        "zellen_schluessel": zellen_schluessel, "zellen_start": zellen_start, "zellen_punkte": zellen_punkte,
+    # Kanten kürzer als die Luftlinie: Schätzung von A* entsprechend verkleinern
+    }, skalierung * 0.999)
+    return len(behalten), len(nach)
+
+
+class Strassennetz:
+    """Straßengraph aus einer Netzdatei; Abfragen sind thread-sicher"""
+
+    def __init__(self, pfad=None):
+        self.pfad = pfad or standard_strassennetz_pfad()
+        self.skalierung, felder = _laden(self.pfad)
+        # Anbindungspunkte: die Knoten des Graphen, danach die herausgezogenen Formpunkte
+        self._lat, self._lon = felder["lat"], felder["lon"]
+        self._start, self._nach, self._km = felder["start"], felder["nach"], felder["km"]
+        self._x, self._y, self._z = felder["x"], felder["y"], felder["z"]
+        self._anker = {
+            "aus": (felder["aus_start"], felder["aus_knoten"], felder["aus_km"]),
+            "ein": (felder["ein_start"], felder["ein_knoten"], felder["ein_km"]),
+        }
+        self._zellen = (felder["zellen_schluessel"], felder["zellen_start"], felder["zellen_punkte"])
+        self.knoten = len(self._start) - 1
+        self._gemerkt = OrderedDict()   # (lat1, lon1, lat2, lon2) -> km oder None
+        self._sperre = threading.Lock()
+        self.suchen_gesamt = 0
+
+    def __len__(self):
+        return self.knoten
+
+    @property
+    def kanten(self):
+        return len(self._nach)
+
+    def anbinden(self, coords):
+        """(nächster Anbindungspunkt, Luftlinie dorthin in km) oder None, wenn das Netz
+        weiter als MAX_ANBINDUNG_KM entfernt ist"""
+        lat, lon = float(coords[0]), float(coords[1])
+        schluessel, start, punkte = self._zellen
+        zeile, spalte = math.floor(lat / ZELLE_GRAD), math.floor(lon / ZELLE_GRAD)
+        # Kleinste Zellbreite in der Umgebung: Punkte jenseits von Ring r sind mindestens r Zellen entfernt
+        zelle_km = ZELLE_GRAD * math.pi / 180 * ERDRADIUS_KM
+        schritt_km = zelle_km * max(math.cos(math.radians(min(abs(lat) + 1, 89))), 0.01)
+        bester, beste_km = None, math.inf
+        ring = 0
+        while True:
+            for z in range(zeile - ring, zeile + ring + 1):
+                rand = abs(z - zeile) == ring
+                for s in range(spalte - ring, spalte + ring + 1, 1 if rand else 2 * ring):
+                    k = (z + 10000) * 100000 + s + 50000
+                    i = bisect_left(schluessel, k)
+                    if i == len(schluessel) or schluessel[i] != k:
+                        continue
+                    for n in range(start[i], start[i + 1]):
+                        punkt = punkte[n]
+                        km = luftlinie_km((lat, lon), (self._lat[punkt], self._lon[punkt]))
+                        if km < beste_km:
+                            bester, beste_km = punkt, km
+            if beste_km <= ring * schritt_km or ring * schritt_km > MAX_ANBINDUNG_KM:
+                break
+            ring += 1
+        return (bester, beste_km) if beste_km <= MAX_ANBINDUNG_KM else None
+
+    def _anker_von(self, punkt, richtung):
+        """{Knoten: km} - ein Knoten des Graphen ist sein eigener Anker, ein zusammengezogener
+        Formpunkt hängt an den Knoten am Ende seines Straßenzugs ("aus": ab dem Punkt, "ein": zum Punkt)"""
+        if punkt < self.knoten:
+            return {punkt: 0.0}
+        start, knoten, laengen = self._anker[richtung]
+        i = punkt - self.knoten
+        return {knoten[k]: laengen[k] for k in range(start[i], start[i + 1])}
+
+    def _schaetzung(self, ziele):
+        """Untere Schranke der Wegstrecke von einem Knoten zum nächsten der (höchstens zwei) `ziele`.
+
+        Die Sehne durch die Erdkugel ist nie länger als der Großkreis und
+        dieser nie länger als die Straße (bis auf die Skalierung).
+        """
+        x, y, z = self._x, self._y, self._z
+        faktor = ERDRADIUS_KM * self.skalierung
+        sqrt = math.sqrt
+        ziele = list(ziele)
+        x1, y1, z1 = x[ziele[0]], y[ziele[0]], z[ziele[0]]
+        if len(ziele) == 1:
+            def schaetzung(v):
+                return faktor * sqrt((x[v] - x1) ** 2 + (y[v] - y1) ** 2 + (z[v] - z1) ** 2)
+            return schaetzung
+        x2, y2, z2 = x[ziele[1]], y[ziele[1]], z[ziele[1]]
+
+        def schaetzung(v):
+            xv, yv, zv = x[v], y[v], z[v]
+            d1 = (xv - x1) ** 2 + (yv - y1) ** 2 + (zv - z1) ** 2
+            d2 = (xv - x2) ** 2 + (yv - y2) ** 2 + (zv - z2) ** 2
+            return faktor * sqrt(d1 if d1 < d2 else d2)
+        return schaetzung
+
+    def kuerzeste_wege(self, quellen, ziele):
+        """{Zielknoten: km} für alle erreichbaren Knoten aus `ziele`; `quellen` ist {Knoten: km bis dorthin}.
+
+        Bei höchstens zwei Zielknoten (ein Ort) A*, sonst ein Dijkstra-Lauf,
+        der endet, sobald alle Ziele feststehen.
+        """
+        offen = set(ziele)
+        ergebnis = {}
+        schaetzung = self._schaetzung(offen) if len(offen) <= 2 else None
+        start, nach, laengen = self._start, self._nach, self._km
+        abstand = dict(quellen)
+        haufen = [(d + schaetzung(u) if schaetzung else d, d, u) for u, d in quellen.items()]
+        heapq.heapify(haufen)
+        heappush, heappop, unendlich = heapq.heappush, heapq.heappop, math.inf
+        while haufen and offen:
+            _, d, u = heappop(haufen)
+            if d > abstand[u]:
+                continue
+            if u in offen:
+                ergebnis[u] = d
+                offen.discard(u)
+            for i in range(start[u], start[u + 1]):
+                v = nach[i]
+                neu = d + laengen[i]
+                if neu < abstand.get(v, unendlich):
+                    abstand[v] = neu
+                    heappush(haufen, (neu + schaetzung(v) if schaetzung else neu, neu, v))
+        self.suchen_gesamt += 1
+        return ergebnis
+
+    def entfernung(self, start_coords, ziel_coords):
+        """Straßen-km zwischen zwei Koordinaten oder None (abseits des Netzes, nicht erreichbar)"""
+        return self.entfernungen([(start_coords, ziel_coords)])[0]
+
+    def entfernungen(self, paare):
+        """Straßen-km für eine Liste von (Start, Ziel)-Koordinaten; None, wo keine Route gefunden wird.
+
+        Alle Paare mit demselben Startpunkt teilen sich einen Suchlauf.
+        """
+        ergebnisse = [None] * len(paare)
+        anbindungen = {}
+        je_quelle = {}   # Startpunkt -> [(Paar-Nr., Zielpunkt, km der Anbindungen)]
+        with self._sperre:
+            for nummer, (start, ziel) in enumerate(paare):
+                schluessel = (float(start[0]), float(start[1]), float(ziel[0]), float(ziel[1]))
+                if schluessel in self._gemerkt:
+                    self._gemerkt.move_to_end(schluessel)
+                    ergebnisse[nummer] = self._gemerkt[schluessel]
+                    continue
+                for coords in (schluessel[:2], schluessel[2:]):
+                    if coords not in anbindungen:
+                        anbindungen[coords] = self.anbinden(coords)
+                von, bis = anbindungen[schluessel[:2]], anbindungen[schluessel[2:]]
+                if von is not None and bis is not None and not self._gleicher_abschnitt(von[0], bis[0]):
+                    je_quelle.setdefault(von[0], []).append((nummer, bis[0], (von[1] + bis[1]) * STRASSEN_FAKTOR))
+                ergebnisse[nummer] = schluessel
+
+        berechnet = {}
+        for quelle, auftraege in je_quelle.items():
+            ziel_anker = {ziel: self._anker_von(ziel, "ein") for _, ziel, _ in auftraege}
+            wege = self.kuerzeste_wege(self._anker_von(quelle, "aus"),
+                                       {knoten for anker in ziel_anker.values() for knoten in anker})
+            for nummer, ziel, anbindung in auftraege:
+                km = min((wege[knoten] + rest for knoten, rest in ziel_anker[ziel].items() if knoten in wege),
+                         default=None)
+                berechnet[nummer] = None if km is None else km + anbindung
+
+        with self._sperre:
+            for nummer, ergebnis in enumerate(ergebnisse):
+                if isinstance(ergebnis, tuple):
+                    self._gemerkt[ergebnis] = ergebnisse[nummer] = berechnet.get(nummer)
+            while len(self._gemerkt) > MAX_GEMERKT:
+                self._gemerkt.popitem(last=False)
+        return ergebnisse
+
+    def _gleicher_abschnitt(self, a, b):
+        """True, wenn beide Orte am selben Punkt oder zwischen denselben Knoten angebunden sind -
+        dann hilft das Netz nicht weiter und es bleibt bei der Schätzung"""
+        return a == b or (a >= self.knoten and b >= self.knoten
+                          and self._anker_von(a, "aus").keys() == self._anker_von(b, "aus").keys())
+
+    def matrix(self, start_coords, ziel_coords):
+        """Straßen-km für alle Paare als Liste von Zeilen; None, wo keine Route gefunden wird"""
+        start_coords, ziel_coords = list(start_coords), list(ziel_coords)
+        kilometer = self.entfernungen([(start, ziel) for start in start_coords for ziel in ziel_coords])
+        return [kilometer[i:i + len(ziel_coords)] for i in range(0, len(kilometer), len(ziel_coords))]
+
+    def vergessen(self):
+        """Verwirft die gemerkten Relationen"""
+        with self._sperre:
+            self._gemerkt.clear()
+
+    def statistik(self):
+        return {"knoten": self.knoten, "kanten": self.kanten, "anbindungspunkte": len(self._lat),
+                "suchen": self.suchen_gesamt, "gemerkt": len(self._gemerkt)}
+
+
+_strassennetz = None          # (Pfad, Strassennetz oder None)
+_strassennetz_lock = threading.Lock()
+
+
+def get_strassennetz():
+    """Gemeinsames Straßennetz des Programms; None, solange keine Netzdatei importiert ist"""
+    global _strassennetz
+    pfad = standard_strassennetz_pfad()
+    geladen = _strassennetz
+    if geladen is not None and geladen[0] == pfad:
+        return geladen[1]
+    with _strassennetz_lock:
+        if _strassennetz is None or _strassennetz[0] != pfad:
+            netz = None
+            if os.path.exists(pfad):
+                try:
+                    netz = Strassennetz(pfad)
+                except (OSError, ValueError, KeyError):
+                    # Beschädigte Netzdatei: weiter mit der Schätzung
+                    netz = None
+            _strassennetz = (pfad, netz)
+        return _strassennetz[1]
+
+
+def strassennetz_vorladen():
+    """Lädt die Netzdatei im Hintergrund, damit die erste Entfernung nicht wartet"""
+    threading.Thread(target=get_strassennetz, name="Strassennetz", daemon=True).start()
@@ -0,0 +1,276 @@
+"""Tarife: Preise aus einer Tarifdatei, einmal in sortierte Staffeln übersetzt.
+
+Die Tarifdatei (JSON, Standard neben dem Orts-Cache, überschreibbar über
+LADEMETER_TARIF) enthält:
+
+    fahrzeuge          je Fahrzeugtyp grundpreis und km_staffel [[ab km, €/km], ...];
+                       "*" gilt für alle nicht genannten Fahrzeugtypen
+    lademeter_staffel  [[ab Lademeter, Faktor], ...] (optional)
+    diesel             {"preis": aktueller €/l, "staffel": [[ab €/l, Zuschlag %], ...]} (optional)
+    kunden             {Kunde: {"prozent": Zu-/Abschlag %, "fest": €}} (optional)
+
+Preis = (Grundpreis + km-Anteil) x (1 + Diesel %) x Lademeter-Faktor x (1 + Kunde %) + Kunde fest.
+Der km-Anteil ist stückweise linear: jede Staffel gilt ab ihrer Grenze bis zur
+nächsten; unterhalb der ersten Grenze ist der Grundpreis inklusive. Die
+Staffeln werden beim Laden in sortierte Listen mit aufsummierten Beträgen
+übersetzt, ein Preis ist danach eine binäre Suche (bisect) je Staffel.
+
+Ohne Tarifdatei gilt STANDARD_TARIF (die bisherigen festen Preise). Eine
+geänderte Datei wird ohne Neustart übernommen; get_tarif prüft dazu höchstens
+einmal je PRUEFINTERVALL Sekunden das Änderungsdatum.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+
+GRUNDPREIS = 65.0
+GRUND_KM = 40
+KM_PREISE = {
+    "Sprinter": 0.35,
+    "Planensprinter": 0.50,
+    "Klein LKW": 0.55,
+    "7,5 Tonnen LKW": 0.65,
+    "Tautliner": 0.75,
+    "Mega": 0.85,
+    "Jumbo": 1.00
+}
+# km-Preis für unbekannte Fahrzeugtypen
+STANDARD_KM_PREIS = 0.30
+
+STANDARD_TARIF = {
+    "name": "Standard (ohne Tarifdatei)",
+    "fahrzeuge": {
+        **{name: {"grundpreis": GRUNDPREIS, "km_staffel": [[GRUND_KM, km_preis]]} for name, km_preis in KM_PREISE.items()},
+        "*": {"grundpreis": GRUNDPREIS, "km_staffel": [[GRUND_KM, STANDARD_KM_PREIS]]},
+    },
+}
+
+PRUEFINTERVALL = 1.0   # Sekunden zwischen zwei Blicken auf das Änderungsdatum der Tarifdatei
+
+
+def standard_tarif_pfad():
+    """Pfad der Tarifdatei (überschreibbar über LADEMETER_TARIF)"""
+    from geocoding import standard_cache_pfad
+    return os.environ.get("LADEMETER_TARIF") or os.path.join(os.path.dirname(standard_cache_pfad()), "tarif.json")
+
+
+def kunde_normalisieren(kunde):
+    return " ".join(str(kunde or "").split()).casefold()
+
+
+def _staffel_lesen(werte, name):
+    """[[Grenze, Wert], ...] -> (Grenzen, Werte), aufsteigend sortiert; ValueError bei Unsinn"""
+    try:
+        paare = sorted((float(grenze), float(wert)) for grenze, wert in werte)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name}: erwartet [[Grenze, Wert], ...]") from None
+    grenzen = [grenze for grenze, _ in paare]
+    if len(set(grenzen)) != len(grenzen):
+        raise ValueError(f"{name}: Grenze doppelt vergeben")
+    if grenzen and grenzen[0] < 0:
+        raise ValueError(f"{name}: Grenzen dürfen nicht negativ sein")
+    return grenzen, [wert for _, wert in paare]
+
+
+class _Staffel:
+    """Wert der größten Grenze <= x; unterhalb der ersten Grenze `standard`"""
+
+    def __init__(self, grenzen, werte, standard):
+        self.grenzen = grenzen
+        self.werte = werte
+        self.standard = standard
+
+    def wert(self, x):
+        i = bisect_right(self.grenzen, x)
+        return self.werte[i - 1] if i else self.standard
+
+    def werte_fuer(self, x):
+        """Wie wert(), für ein NumPy-Array"""
+        import numpy as np
+        werte = np.array([self.standard] + self.werte)
+        return werte[np.searchsorted(np.array(self.grenzen), x, side="right")]
+
+
+class _KmTarif:
+    """Grundpreis plus stückweise linearer km-Anteil eines Fahrzeugtyps"""
+
+    def __init__(self, grundpreis, grenzen, saetze):
+        self.grundpreis = grundpreis
+        self.grenzen = grenzen
+        self.saetze = saetze
+        # Betrag bis zum Beginn jeder Staffel, damit ein Preis nur eine Suche braucht
+        self.bis_grenze = [0.0]
+        for i in range(1, len(grenzen)):
+            self.bis_grenze.append(self.bis_grenze[-1] + (grenzen[i] - grenzen[i - 1]) * saetze[i - 1])
+
+    def preis(self, kilometer):
+        i = bisect_right(self.grenzen, kilometer)
+        if not i:
+            return self.grundpreis
+        return self.grundpreis + self.bis_grenze[i - 1] + (kilometer - self.grenzen[i - 1]) * self.saetze[i - 1]
+
+    def preise(self, kilometer):
+        """Wie preis(), für ein NumPy-Array"""
+        import numpy as np
+        i = np.searchsorted(np.array(self.grenzen), kilometer, side="right")
+        ab = np.array([0.0] + self.grenzen)[i]
+        return (self.grundpreis + np.array([0.0] + self.bis_grenze)[i]
+                + (kilometer - ab) * np.array([0.0] + self.saetze)[i])
+
+
+def _nummerieren(werte):
+    """Folge von Namen -> (vorkommende Namen, Index je Eintrag); schneller als np.unique auf Text"""
+    import numpy as np
+    index = {}
+    nummern = np.fromiter((index.setdefault(wert, len(index)) for wert in werte), dtype=np.intp, count=len(werte))
+    return list(index), nummern
+
+
+class Tarif:
+    """Übersetzter Tarif; wirft ValueError bei ungültigen Angaben"""
+
+    def __init__(self, daten, quelle=None):
+        if not isinstance(daten, dict) or not isinstance(daten.get("fahrzeuge"), dict) or not daten["fahrzeuge"]:
+            raise ValueError("Tarif: 'fahrzeuge' fehlt")
+        self.name = str(daten.get("name") or quelle or "Tarif")
+        self.quelle = quelle
+        self._fahrzeuge = {}
+        for fahrzeug, angaben in daten["fahrzeuge"].items():
+            try:
+                grundpreis = float(angaben["grundpreis"])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"Tarif {fahrzeug}: 'grundpreis' fehlt oder ist keine Zahl") from None
+            grenzen, saetze = _staffel_lesen(angaben.get("km_staffel", []), f"Tarif {fahrzeug}, km_staffel")
+            self._fahrzeuge[fahrzeug] = _KmTarif(grundpreis, grenzen, saetze)
+        self._standard = self._fahrzeuge.pop("*", None)
+
+        self._lademeter = _Staffel(*_staffel_lesen(daten.get("lademeter_staffel", []), "lademeter_staffel"), 1.0)
+        diesel = daten.get("diesel") or {}
+        staffel = _Staffel(*_staffel_lesen(diesel.get("staffel", []), "diesel.staffel"), 0.0)
+        try:
+            self.dieselpreis = float(diesel["preis"]) if "preis" in diesel else None
+        except (TypeError, ValueError):
+            raise ValueError("diesel.preis ist keine Zahl") from None
+        # Der Dieselzuschlag hängt nur vom aktuellen Preis ab und steht damit beim Laden fest
+        self.dieselzuschlag = staffel.wert(self.dieselpreis) if self.dieselpreis is not None else 0.0
+        self._dieselfaktor = 1 + self.dieselzuschlag / 100
+
+        self._kunden = {}
+        for kunde, angaben in (daten.get("kunden") or {}).items():
+            try:
+                self._kunden[kunde_normalisieren(kunde)] = (float(angaben.get("prozent", 0.0)),
+                                                            float(angaben.get("fest", 0.0)))
+            except (AttributeError, TypeError, ValueError):
+                raise ValueError(f"Kunde {kunde}: 'prozent' und 'fest' müssen Zahlen sein") from None
+
+    @property
+    def fahrzeuge(self):
+        return list(self._fahrzeuge)
+
+    def kennt(self, fahrzeug):
+        return fahrzeug in self._fahrzeuge or self._standard is not None
+
+    def kundenkondition(self, kunde):
+        """(Zu-/Abschlag in %, fester Betrag); (0, 0) für Kunden ohne eigene Kondition"""
+        return self._kunden.get(kunde_normalisieren(kunde), (0.0, 0.0)) if kunde else (0.0, 0.0)
+
+    def preis(self, kilometer, fahrzeug, lademeter=None, kunde=None):
+        """Preis eines Auftrags (ungerundet); ohne Lademeter gilt das ganze Fahrzeug (Faktor 1)"""
+        km_tarif = self._fahrzeuge.get(fahrzeug, self._standard)
+        if km_tarif is None:
+            raise ValueError(f"Kein Tarif für Fahrzeugtyp '{fahrzeug}'")
+        preis = km_tarif.preis(kilometer) * self._dieselfaktor
+        if lademeter is not None:
+            preis *= self._lademeter.wert(lademeter)
+        if kunde:
+            prozent, fest = self.kundenkondition(kunde)
+            preis = preis * (1 + prozent / 100) + fest
+        return preis
+
+    def preise(self, kilometer, fahrzeuge, fahrzeug_nr=None, lademeter=None, kunden=None, kunde_nr=None):
+        """Preise vieler Aufträge auf einmal (NumPy, ungerundet).
+
+        `fahrzeuge` ist ein Name je Auftrag; mit `fahrzeug_nr` stattdessen die
+        Liste der vorkommenden Namen und je Auftrag der Index darin (ebenso
+        `kunden`/`kunde_nr`). `lademeter` ist ein Array oder None. Für
+        Fahrzeugtypen ohne Tarif ist der Preis NaN.
+        """
+        import numpy as np
+        kilometer = np.asarray(kilometer, dtype=float)
+        if fahrzeug_nr is None:
+            fahrzeuge, fahrzeug_nr = _nummerieren(fahrzeuge)
+        fahrzeug_nr = np.asarray(fahrzeug_nr).reshape(kilometer.shape)
+        preis = np.full(kilometer.shape, np.nan)
+        for nummer, fahrzeug in enumerate(fahrzeuge):
+            km_tarif = self._fahrzeuge.get(fahrzeug, self._standard)
+            if km_tarif is not None:
+                zeilen = fahrzeug_nr == nummer
+                preis[zeilen] = km_tarif.preise(kilometer[zeilen])
+        preis *= self._dieselfaktor
+        if lademeter is not None:
+            preis *= self._lademeter.werte_fuer(np.asarray(lademeter, dtype=float))
+        if kunden is not None:
+            if kunde_nr is None:
+                kunden, kunde_nr = _nummerieren(kunden)
+            konditionen = np.array([self.kundenkondition(kunde) for kunde in kunden] or [(0.0, 0.0)])
+            kunde_nr = np.asarray(kunde_nr).reshape(kilometer.shape)
+            preis = preis * (1 + konditionen[kunde_nr, 0] / 100) + konditionen[kunde_nr, 1]
+        return preis
+
+    def beschreibung(self):
+        return {"name": self.name, "quelle": self.quelle, "fahrzeuge": len(self._fahrzeuge),
+                "kunden": len(self._kunden), "dieselzuschlag_prozent": self.dieselzuschlag}
+
+
+def tarif_laden(pfad):
+    """Liest und übersetzt eine Tarifdatei; ValueError bei ungültigem Inhalt"""
+    with open(pfad, encoding="utf-8-sig") as datei:
+        try:
+            daten = json.load(datei)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Tarifdatei {pfad} ist kein gültiges JSON: {e}") from None
+    return Tarif(daten, quelle=pfad)
+
+
+_tarif = None            # (Pfad, (mtime_ns, Größe) oder None, Tarif)
+_tarif_geprueft = 0.0
+_tarif_fehler = None     # Fehler beim letzten Neuladen (der vorige Tarif bleibt dann gültig)
+_tarif_lock = threading.Lock()
+
+
+def get_tarif():
+    """Aktueller Tarif des Programms; eine geänderte Tarifdatei wird beim nächsten Aufruf
+    nach Ablauf von PRUEFINTERVALL neu geladen. Ist die geänderte Datei ungültig, bleibt
+    der bisherige Tarif in Kraft (siehe tarif_status)."""
+    global _tarif, _tarif_geprueft, _tarif_fehler
+    geladen = _tarif
+    if geladen is not None and time.monotonic() - _tarif_geprueft < PRUEFINTERVALL:
+        return geladen[2]
+    with _tarif_lock:
+        pfad = standard_tarif_pfad()
+        try:
+            stat = os.stat(pfad)
+            kennung = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            kennung = None
+        if _tarif is None or _tarif[:2] != (pfad, kennung):
+            try:
+                tarif = tarif_laden(pfad) if kennung else Tarif(STANDARD_TARIF)
+                _tarif_fehler = None
+            except (OSError, ValueError) as e:
+                if _tarif is None:
+                    raise
+                tarif = _tarif[2]
+                _tarif_fehler = str(e)
+            _tarif = (pfad, kennung, tarif)
+        _tarif_geprueft = time.monotonic()
+        return _tarif[2]
+
+
+def tarif_status():
+    """Beschreibung des geltenden Tarifs und ggf. der Fehler beim letzten Neuladen"""
+    status = get_tarif().beschreibung()
+    status["fehler"] = _tarif_fehler
+    return status
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Die Module liegen im Wurzelverzeichnis des Projekts, Hilfsfunktionen der Messungen in benchmarks/
+WURZEL = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, WURZEL)
+sys.path.insert(0, os.path.join(WURZEL, "benchmarks"))
@@ -0,0 +1,28 @@
+"""Angebote: Prüfung der Anfragen, wie sie der Angebotsdienst annimmt."""
+import pytest
+
+from angebot import anfrage_lesen
+from berechnung import palettengroesse_zerlegen
+
+
+@pytest.mark.parametrize("palettengroesse", ["infx80x100", "120xnanx100", "1e400x80x100", "120x80x-inf"])
+def test_nicht_endliche_palettengroesse(palettengroesse):
+    with pytest.raises(ValueError, match="endliche"):
+        palettengroesse_zerlegen(palettengroesse)
+
+
+def test_palettengroesse():
+    assert palettengroesse_zerlegen("120 x 80 X 100") == (120.0, 80.0, 100.0)
+    with pytest.raises(ValueError, match="LxBxH"):
+        palettengroesse_zerlegen("120xabcx100")
+
+
+@pytest.mark.parametrize("menge", [-1, 10**30, 1e400, "viele"])
+def test_unsinnige_menge(menge):
+    with pytest.raises(ValueError, match="menge"):
+        anfrage_lesen({"palettengroesse": "120x80x100", "menge": menge, "kilometer": 100})
+
+
+def test_nicht_endliche_kilometer():
+    with pytest.raises(ValueError, match="endliche"):
+        anfrage_lesen({"palettengroesse": "120x80x100", "menge": 1, "kilometer": float("inf")})
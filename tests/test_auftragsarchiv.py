@@ -0,0 +1,102 @@
+"""Auftragsarchiv: direktes Lesen aus dem BIFF-Stream gegen xlrd, Import und Suche."""
+import glob
+import os
+import time
+
+import pytest
+import xlwt
+
+import auftragsarchiv
+import xls_zellen
+from au_auftraege import au_auftraege_erzeugen
+from auftragsarchiv import (LESEBEREICHE, Auftragsarchiv, archiv_importieren, auftrag_lesen,
+                            ort_aus_adresse)
+from excel_bearbeitung import SHEET_NAME, cell_to_index
+
+VORLAGE = glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "AU *.xls"))[0]
+
+
+def _ueber_xlrd(pfad, monkeypatch):
+    """Felder wie sie xlrd liest (der direkte Weg wird abgeschaltet)"""
+    def nicht_patchbar(pfad):
+        raise xls_zellen.NichtPatchbar("Test")
+
+    with monkeypatch.context() as m:
+        m.setattr(auftragsarchiv, "_xls_direkt_lesen", nicht_patchbar)
+        return auftragsarchiv._xls_lesen(pfad)
+
+
+def test_vorlage_direkt_wie_xlrd(monkeypatch):
+    direkt = auftragsarchiv._xls_direkt_lesen(VORLAGE)
+    assert direkt == _ueber_xlrd(VORLAGE, monkeypatch)
+    assert direkt["auftragsnr"]
+
+
+def test_sst_ueber_continue_records(tmp_path, monkeypatch):
+    # Viele lange Texte vorab: die Felder landen im SST hinter mehreren CONTINUE-Records,
+    # einzelne Texte sind über eine Record-Grenze geteilt (teils einbyte-, teils UTF-16-kodiert)
+    buch = xlwt.Workbook(encoding="utf-8")
+    fueller = buch.add_sheet("Füller")
+    for nummer in range(400):
+        fueller.write(nummer, 0, f"Fülltext {nummer} " + ("abcdefghij" if nummer % 3 else "Środa Śląska ") * 9)
+    sheet = buch.add_sheet(SHEET_NAME)
+    erwartet = {}
+    for name, (zelle, zeilen) in LESEBEREICHE.items():
+        if name == "datum":
+            continue
+        row, col = cell_to_index(zelle)
+        texte = [f"{name} Zeile {i} " + ("ąęłńóśźż" if i % 2 else "abc") * 5 for i in range(zeilen)]
+        for i, text in enumerate(texte):
+            sheet.write(row + i, col, text)
+        erwartet[name] = "\n".join(text.strip() for text in texte)
+    pfad = str(tmp_path / "sst.xls")
+    buch.save(pfad)
+
+    direkt = auftragsarchiv._xls_direkt_lesen(pfad)
+    assert direkt == _ueber_xlrd(pfad, monkeypatch)
+    assert {name: direkt[name] for name in erwartet} == erwartet
+
+
+def test_import_erneuter_import_und_suche(tmp_path):
+    auftraege = [{
+        "datei": f"AU {nummer:03d}",
+        "partner": f"Nordfracht {nummer}\\n38440 Wolfsburg" if nummer % 2 else f"Oder Logistik {nummer}\\n61-001 Poznań",
+        "kennzeichen": f"DW {1000 + nummer}",
+        "ladestelle": "Lager 3\\n55-300 Środa Śląska",
+        "ids": f"Dispo {nummer}",
+    } for nummer in range(12)]
+    dateien = str(tmp_path / "auftraege")
+    assert not [f for _, f in au_auftraege_erzeugen(VORLAGE, auftraege, dateien, prozesse=1) if f]
+    archiv = str(tmp_path / "archiv.sqlite")
+
+    meldungen = []
+    statistik = archiv_importieren(dateien, archiv, prozesse=1, fortschritt=lambda *stand: meldungen.append(stand))
+    assert (statistik["gelesen"], statistik["fehler"]) == (12, 0)
+    assert meldungen[-1] == (12, 12)
+
+    # Nur geänderte Dateien werden erneut gelesen, gelöschte verschwinden
+    geaendert = os.path.join(dateien, "AU 003.xls")
+    os.utime(geaendert, ns=(time.time_ns(), time.time_ns() + 10**9))
+    os.remove(os.path.join(dateien, "AU 004.xls"))
+    statistik = archiv_importieren(dateien, archiv, prozesse=1)
+    assert (statistik["gelesen"], statistik["unveraendert"], statistik["entfernt"]) == (1, 10, 1)
+
+    index = Auftragsarchiv(archiv)
+    assert len(index) == 11
+    # Die Vorlage enthält selbst Zahlen (z.B. Auftragsnummer 7168): eindeutig über das Kennzeichen
+    treffer = index.suchen("nordfr wolfs 1007")
+    assert [auftrag["kennzeichen"] for auftrag in treffer] == ["DW 1007"]
+    assert treffer[0]["partner"] == auftrag_lesen(os.path.join(dateien, "AU 007.xls"))["partner"]
+    assert index.suchen("sroda dw 1005")[0]["kennzeichen"] == "DW 1005"
+    assert index.suchen("dw 1004") == []
+    assert len(index.suchen("oder poznan")) == 5
+
+
+@pytest.mark.parametrize("text, ort", [
+    ("Lager 3\n55-300 Środa Śląska", "55-300 Środa Śląska"),
+    ("VW Werk\nBerliner Ring 2\nD 38440 Wolfsburg", "D 38440 Wolfsburg"),
+    ("VW Wolfsburg", "VW Wolfsburg"),
+    ("", ""),
+])
+def test_ort_aus_adresse(text, ort):
+    assert ort_aus_adresse(text) == ort
@@ -0,0 +1,12 @@
+"""Stapelberechnung: Zerlegen der Eingabezeilen in Spalten."""
+from batch import _spalten
+
+
+def test_kurze_zeilen_werden_aufgefuellt():
+    assert _spalten([["a"], ["b", "c"]], 3) == [("a", "b"), ("", "c"), ("", "")]
+
+
+def test_ueberzaehlige_zellen_werden_verworfen():
+    # Mehr Zellen als Überschriften: keine zusätzlichen, unbenannten Ausgabespalten
+    spalten = _spalten([["a", "b", "x", "y"], ["c", "d"]], 2)
+    assert spalten == [("a", "c"), ("b", "d")]
@@ -0,0 +1,53 @@
+"""Lademeter der Reihen-Beladung gegen die frühere Formel je Palette (Grundfläche / 2,40 m)."""
+import math
+
+import pytest
+
+from beladung import MAX_MENGE, beladen
+
+
+def _alte_lademeter(laenge, breite, menge, stapelbarkeit):
+    return round(laenge / 100 * breite / 100 / 2.4 * menge / 2 ** stapelbarkeit, 2)
+
+
+@pytest.mark.parametrize("fahrzeug", [None, "Tautliner"])
+@pytest.mark.parametrize("menge", [1, 2, 3, 4, 5, 6, 10, 11, 17, 24, 33])
+def test_europalette_wie_bisher(menge, fahrzeug):
+    assert beladen(120, 80, 100, menge, 0, fahrzeug).lademeter == _alte_lademeter(120, 80, menge, 0)
+
+
+@pytest.mark.parametrize("menge", [1, 2, 3, 4, 6, 13, 26])
+def test_industriepalette_wie_bisher(menge):
+    assert beladen(120, 100, 100, menge, 0).lademeter == _alte_lademeter(120, 100, menge, 0)
+
+
+def test_einzelne_palette_zaehlt_nicht_die_ganze_reihe():
+    beladung = beladen(120, 80, 100, 1, 0)
+    assert beladung.lademeter == 0.4
+    assert beladung.reihen[0].tiefe / 100 > beladung.lademeter
+
+
+def test_volle_reihen_zaehlen_ihre_tiefe():
+    # 34 Europaletten: 10 Reihen längs à 3 und 2 Reihen quer à 2 füllen genau 13,6 m
+    beladung = beladen(120, 80, 100, 34, 0)
+    assert [(r.ausrichtung, r.anzahl, r.stapel) for r in beladung.reihen] == [("längs", 10, 3), ("quer", 2, 2)]
+    assert beladung.lademeter == 13.6
+    assert beladung.passt
+
+
+@pytest.mark.parametrize("laenge, breite, hoehe", [
+    (math.inf, 80, 100), (120, math.nan, 100), (120, 80, -math.inf), (math.nan, math.nan, math.nan),
+])
+def test_nicht_endliche_masse(laenge, breite, hoehe):
+    with pytest.raises(ValueError, match="endliche"):
+        beladen(laenge, breite, hoehe, 1, 0)
+
+
+@pytest.mark.parametrize("menge", [math.inf, -math.inf, math.nan, MAX_MENGE + 1, 10**30, 10**400])
+def test_unsinnige_menge(menge):
+    with pytest.raises(ValueError):
+        beladen(120, 80, 100, menge, 0)
+
+
+def test_hoechstmenge():
+    assert beladen(120, 80, 100, MAX_MENGE, 0).lademeter == pytest.approx(MAX_MENGE * 0.4)
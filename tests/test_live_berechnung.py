@@ -0,0 +1,24 @@
+"""Live-Modus: gemerkte Routen, Fehlversuche und nur online auffindbare Orte."""
+import pytest
+
+from live_berechnung import LiveBerechnung, OrtNichtLokal
+
+
+def test_route_gemerkt_und_vergessen():
+    live = LiveBerechnung()
+    assert live.route("Berlin", "Wolfsburg") is None
+    live.route_merken("Berlin", "Wolfsburg", 230.0)
+    assert live.route(" berlin", "WOLFSBURG ") == 230.0
+    live.route_vergessen("Berlin", "Wolfsburg")
+    assert live.route("Berlin", "Wolfsburg") is None
+
+
+def test_fehler_und_nur_online_unterscheidbar():
+    live = LiveBerechnung()
+    live.route_merken("Berlin", "Xyz", fehler="Ort nicht gefunden: Xyz")
+    live.route_merken("Berlin", "Wolfsb", fehler="„Wolfsb“ ist noch nicht bekannt", nur_online=True)
+    with pytest.raises(ValueError) as fehler:
+        live.route("Berlin", "Xyz")
+    assert not isinstance(fehler.value, OrtNichtLokal)
+    with pytest.raises(OrtNichtLokal, match="Wolfsb"):
+        live.route("Berlin", "Wolfsb")
@@ -0,0 +1,68 @@
+"""Offline-Straßennetz: A* und Matrix gegen einen einfachen Dijkstra auf dem ungekürzten Graphen."""
+import os
+import random
+
+import pytest
+
+from bench_strassennetz import dijkstra, netz_erzeugen
+from strassennetz import Strassennetz, strassennetz_importieren
+
+
+@pytest.fixture(scope="module")
+def netz(tmp_path_factory):
+    """Kleines Rasternetz mit Formpunkten und Einbahnstraßen: (Punkte, Kanten je Knoten, Strassennetz)"""
+    rng = random.Random(7)
+    knoten, kanten = netz_erzeugen(12, rng)
+    kanten_je_knoten = {}
+    for u, v, km, einbahn in kanten:
+        kanten_je_knoten.setdefault(u, []).append((v, km))
+        if not einbahn:
+            kanten_je_knoten.setdefault(v, []).append((u, km))
+
+    ordner = tmp_path_factory.mktemp("strassennetz")
+    knoten_pfad = os.path.join(ordner, "knoten.csv")
+    kanten_pfad = os.path.join(ordner, "kanten.csv")
+    with open(knoten_pfad, "w", encoding="utf-8") as datei:
+        datei.write("id;lat;lon\n")
+        datei.writelines(f"n{i};{lat!r};{lon!r}\n" for i, (lat, lon) in enumerate(knoten))
+    with open(kanten_pfad, "w", encoding="utf-8") as datei:
+        datei.write("von;nach;km;einbahn\n")
+        datei.writelines(f"n{u};n{v};{km};{'ja' if einbahn else ''}\n" for u, v, km, einbahn in kanten)
+    pfad = os.path.join(ordner, "strassennetz.dat")
+    strassennetz_importieren(knoten_pfad, kanten_pfad, pfad)
+    return knoten, kanten_je_knoten, Strassennetz(pfad)
+
+
+def test_a_stern_wie_dijkstra(netz):
+    knoten, kanten_je_knoten, strassennetz = netz
+    rng = random.Random(1)
+    geprueft = 0
+    for _ in range(200):
+        u, v = rng.sample(range(len(knoten)), 2)
+        km = strassennetz.entfernung(knoten[u], knoten[v])
+        erwartet = dijkstra(kanten_je_knoten, u, v)
+        if km is None:
+            # Nur zulässig, wenn kein Weg existiert oder beide Punkte am selben Straßenzug liegen
+            assert erwartet is None or strassennetz._gleicher_abschnitt(strassennetz.anbinden(knoten[u])[0],
+                                                                         strassennetz.anbinden(knoten[v])[0])
+            continue
+        geprueft += 1
+        assert erwartet is not None
+        assert km == pytest.approx(erwartet, abs=1e-6)
+    assert geprueft > 150
+
+
+def test_matrix_wie_einzelabfragen(netz):
+    knoten, _, strassennetz = netz
+    rng = random.Random(2)
+    starts = [knoten[i] for i in rng.sample(range(len(knoten)), 5)]
+    ziele = [knoten[i] for i in rng.sample(range(len(knoten)), 20)]
+    strassennetz.vergessen()
+    matrix = strassennetz.matrix(starts, ziele)
+    strassennetz.vergessen()
+    for start, zeile in zip(starts, matrix):
+        for ziel, km in zip(ziele, zeile):
+            einzeln = strassennetz.entfernung(start, ziel)
+            assert (km is None) == (einzeln is None)
+            if km is not None:
+                assert km == pytest.approx(einzeln, abs=1e-6)
@@ -0,0 +1,102 @@
+"""Tarife: Staffeln, Zuschläge und Kundenkonditionen, einzeln und im Stapel."""
+import os
+import random
+
+import numpy as np
+import pytest
+
+import tarif
+from tarif import GRUNDPREIS, KM_PREISE, STANDARD_KM_PREIS, STANDARD_TARIF, Tarif, tarif_laden
+
+BEISPIEL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "daten", "tarif_beispiel.json")
+
+
+@pytest.mark.parametrize("kilometer", [0, 25, 40, 41.5, 450, 1200])
+@pytest.mark.parametrize("fahrzeug", list(KM_PREISE) + ["Unbekannt"])
+def test_standardtarif_wie_feste_preise(kilometer, fahrzeug):
+    km_preis = KM_PREISE.get(fahrzeug, STANDARD_KM_PREIS)
+    erwartet = GRUNDPREIS + max(0, kilometer - 40) * km_preis
+    assert Tarif(STANDARD_TARIF).preis(kilometer, fahrzeug) == pytest.approx(erwartet)
+
+
+def test_beispieltarif_von_hand_gerechnet():
+    beispiel = tarif_laden(BEISPIEL)
+    # Tautliner 450 km: 110 + 260 x 0,75 + 150 x 0,70 = 410; Diesel 1,62 €/l -> +4 %
+    assert beispiel.preis(450, "Tautliner") == pytest.approx(410 * 1.04)
+    # 6,4 Lademeter -> Faktor 0,7; Muster GmbH -5 %
+    assert beispiel.preis(450, "Tautliner", 6.4, "Muster GmbH") == pytest.approx(410 * 1.04 * 0.7 * 0.95)
+    # Beispiel Logistik AG: +3 % und 15 € fest; Kundennamen ohne Rücksicht auf Schreibweise
+    assert beispiel.preis(30, "Sprinter", None, " beispiel  logistik ag") == pytest.approx(65 * 1.04 * 1.03 + 15)
+    # Fahrzeugtypen ohne eigenen Eintrag nach "*"
+    assert beispiel.preis(140, "Lastenrad") == pytest.approx((65 + 100 * 0.30) * 1.04)
+
+
+def test_stapel_wie_einzelpreise():
+    beispiel = tarif_laden(BEISPIEL)
+    rng = random.Random(42)
+    fahrzeuge = beispiel.fahrzeuge + ["Lastenrad"]
+    kunden = ["", "Muster GmbH", "Beispiel Logistik AG", "Unbekannt KG"]
+    auftraege = [(rng.uniform(0, 1500), rng.choice(fahrzeuge), rng.uniform(0.4, 13.6), rng.choice(kunden))
+                 for _ in range(2000)]
+    auftraege += [(grenze, "Mega", lademeter, "") for grenze in (0, 40, 300, 800) for lademeter in (2.4, 9.6)]
+    kilometer, fahrzeug, lademeter, kunde = (list(spalte) for spalte in zip(*auftraege))
+    stapel = beispiel.preise(np.array(kilometer), fahrzeug, lademeter=np.array(lademeter), kunden=kunde)
+    einzeln = [beispiel.preis(*auftrag) for auftrag in auftraege]
+    np.testing.assert_allclose(stapel, einzeln, rtol=1e-12)
+
+
+def test_fahrzeug_ohne_preis():
+    ohne_standard = Tarif({"fahrzeuge": {"Mega": {"grundpreis": 100, "km_staffel": [[0, 1.0]]}}})
+    assert ohne_standard.kennt("Mega") and not ohne_standard.kennt("Sprinter")
+    with pytest.raises(ValueError):
+        ohne_standard.preis(100, "Sprinter")
+    assert np.isnan(ohne_standard.preise([100, 100], ["Mega", "Sprinter"])).tolist() == [False, True]
+
+
+@pytest.mark.parametrize("daten", [
+    {},
+    {"fahrzeuge": {"Mega": {"km_staffel": [[0, 1.0]]}}},
+    {"fahrzeuge": {"Mega": {"grundpreis": 100, "km_staffel": [[40, 1.0], [40, 0.9]]}}},
+    {"fahrzeuge": {"Mega": {"grundpreis": 100, "km_staffel": [[-1, 1.0]]}}},
+    {"fahrzeuge": {"Mega": {"grundpreis": 100}}, "diesel": {"preis": "teuer"}},
+])
+def test_ungueltiger_tarif(daten):
+    with pytest.raises(ValueError):
+        Tarif(daten)
+
+
+def _tarif_setzen(tmp_path, monkeypatch, inhalt):
+    pfad = tmp_path / "tarif.json"
+    pfad.write_text(inhalt, encoding="utf-8")
+    monkeypatch.setenv("LADEMETER_TARIF", str(pfad))
+    monkeypatch.setattr(tarif, "_tarif", None)
+
+
+def test_disposition_folgt_dem_tarif(tmp_path, monkeypatch):
+    from disposition import fahrzeugtypen
+
+    _tarif_setzen(tmp_path, monkeypatch, '{"fahrzeuge": {"Sprinter": {"grundpreis": 65}, "Mega": {"grundpreis": 120}}}')
+    assert sorted(typ.name for typ in fahrzeugtypen()) == ["Mega", "Sprinter"]
+
+
+def test_fahrzeugliste_folgt_dem_tarif(tmp_path, monkeypatch):
+    from angebot import anfrage_lesen, angebot_berechnen
+    from batch import block_berechnen, spalten_zuordnen
+    from berechnung import verfuegbare_fahrzeuge
+
+    _tarif_setzen(tmp_path, monkeypatch, '{"fahrzeuge": {"Kühlkoffer": {"grundpreis": 90}, "Mega": {"grundpreis": 120}}}')
+    assert verfuegbare_fahrzeuge() == ["Kühlkoffer", "Mega"]
+    anfrage = {"palettengroesse": "120x80x100", "menge": 3, "kilometer": 10}
+    assert anfrage_lesen(dict(anfrage, fahrzeug="Kühlkoffer"))["fahrzeug"] == "Kühlkoffer"
+    with pytest.raises(ValueError, match="Fahrzeugtyp"):
+        anfrage_lesen(dict(anfrage, fahrzeug="Sprinter"))
+    assert angebot_berechnen("120x80x100", 3, 0, kilometer=10).fahrzeug == "Kühlkoffer"
+
+    # Stapelberechnung: Zeilen ohne Fahrzeug rechnen mit dem ersten Fahrzeugtyp des Tarifs
+    zuordnung = spalten_zuordnen(["palettengroesse", "menge", "stapelbarkeit", "kilometer"])
+    _, _, preis, fehler = block_berechnen([("120x80x100",), ("3",), ("0",), ("10",)], zuordnung)
+    assert fehler == [""] and preis.tolist() == [90.0]
+
+    # Tarif nur mit "*": die bisherigen Fahrzeugtypen
+    _tarif_setzen(tmp_path, monkeypatch, '{"fahrzeuge": {"*": {"grundpreis": 50}}}')
+    assert verfuegbare_fahrzeuge() == list(KM_PREISE)
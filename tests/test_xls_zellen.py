@@ -0,0 +1,80 @@
+"""Direktes Ändern von Zellen im BIFF-Stream (xls_zellen) und die AU-Massenerzeugung darauf."""
+import glob
+import os
+
+import pytest
+import xlrd
+
+from au_auftraege import au_auftraege_erzeugen, auftrag_zellen
+from excel_bearbeitung import SHEET_NAME, cell_to_index
+from xls_zellen import NichtPatchbar, XlsDatei
+
+VORLAGE = glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "AU *.xls"))[0]
+
+AUFTRAG = {
+    "partner": "Machs-Trans Magdalena\nul. Przykładowa 12\n55-300 Środa Śląska\nPL1234567890",
+    "kennzeichen": "DW 12345",
+    "fahrer": "Jan Kowalski",
+    "ladestelle": "55-300 Środa Śląska",
+    "entladestelle": "38440 Wolfsburg",
+    "fahrzeug": "Tautliner / 33 Paletten / 12.000 kg",
+    "ids": "Dispo 7168-2025",
+}
+
+
+def _blaetter(pfad):
+    """{Blattname: {(Zeile, Spalte): Wert}} aller nicht leeren Zellen"""
+    buch = xlrd.open_workbook(pfad)
+    return {sheet.name: {(row, col): sheet.cell_value(row, col)
+                         for row in range(sheet.nrows) for col in range(sheet.ncols)
+                         if sheet.cell_value(row, col) != ""}
+            for sheet in buch.sheets()}
+
+
+def test_zellen_setzen_aendert_nur_die_zielzellen(tmp_path):
+    zellen = auftrag_zellen(AUFTRAG)
+    zellen[cell_to_index("B2")] = "neu"   # bisher leere Zelle
+    datei = XlsDatei.lesen(VORLAGE)
+    datei.zellen_setzen(SHEET_NAME, zellen)
+    ziel = str(tmp_path / "auftrag.xls")
+    datei.speichern(ziel)
+
+    erwartet = _blaetter(VORLAGE)
+    for zelle, text in zellen.items():
+        erwartet[SHEET_NAME][zelle] = text
+    erwartet[SHEET_NAME] = {zelle: wert for zelle, wert in erwartet[SHEET_NAME].items() if wert != ""}
+    assert _blaetter(ziel) == erwartet
+
+
+def test_nur_geaenderte_sektoren_schreiben(tmp_path):
+    ziel = str(tmp_path / "auftrag.xls")
+    XlsDatei.lesen(VORLAGE).speichern(ziel)
+    datei = XlsDatei.lesen(ziel)
+    datei.zellen_setzen(SHEET_NAME, {cell_to_index("D22"): "WE 4711"})
+    datei.speichern(ziel)
+    assert os.path.getsize(ziel) == len(datei.daten)
+    with open(ziel, "rb") as gespeichert:
+        assert gespeichert.read() == datei.daten
+    assert xlrd.open_workbook(ziel).sheet_by_name(SHEET_NAME).cell_value(*cell_to_index("D22")) == "WE 4711"
+
+
+def test_langer_text_nicht_patchbar():
+    datei = XlsDatei.lesen(VORLAGE)
+    with pytest.raises(NichtPatchbar):
+        datei.zellen_setzen(SHEET_NAME, {cell_to_index("E14"): "x" * 256})
+
+
+def test_unbekanntes_blatt():
+    with pytest.raises(ValueError):
+        XlsDatei.lesen(VORLAGE).zellen_setzen("Gibt es nicht", {(0, 0): "x"})
+
+
+def test_au_auftraege_direkt_und_ueber_xlutils(tmp_path):
+    # Der zweite Auftrag passt nicht in den BIFF-Stream und geht über xlutils
+    auftraege = [dict(AUFTRAG, datei="direkt"), dict(AUFTRAG, datei="xlutils", M60="y" * 300)]
+    ergebnisse = au_auftraege_erzeugen(VORLAGE, auftraege, str(tmp_path), prozesse=1)
+    assert [fehler for _, fehler in ergebnisse] == [None, None]
+    for (pfad, _), auftrag in zip(ergebnisse, auftraege):
+        sheet = xlrd.open_workbook(pfad).sheet_by_name(SHEET_NAME)
+        for (row, col), text in auftrag_zellen(auftrag).items():
+            assert sheet.cell_value(row, col) == text
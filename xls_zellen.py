@@ -0,0 +1,506 @@
+"""Direktes Schreiben von Zellen in .xls-Dateien (BIFF8 im OLE2-Verbundformat).
+
+Statt die Arbeitsmappe mit xlrd zu lesen und über xlutils/xlwt komplett neu
+zu erzeugen, werden nur die Records der geänderten Zellen im Workbook-Stream
+ersetzt. Alles andere - Formatierung, Makros (VBA), Grafiken, Namen - bleibt
+Byte für Byte erhalten. Verschieben sich durch längere oder kürzere Texte die
+nachfolgenden Records, werden die Positionsangaben (BOUNDSHEET, INDEX,
+DBCELL) nachgeführt. Auf die Platte geschrieben werden nur die Sektoren, die
+sich tatsächlich geändert haben.
+
+Texte werden als LABEL-Records mit eingebettetem String geschrieben; die
+gemeinsame String-Tabelle (SST) bleibt unverändert.
+
+Fälle, die hier nicht sicher behandelt werden (Formelzellen, Zeilen ganz ohne
+Zellen, Texte über 255 Zeichen, Streams im Mini-Stream, ...), lösen
+NichtPatchbar aus - der Aufrufer fällt dann auf xlutils zurück.
+"""
+import bisect
+import os
+import struct
+
+OLE_SIGNATUR = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+FREESECT = 0xFFFFFFFF
+ENDOFCHAIN = 0xFFFFFFFE
+FATSECT = 0xFFFFFFFD
+
+# BIFF8-Record-Typen
+BOF = 0x0809
+EOF = 0x000A
+BOUNDSHEET = 0x0085
+SST = 0x00FC
+INDEX = 0x020B
+DBCELL = 0x00D7
+DEFCOLWIDTH = 0x0055
+DIMENSIONS = 0x0200
+ROW = 0x0208
+BLANK = 0x0201
+NUMBER = 0x0203
+LABEL = 0x0204
+LABELSST = 0x00FD
+RK = 0x027E
+BOOLERR = 0x0205
+RSTRING = 0x00D6
+FORMULA = 0x0006
+MULBLANK = 0x00BE
+MULRK = 0x00BD
+# Zellen, die durch einen Text ersetzt werden dürfen (eine Zelle je Record)
+EINZELZELLEN = {BLANK, NUMBER, LABEL, LABELSST, RK, BOOLERR, RSTRING}
+ZELLEN = EINZELZELLEN | {FORMULA, MULBLANK, MULRK}
+
+
+class NichtPatchbar(Exception):
+    """Die Änderung lässt sich nicht sicher direkt in die Datei schreiben"""
+
+
+def _records(daten, start, ende=None):
+    """(Position, Typ, Länge) aller Records ab `start` bis zum EOF-Record (einschließlich)"""
+    ende = len(daten) if ende is None else ende
+    pos = start
+    while pos + 4 <= ende:
+        typ, laenge = struct.unpack_from("<HH", daten, pos)
+        yield pos, typ, laenge
+        if typ == EOF:
+            return
+        pos += 4 + laenge
+
+
+def _zelle_record(row, col, ixfe, text):
+    """LABEL-Record mit eingebettetem String (leerer Text: BLANK, Formatierung bleibt)"""
+    if text == "":
+        return struct.pack("<HHHHH", BLANK, 6, row, col, ixfe)
+    try:
+        roh, hoch = text.encode("latin-1"), 0
+        zeichen = len(roh)
+    except UnicodeEncodeError:
+        roh, hoch = text.encode("utf-16-le"), 1
+        zeichen = len(roh) // 2
+    if zeichen > 255:
+        raise NichtPatchbar("Text länger als 255 Zeichen")
+    inhalt = struct.pack("<HHHHB", row, col, ixfe, zeichen, hoch) + roh
+    return struct.pack("<HH", LABEL, len(inhalt)) + inhalt
+
+
+class _Verbunddatei:
+    """OLE2-Verbunddatei (Compound File) im Speicher; merkt sich geänderte Sektoren"""
+
+    def __init__(self, daten):
+        if daten[:8] != OLE_SIGNATUR:
+            raise NichtPatchbar("Keine OLE2-Datei")
+        self.daten = bytearray(daten)
+        self.sektor = 1 << struct.unpack_from("<H", daten, 0x1E)[0]
+        (self.fat_anzahl, self.verzeichnis_start, _, self.mini_grenze, _, _,
+         difat_start, difat_anzahl) = struct.unpack_from("<IIIIIIII", daten, 0x2C)
+        if len(self.daten) % self.sektor:
+            # Manche Programme schneiden den letzten Sektor ab
+            self.daten.extend(bytes(self.sektor - len(self.daten) % self.sektor))
+
+        # FAT-Sektoren: 109 im Kopf, der Rest in DIFAT-Sektoren
+        self.fat_sektoren = list(struct.unpack_from("<109I", daten, 0x4C))
+        eintraege = self.sektor // 4
+        sektor = difat_start
+        for _ in range(difat_anzahl):
+            werte = struct.unpack_from(f"<{eintraege}I", self.daten, self._offset(sektor))
+            self.fat_sektoren += werte[:-1]
+            sektor = werte[-1]
+        self.fat_sektoren = self.fat_sektoren[:self.fat_anzahl]
+        self.fat = []
+        for sektor in self.fat_sektoren:
+            self.fat += struct.unpack_from(f"<{eintraege}I", self.daten, self._offset(sektor))
+        self.geaendert = set()   # Sektornummern, -1 = Dateikopf
+
+    def _offset(self, sektor):
+        return (sektor + 1) * self.sektor
+
+    def _kette(self, start):
+        kette = []
+        while start < len(self.fat) and start not in (ENDOFCHAIN, FREESECT):
+            kette.append(start)
+            if len(kette) > len(self.fat):
+                raise NichtPatchbar("Sektorkette ist zyklisch")
+            start = self.fat[start]
+        return kette
+
+    def _fat_setzen(self, index, wert):
+        self.fat[index] = wert
+        eintraege = self.sektor // 4
+        sektor = self.fat_sektoren[index // eintraege]
+        struct.pack_into("<I", self.daten, self._offset(sektor) + (index % eintraege) * 4, wert)
+        self.geaendert.add(sektor)
+
+    def _verzeichnis(self):
+        """{Name: Offset des 128-Byte-Eintrags in self.daten}"""
+        eintraege = {}
+        for sektor in self._kette(self.verzeichnis_start):
+            basis = self._offset(sektor)
+            for i in range(self.sektor // 128):
+                offset = basis + i * 128
+                laenge = struct.unpack_from("<H", self.daten, offset + 0x40)[0]
+                if self.daten[offset + 0x42] in (1, 2, 5) and 2 <= laenge <= 64:
+                    name = self.daten[offset:offset + laenge - 2].decode("utf-16-le", "replace")
+                    eintraege.setdefault(name, offset)
+        return eintraege
+
+    def stream_lesen(self, name):
+        offset = self._verzeichnis().get(name)
+        if offset is None:
+            raise NichtPatchbar(f"Stream '{name}' fehlt")
+        start, groesse = struct.unpack_from("<II", self.daten, offset + 0x74)
+        if groesse < self.mini_grenze:
+            raise NichtPatchbar("Stream liegt im Mini-Stream")
+        teile = [self.daten[self._offset(s):self._offset(s) + self.sektor] for s in self._kette(start)]
+        stream = bytes(b"".join(teile)[:groesse])
+        if len(stream) != groesse:
+            raise NichtPatchbar("Stream ist kürzer als angegeben")
+        return stream
+
+    def _sektor_anfordern(self):
+        """Freier Sektor (aus der FAT oder neu am Dateiende)"""
+        gesamt = len(self.daten) // self.sektor - 1
+        for index in range(min(gesamt, len(self.fat))):
+            if self.fat[index] == FREESECT:
+                return index
+        if gesamt >= len(self.fat):
+            # Neuer FAT-Sektor am Dateiende, eingetragen im Dateikopf
+            if self.fat_anzahl >= 109:
+                raise NichtPatchbar("FAT müsste über DIFAT erweitert werden")
+            neuer_fat = gesamt
+            self.daten.extend(b"\xff" * self.sektor)
+            self.geaendert.add(neuer_fat)
+            self.fat_sektoren.append(neuer_fat)
+            self.fat += [FREESECT] * (self.sektor // 4)
+            struct.pack_into("<I", self.daten, 0x4C + self.fat_anzahl * 4, neuer_fat)
+            self.fat_anzahl += 1
+            struct.pack_into("<I", self.daten, 0x2C, self.fat_anzahl)
+            self.geaendert.add(-1)
+            self._fat_setzen(neuer_fat, FATSECT)
+            gesamt += 1
+        self.daten.extend(bytes(self.sektor))
+        return gesamt
+
+    def stream_schreiben(self, name, neu):
+        """Ersetzt den Inhalt eines Streams; nur geänderte Sektoren werden markiert"""
+        offset = self._verzeichnis()[name]
+        start, groesse = struct.unpack_from("<II", self.daten, offset + 0x74)
+        if len(neu) < self.mini_grenze:
+            raise NichtPatchbar("Stream würde in den Mini-Stream fallen")
+        kette = self._kette(start)
+        noetig = -(-len(neu) // self.sektor)
+        while len(kette) < noetig:
+            sektor = self._sektor_anfordern()
+            self._fat_setzen(sektor, ENDOFCHAIN)
+            self._fat_setzen(kette[-1], sektor)
+            kette.append(sektor)
+        if len(kette) > noetig:
+            self._fat_setzen(kette[noetig - 1], ENDOFCHAIN)
+            for sektor in kette[noetig:]:
+                self._fat_setzen(sektor, FREESECT)
+            kette = kette[:noetig]
+        for i, sektor in enumerate(kette):
+            block = neu[i * self.sektor:(i + 1) * self.sektor].ljust(self.sektor, b"\0")
+            ziel = self._offset(sektor)
+            if self.daten[ziel:ziel + self.sektor] != block:
+                self.daten[ziel:ziel + self.sektor] = block
+                self.geaendert.add(sektor)
+        if len(neu) != groesse:
+            struct.pack_into("<I", self.daten, offset + 0x78, len(neu))
+            self.geaendert.add((offset - self.sektor) // self.sektor)
+
+    def bereiche(self):
+        """Geänderte Byte-Bereiche als [(Offset, Länge)]"""
+        return sorted((0, 512) if s == -1 else (self._offset(s), self.sektor) for s in self.geaendert)
+
+
+class XlsDatei:
+    """Eine .xls-Datei im Speicher, deren Zellen direkt im BIFF-Stream geändert werden"""
+
+    def __init__(self, daten):
+        self._datei = _Verbunddatei(daten)
+        self._stream_name = "Workbook"
+        self._stream = self._datei.stream_lesen(self._stream_name)
+        if struct.unpack_from("<HHH", self._stream, 0)[::2] != (BOF, 0x0600):
+            raise NichtPatchbar("Kein BIFF8-Workbook")
+
+    @classmethod
+    def lesen(cls, pfad):
+        with open(pfad, "rb") as datei:
+            return cls(datei.read())
+
+    def kopie(self):
+        return XlsDatei(bytes(self._datei.daten))
+
+    @property
+    def daten(self):
+        return bytes(self._datei.daten)
+
+    def _blaetter(self):
+        """[(Name, Position des BOUNDSHEET-Records, Stream-Position des Blatts)]"""
+        blaetter = []
+        for pos, typ, _ in _records(self._stream, 0):
+            if typ == BOUNDSHEET:
+                start, = struct.unpack_from("<I", self._stream, pos + 4)
+                zeichen, optionen = self._stream[pos + 10], self._stream[pos + 11]
+                roh = self._stream[pos + 12:pos + 12 + zeichen * (2 if optionen & 1 else 1)]
+                name = roh.decode("utf-16-le" if optionen & 1 else "latin-1")
+                blaetter.append((name, pos, start))
+        return blaetter
+
+    def blattnamen(self):
+        return [name for name, _, _ in self._blaetter()]
+
+    def zellen_setzen(self, blatt, zellen):
+        """Schreibt {(Zeile, Spalte): Text} in das Blatt (nur im Speicher, siehe speichern)"""
+        if not zellen:
+            return
+        blaetter = self._blaetter()
+        positionen = {name: start for name, _, start in blaetter}
+        if blatt not in positionen:
+            raise ValueError(f"Sheet '{blatt}' nicht gefunden!")
+        stream = self._stream
+        start = positionen[blatt]
+        records = list(_records(stream, start))
+        if not records or records[0][1] != BOF or records[-1][1] != EOF:
+            raise NichtPatchbar("Blatt ist unvollständig")
+        ende = records[-1][0] + 4 + records[-1][2]
+        alt_index = _index_pruefen(stream, records)
+
+        ersetzungen, labelsst = _aenderungen(stream, records, zellen)
+
+        # Blatt neu zusammensetzen
+        teile = []
+        pos = start
+        for von, bis, neu in sorted(ersetzungen, key=lambda e: (e[0], e[1])):
+            teile.append(stream[pos:von])
+            teile.append(neu)
+            pos = bis
+        teile.append(stream[pos:ende])
+        neues_blatt = bytearray(b"".join(teile))
+        delta = len(neues_blatt) - (ende - start)
+
+        neu = bytearray(stream[:start]) + neues_blatt + stream[ende:]
+        if alt_index:
+            _index_neu_berechnen(neu, list(_records(neu, start)))
+        if delta:
+            for _, boundsheet, position in blaetter:
+                if position > start:
+                    struct.pack_into("<I", neu, boundsheet + 4, position + delta)
+                    _index_verschieben(neu, position + delta, delta)
+        if labelsst:
+            for pos, typ, _ in _records(neu, 0):
+                if typ == SST:
+                    gesamt, = struct.unpack_from("<I", neu, pos + 4)
+                    struct.pack_into("<I", neu, pos + 4, max(0, gesamt - labelsst))
+                    break
+
+        # Erst jetzt die Verbunddatei anfassen (auf einer Kopie, falls dort etwas scheitert)
+        datei = _Verbunddatei(self._datei.daten)
+        datei.geaendert = set(self._datei.geaendert)
+        datei.stream_schreiben(self._stream_name, bytes(neu))
+        self._datei = datei
+        self._stream = bytes(neu)
+
+    def speichern(self, pfad, nur_aenderungen=True):
+        """Schreibt die Datei. Mit nur_aenderungen werden bei einer bestehenden Datei
+        gleicher Herkunft nur die geänderten Sektoren überschrieben."""
+        if nur_aenderungen and os.path.exists(pfad):
+            with open(pfad, "r+b") as datei:
+                for offset, laenge in self._datei.bereiche():
+                    datei.seek(offset)
+                    datei.write(self._datei.daten[offset:offset + laenge])
+                datei.truncate(len(self._datei.daten))
+        else:
+            with open(pfad, "wb") as datei:
+                datei.write(self._datei.daten)
+        self._datei.geaendert.clear()
+
+
+def _aenderungen(stream, records, zellen):
+    """Ersetzungen [(von, bis, neue Bytes)] für alle Zielzellen und die Zahl entfernter LABELSST"""
+    einzeln = {}          # (Zeile, Spalte) -> Record
+    mehrfach = {}         # Zeile -> [(erste Spalte, letzte Spalte, Record)]
+    je_zeile = {}         # Zeile -> [Record] in Stream-Reihenfolge
+    row_records = {}
+    dimensions = None
+    for record in records:
+        pos, typ, laenge = record
+        if typ in ZELLEN:
+            row, col = struct.unpack_from("<HH", stream, pos + 4)
+            je_zeile.setdefault(row, []).append(record)
+            if typ in (MULBLANK, MULRK):
+                letzte, = struct.unpack_from("<H", stream, pos + 4 + laenge - 2)
+                mehrfach.setdefault(row, []).append((col, letzte, record))
+            else:
+                einzeln[(row, col)] = record
+        elif typ == ROW:
+            row_records[struct.unpack_from("<H", stream, pos + 4)[0]] = record
+        elif typ == DIMENSIONS:
+            dimensions = record
+
+    ersetzungen = {}      # Record-Position -> (von, bis, neue Bytes)
+    einfuegungen = {}     # Position -> [(Spalte, Bytes)]
+    mehrfach_ziele = {}   # Record -> {Spalte: Text}
+    labelsst = 0
+    spalten_je_zeile = {}
+    for (row, col), text in sorted(zellen.items()):
+        text = str(text)
+        if (row, col) in einzeln:
+            pos, typ, laenge = einzeln[(row, col)]
+            if typ == FORMULA:
+                raise NichtPatchbar(f"Zelle {row + 1}/{col + 1} enthält eine Formel")
+            ixfe, = struct.unpack_from("<H", stream, pos + 8)
+            ersetzungen[pos] = (pos, pos + 4 + laenge, _zelle_record(row, col, ixfe, text))
+            labelsst += typ == LABELSST
+            continue
+        bereich = next((r for c1, c2, r in mehrfach.get(row, []) if c1 <= col <= c2), None)
+        if bereich is not None:
+            mehrfach_ziele.setdefault(bereich, {})[col] = text
+            continue
+        # Neue Zelle: nur in Zeilen, die schon Zellen haben (DBCELL-Aufbau bleibt gleich)
+        in_zeile = je_zeile.get(row)
+        if not in_zeile:
+            raise NichtPatchbar(f"Zeile {row + 1} enthält noch keine Zellen")
+        pos = next((p for p, _, _ in in_zeile
+                    if struct.unpack_from("<H", stream, p + 6)[0] > col), None)
+        if pos is None:
+            p, _, laenge = in_zeile[-1]
+            pos = p + 4 + laenge
+        einfuegungen.setdefault(pos, []).append((col, _zelle_record(row, col, 15, text)))
+        spalten_je_zeile.setdefault(row, []).append(col)
+
+    for (pos, typ, laenge), ziele in mehrfach_ziele.items():
+        ersetzungen[pos] = (pos, pos + 4 + laenge, _mehrfach_aufteilen(stream, pos, typ, laenge, ziele))
+
+    # ROW- und DIMENSIONS-Records auf neue Spalten erweitern (gleiche Länge, in place)
+    for row, spalten in spalten_je_zeile.items():
+        if row in row_records:
+            pos, _, laenge = row_records[row]
+            inhalt = bytearray(stream[pos:pos + 4 + laenge])
+            erste, bis = struct.unpack_from("<HH", inhalt, 6)
+            struct.pack_into("<HH", inhalt, 6, min(erste, *spalten), max(bis, max(spalten) + 1))
+            ersetzungen[pos] = (pos, pos + 4 + laenge, bytes(inhalt))
+    if dimensions is not None and spalten_je_zeile:
+        pos, _, laenge = dimensions
+        inhalt = bytearray(stream[pos:pos + 4 + laenge])
+        erste, bis = struct.unpack_from("<HH", inhalt, 12)
+        alle = [c for spalten in spalten_je_zeile.values() for c in spalten]
+        struct.pack_into("<HH", inhalt, 12, min(erste, *alle), max(bis, max(alle) + 1))
+        ersetzungen[pos] = (pos, pos + 4 + laenge, bytes(inhalt))
+
+    ergebnis = list(ersetzungen.values())
+    for pos, neue in einfuegungen.items():
+        ergebnis.append((pos, pos, b"".join(record for _, record in sorted(neue))))
+    return ergebnis, labelsst
+
+
+def _mehrfach_aufteilen(stream, pos, typ, laenge, ziele):
+    """Zerlegt MULBLANK/MULRK so, dass die Zielspalten eigene LABEL-Records bekommen"""
+    row, erste = struct.unpack_from("<HH", stream, pos + 4)
+    breite = 2 if typ == MULBLANK else 6
+    anzahl = (laenge - 6) // breite
+    eintraege = [stream[pos + 8 + i * breite:pos + 8 + (i + 1) * breite] for i in range(anzahl)]
+
+    records = []
+    lauf = []   # (Spalte, Eintrag) ohne Ziel, werden zusammengefasst
+
+    def lauf_schreiben():
+        if not lauf:
+            return
+        spalte = lauf[0][0]
+        if len(lauf) == 1:
+            einzel = BLANK if typ == MULBLANK else RK
+            inhalt = struct.pack("<HH", row, spalte) + lauf[0][1]
+            records.append(struct.pack("<HH", einzel, len(inhalt)) + inhalt)
+        else:
+            inhalt = (struct.pack("<HH", row, spalte) + b"".join(e for _, e in lauf)
+                      + struct.pack("<H", lauf[-1][0]))
+            records.append(struct.pack("<HH", typ, len(inhalt)) + inhalt)
+        lauf.clear()
+
+    for i, eintrag in enumerate(eintraege):
+        spalte = erste + i
+        if spalte in ziele:
+            lauf_schreiben()
+            ixfe, = struct.unpack_from("<H", eintrag, 0)
+            records.append(_zelle_record(row, spalte, ixfe, ziele[spalte]))
+        else:
+            lauf.append((spalte, eintrag))
+    lauf_schreiben()
+    return b"".join(records)
+
+
+def _index_berechnen(stream, records):
+    """Soll-Inhalte von INDEX und DBCELL aus den tatsächlichen Positionen: {Position: Bytes}"""
+    soll = {}
+    index = None
+    defcolwidth = None
+    dbcells = []
+    block_rows = []     # ROW-Records seit dem letzten DBCELL: (Position, Zeile)
+    zellen = []         # Zellen seit dem letzten DBCELL: (Zeile, Position)
+    for pos, typ, laenge in records:
+        if typ == INDEX:
+            index = (pos, laenge)
+        elif typ == DEFCOLWIDTH:
+            defcolwidth = pos
+        elif typ == ROW:
+            block_rows.append((pos, struct.unpack_from("<H", stream, pos + 4)[0]))
+        elif typ in ZELLEN:
+            zellen.append((struct.unpack_from("<H", stream, pos + 4)[0], pos))
+        elif typ == DBCELL:
+            dbcells.append(pos)
+            if block_rows:
+                # Excel: Abstand der ersten Zelle jeder Zeile zur ersten Zelle der
+                # Vorzeile (bei der ersten Zeile zum zweiten ROW-Record). Zeilen
+                # ohne Zellen zählen mit der Position der nächsten Zelle bzw. des DBCELL.
+                zellen.sort()
+                versaetze = []
+                vorher = block_rows[0][0] + 20
+                for _, row in block_rows:
+                    nr = bisect.bisect_left(zellen, (row, 0))
+                    erste = zellen[nr][1] if nr < len(zellen) else pos
+                    versaetze.append(erste - vorher)
+                    vorher = erste
+                if len(versaetze) != (laenge - 4) // 2 or not all(0 <= v <= 0xFFFF for v in versaetze):
+                    return None
+                soll[pos] = struct.pack(f"<I{len(versaetze)}H", pos - block_rows[0][0], *versaetze)
+            block_rows = []
+            zellen = []
+    if index is not None:
+        pos, laenge = index
+        kopf = bytearray(stream[pos + 4:pos + 20])
+        if defcolwidth is not None:
+            struct.pack_into("<I", kopf, 12, defcolwidth)
+        if (laenge - 16) // 4 != len(dbcells):
+            return None
+        soll[pos] = bytes(kopf) + struct.pack(f"<{len(dbcells)}I", *dbcells)
+    return soll
+
+
+def _index_pruefen(stream, records):
+    """True, wenn INDEX/DBCELL vorhanden sind und genau nach dem erwarteten Schema aufgebaut
+    sind - nur dann können sie nach dem Ändern neu berechnet werden"""
+    if not any(typ in (INDEX, DBCELL) for _, typ, _ in records):
+        return False
+    soll = _index_berechnen(stream, records)
+    if soll is None or any(stream[pos + 4:pos + 4 + len(inhalt)] != inhalt for pos, inhalt in soll.items()):
+        raise NichtPatchbar("INDEX/DBCELL haben ein unbekanntes Format")
+    return True
+
+
+def _index_neu_berechnen(stream, records):
+    soll = _index_berechnen(stream, records)
+    if soll is None:
+        raise NichtPatchbar("INDEX/DBCELL lassen sich nicht neu berechnen")
+    for pos, inhalt in soll.items():
+        stream[pos + 4:pos + 4 + len(inhalt)] = inhalt
+
+
+def _index_verschieben(stream, start, delta):
+    """Absolute Positionen im INDEX-Record eines (verschobenen) Blatts anpassen"""
+    for pos, typ, laenge in _records(stream, start):
+        if typ == INDEX:
+            anzahl = (laenge - 16) // 4
+            werte = list(struct.unpack_from(f"<I{anzahl}I", stream, pos + 16))
+            struct.pack_into(f"<I{anzahl}I", stream, pos + 16, *[w + delta if w else 0 for w in werte])
+            return
+        if typ in ZELLEN or typ in (ROW, DBCELL):
+            return   # INDEX steht immer vor den Zeilen